@@ -1,66 +1,502 @@
-from typing import List, Tuple, Dict, Set
-from difflib import unified_diff
+import os
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Tuple, Dict, Iterable, Iterator, Optional
 
 import click
-from robot.api import get_model
 
-from robotidy.transformers import load_transformers
+from robotidy.changes import get_diff_lines, keep_changes_in_ranges, reports_changes
+from robotidy.chunks import prefilter_transformers, prepare_transformers, transform_in_chunks
+from robotidy.context import ChangeTracker, FileContext
+from robotidy.transformers import TRANSFORMERS, load_transformers
 from robotidy.utils import (
-    StatementLinesCollector,
     decorate_diff_with_color,
+    model_to_text,
+    sync_files,
+    write_file,
     GlobalFormattingConfig
 )
+from robotidy.workers import longest_first, restore_order, transform_in_processes, transform_in_threads
+
+if TYPE_CHECKING:
+    from robotidy.cache import ChunkCache
+
+
+CACHE_SAVE_BATCH = 1000  # new models and chunks saved to the cache at once during the run
+
+# time spent by the current thread on loading transformers - it is not counted in durations of transformed files
+_timing = threading.local()
+
+
+def loading_time() -> float:
+    return getattr(_timing, 'loading', 0.0)
+
+
+class FileResult:
+    """ Outcome of transforming a single file. It is returned from worker processes so it needs to be picklable. """
+    def __init__(self, source, changed: bool, diff: Optional[str] = None, digest: Optional[str] = None,
+                 cached: bool = False, model_cached: bool = False, model_data: Optional[bytes] = None,
+                 chunk_cache: Optional['ChunkCache'] = None, skipped: bool = False, unstaged: bool = False):
+        self.source = source
+        self.changed = changed
+        self.diff = diff
+        self.digest = digest
+        self.cached = cached
+        self.model_cached = model_cached
+        self.model_data = model_data
+        self.chunks = chunk_cache.entries if chunk_cache is not None else {}
+        self.chunk_hits = chunk_cache.hits if chunk_cache is not None else 0
+        self.chunk_misses = chunk_cache.misses if chunk_cache is not None else 0
+        self.stat = None
+        self.stat_cached = False
+        # file was not parsed because no transformer could change it
+        self.skipped = skipped
+        # transformed staged content was not written because the file has also not staged changes
+        self.unstaged = unstaged
+        # seconds it took to process the file (None if the file was not read)
+        self.duration = None
 
 
 class Robotidy:
     def __init__(self,
                  transformers: List[Tuple[str, Dict]],
-                 src: Set,
+                 src: Iterable,
                  overwrite: bool,
                  show_diff: bool,
                  formatting_config: GlobalFormattingConfig,
                  verbose: bool,
-                 check: bool
+                 check: bool,
+                 workers: int = 1,
+                 threads: int = 1,
+                 chunk_threshold: Optional[int] = None,
+                 cache_dir: Optional[Path] = None,
+                 cache_chunks: bool = False,
+                 cache_stat: bool = False,
+                 registry=None,
+                 fsync: bool = False,
+                 config: Optional[str] = None,
+                 config_resolver=None,
+                 staged: Optional[Dict] = None,
+                 report=None,
+                 coordinator=None,
+                 fail_fast: bool = False
                  ):
         self.sources = src
         self.overwrite = overwrite
         self.show_diff = show_diff
         self.check = check
+        # stop at the first file that would be changed (with ``check``)
+        self.fail_fast = fail_fast
         self.verbose = verbose
+        self.fsync = fsync
         self.formatting_config = formatting_config
-        self.transformers = load_transformers(transformers)
+        self.workers = workers
+        self.threads = threads
+        self.chunk_threshold = chunk_threshold
+        self.chunk_executor = None
+        if chunk_threshold:
+            from concurrent.futures import ThreadPoolExecutor
+
+            self.chunk_executor = ThreadPoolExecutor(max_workers=threads)
+        self.transformers_config = transformers
+        self.registry = registry
+        self._transformers = None
+        self._transformers_lock = threading.Lock()
+        # configuration file of this instance - sources with other nearest configuration file are transformed by
+        # separate instances created with ``config_resolver`` (see ``robotidy.config``)
+        self.config = os.path.realpath(config) if config else None
+        self.config_resolver = config_resolver
+        self.pipelines = {}
+        self._pipelines_lock = threading.Lock()
+        # with ``--serve``: files are transformed by remote workers (``robotidy.distributed.Coordinator``)
+        self.coordinator = coordinator
+        # results of the run saved with ``--report`` (``robotidy.report.Report``)
+        self.report = report
+        # with ``--staged``: absolute path -> content and selected lines of the file in the git index (``StagedFile``)
+        self.staged = staged
+        self.cache_dir = cache_dir
+        self.cache = None
+        if cache_dir:
+            # the cache (and sqlite3) is imported only when it is used
+            from robotidy.cache import Cache
+
+            self.cache = Cache(cache_dir, self.get_fingerprint())
+        # chunk keys do not depend on the position of the chunk so it can not be used with selected lines
+        self.cache_chunks = cache_chunks and self.cache is not None and staged is None \
+            and formatting_config.start_line is None and formatting_config.end_line is None
+        self.cache_stat = cache_stat and self.cache is not None
+        if self.cache is None:
+            # without the cache every file is transformed - load transformers now to report configuration errors early
+            self.load_transformers()
+
+    @property
+    def transformers(self) -> Dict:
+        """ Transformers (and Robot Framework) are loaded when the first file needs to be transformed. """
+        if self._transformers is None:
+            self.load_transformers()
+        return self._transformers
+
+    def load_transformers(self):
+        start = time.perf_counter()
+        try:
+            with self._transformers_lock:
+                if self._transformers is not None:
+                    return
+                transformers = load_transformers(self.transformers_config, self.registry)
+                for transformer in transformers.values():
+                    # inject global settings TODO: handle it better
+                    setattr(transformer, 'formatting_config', self.formatting_config)
+                self._transformers = transformers
+        finally:
+            _timing.loading = loading_time() + time.perf_counter() - start
+
+    def get_config(self, source) -> Optional[str]:
+        """ Path of the configuration file used for ``source``. """
+        if self.config_resolver is None:
+            return self.config
+        return self.config_resolver.find_for_source(source)
+
+    def get_pipeline(self, source) -> 'Robotidy':
+        """ Instance that transforms ``source`` - with options from the nearest configuration file of the source. """
+        return self.get_config_pipeline(self.get_config(source))
+
+    def get_config_pipeline(self, config: Optional[str]) -> 'Robotidy':
+        """
+        Instance with options from the ``config`` configuration file. Its transformers are loaded when the first
+        file is transformed by it (or on creation without the cache).
+        """
+        if config == self.config:
+            return self
+        with self._pipelines_lock:
+            pipeline = self.pipelines.get(config)
+            if pipeline is None:
+                transformers, formatting_config = self.config_resolver.get_pipeline(config)
+                try:
+                    pipeline = Robotidy(
+                        transformers=transformers,
+                        src=(),
+                        overwrite=self.overwrite,
+                        show_diff=self.show_diff,
+                        formatting_config=formatting_config,
+                        verbose=self.verbose,
+                        check=self.check,
+                        threads=self.threads,
+                        chunk_threshold=self.chunk_threshold,
+                        cache_dir=self.cache_dir,
+                        cache_chunks=self.cache_chunks,
+                        cache_stat=self.cache_stat,
+                        registry=self.registry,
+                        config=config,
+                        staged=self.staged
+                    )
+                except Exception as err:
+                    # Robot Framework is imported only if transformers were loaded (without the cache)
+                    from robot.errors import DataError
+
+                    if not isinstance(err, DataError):
+                        raise
+                    raise click.BadParameter(str(err), param_hint=f"configuration file '{config}'") from None
+                self.pipelines[config] = pipeline
+        return pipeline
 
     def transform_files(self):
         changed_files = 0
-        for source in self.sources:
-            if self.verbose:
-                click.echo(f'Transforming {source} file')
-            model = get_model(source)
-            old_model = StatementLinesCollector(model)
-            for transformer in self.transformers.values():
-                # inject global settings TODO: handle it better
-                setattr(transformer, 'formatting_config', self.formatting_config)
-                transformer.visit(model)
-            new_model = StatementLinesCollector(model)
-            if new_model != old_model:
-                changed_files += 1
-            self.output_diff(model.source, old_model, new_model)
-            if not self.check:
-                self.save_model(model)
-        if not self.check or not changed_files:
-            return 0
-        return 1
-
-    def save_model(self, model):
-        if self.overwrite:
-            model.save()
-
-    def output_diff(self, path: str, old_model: StatementLinesCollector, new_model: StatementLinesCollector):
+        formatted, cache_hits, cache_misses = defaultdict(list), 0, 0
+        models, model_hits, skipped = {}, 0, 0
+        chunks, chunk_hits, chunk_misses = {}, 0, 0
+        manifest, stat_hits = defaultdict(dict), 0
+        durations = {}
+        written = []
+        try:
+            for result in self.get_results():
+                if self.verbose:
+                    click.echo(f'Transforming {result.source} file')
+                if self.report is not None:
+                    self.report.add(result.source, result.changed)
+                if result.unstaged:
+                    click.echo(f'{result.source} has not staged changes - it was not overwritten', err=True)
+                if result.changed:
+                    changed_files += 1
+                    if self.overwrite and not self.check and not result.unstaged:
+                        written.append(result.source)
+                elif self.staged is None and (result.digest is not None or result.stat is not None):
+                    # formatted files are stored with the fingerprint of the configuration that transformed them
+                    config = self.get_config(result.source)
+                    if result.digest is not None:
+                        formatted[config].append(result.digest)
+                    if result.stat is not None:
+                        manifest[config][str(Path(result.source).absolute())] = result.stat
+                if result.duration is not None:
+                    durations[str(Path(result.source).absolute())] = result.duration
+                stat_hits += result.stat_cached
+                if result.cached:
+                    cache_hits += 1
+                elif result.digest is not None:
+                    cache_misses += 1
+                    if not result.skipped:
+                        models[result.digest] = result.model_data
+                    model_hits += result.model_cached
+                skipped += result.skipped
+                chunks.update(result.chunks)
+                chunk_hits += result.chunk_hits
+                chunk_misses += result.chunk_misses
+                if self.cache is not None and len(models) + len(chunks) >= CACHE_SAVE_BATCH:
+                    # serialized models and chunks are not kept in memory until the end of the run
+                    self.cache.keep_models(cache_misses)
+                    self.cache.save((), models, chunks)
+                    models, chunks = {}, {}
+                self.output_diff(result.diff)
+                if self.fail_fast and self.check and result.changed:
+                    if self.verbose:
+                        click.echo('Stopping at the first file that would be changed')
+                    break
+        finally:
+            for pipeline in (self, *self.pipelines.values()):
+                if pipeline.chunk_executor is not None:
+                    pipeline.chunk_executor.shutdown()
+            if self.cache is not None:
+                self.cache.keep_models(cache_misses)
+                self.cache.save(formatted.pop(self.config, []), models, chunks, manifest.pop(self.config, {}),
+                                durations)
+                for config in set(formatted) | set(manifest):
+                    self.get_config_pipeline(config).cache.save(formatted[config], manifest=manifest[config])
+                for pipeline in (self, *self.pipelines.values()):
+                    pipeline.cache.close()
+            if self.fsync and written:
+                sync_files(written)
+        if self.cache is not None and self.verbose:
+            if self.cache_stat:
+                click.echo(f'Stat manifest: {stat_hits} hits, {cache_hits + cache_misses - stat_hits} misses')
+            click.echo(f'Cache: {cache_hits - stat_hits} hits, {cache_misses} misses')
+            click.echo(f'Parsed model cache: {model_hits} hits, {cache_misses - model_hits - skipped} misses')
+            if self.cache_chunks:
+                click.echo(f'Chunk cache: {chunk_hits} hits, {chunk_misses} misses')
+            if self.cache.error:
+                click.echo(f'Cache was disabled because of the error: {self.cache.error}')
+        status = 1 if self.check and changed_files else 0
+        if self.report is not None:
+            self.report.save(status)
+        return status
+
+    def get_results(self) -> Iterator[FileResult]:
+        """ Transform sources and yield results in the order of sources, regardless of the number of workers. """
+        if not self.cache_stat:
+            yield from self.transform_sources(self.sources)
+            return
+        from robotidy.cache import get_stat
+
+        sources = list(self.sources)
+        manifests = {}
+        stats = {source: get_stat(source) for source in sources}
+        unchanged = set()
+        for source, stat in stats.items():
+            pipeline = self.get_pipeline(source)
+            if pipeline not in manifests:
+                manifests[pipeline] = pipeline.cache.load_manifest()
+            if stat is not None and manifests[pipeline].get(str(Path(source).absolute())) == stat:
+                unchanged.add(source)
+        results = self.transform_sources([source for source in sources if source not in unchanged])
+        for source in sources:
+            if source in unchanged:
+                result = FileResult(source, False, '' if self.show_diff else None, cached=True)
+                result.stat_cached = True
+            else:
+                result = next(results)
+            result.stat = stats[source]
+            yield result
+
+    def transform_sources(self, sources: Iterable) -> Iterator[FileResult]:
+        if self.coordinator is None and self.workers == 1 and self.threads == 1:
+            for source in sources:
+                yield self.transform_file(source)
+            return
+        # files transformed in parallel are scheduled by their expected processing time, the longest first - except with
+        # ``fail_fast``, where they are scheduled in the order of sources so the run can stop at the same file as the
+        # serial run without waiting for the rest of the files
+        sources = list(sources)
+        if self.fail_fast:
+            order = list(range(len(sources)))
+        else:
+            order = longest_first(sources, self.cache.load_durations() if self.cache is not None else {})
+        results = self.transform_scheduled([sources[index] for index in order])
+        yield from restore_order(results, order)
+
+    def transform_scheduled(self, sources: List) -> Iterator[FileResult]:
+        if self.coordinator is not None:
+            from robotidy.distributed import remote_args
+
+            yield from self.coordinator.transform(sources, remote_args(self))
+        elif self.workers > 1:
+            yield from transform_in_processes(self.worker_args(), sources, self.workers)
+        else:
+            yield from transform_in_threads(self.transform_file, sources, self.threads)
+
+    def worker_args(self) -> Dict:
+        """ Arguments used to recreate this instance inside worker process. """
+        return {
+            'transformers': self.transformers_config,
+            'src': (),
+            'overwrite': self.overwrite,
+            'show_diff': self.show_diff,
+            'formatting_config': self.formatting_config,
+            'verbose': self.verbose,
+            'check': self.check,
+            'cache_dir': self.cache_dir,
+            'cache_chunks': self.cache_chunks,
+            'config': self.config,
+            'config_resolver': self.config_resolver,
+            'staged': self.staged,
+            'fail_fast': self.fail_fast
+        }
+
+    def get_fingerprint(self) -> str:
+        from robotidy.cache import get_fingerprint
+
+        transformers = [(name, args) for name, args in self.transformers_config] if self.transformers_config \
+            else [(name, ()) for name in TRANSFORMERS]
+        return get_fingerprint(transformers, self.formatting_config, self.registry)
+
+    def transform_file(self, source) -> FileResult:
+        """ Transform the file and record how long it took (used to schedule files in the next runs). """
+        start, loading = time.perf_counter(), loading_time()
+        result = self.transform_file_content(source)
+        result.duration = time.perf_counter() - start - (loading_time() - loading)
+        return result
+
+    def transform_file_content(self, source) -> FileResult:
+        pipeline = self.get_pipeline(source)
+        if pipeline is not self:
+            return pipeline.transform_file_content(source)
+        from robotidy.cache import ChunkCache, decode_source, get_digest, read_source, tokenize, tokens_to_model
+
+        staged = self.staged.get(str(source)) if self.staged is not None else None
+        with FileContext(source) as context:
+            digest, model_data, content = None, None, None
+            if staged is not None:
+                content = staged.content
+                context.line_ranges = staged.line_ranges
+            if self.cache is not None:
+                if content is None:
+                    content = read_source(source)
+                digest = get_digest(content)
+                if self.cache.is_formatted(digest):
+                    return FileResult(source, False, '' if self.show_diff else None, digest, cached=True)
+            transformers = list(self.transformers.values())
+            if any(hasattr(transformer, 'prefilter') for transformer in transformers):
+                if content is None:
+                    content = read_source(source)
+                transformers = prefilter_transformers(decode_source(content), transformers)
+                if not transformers:
+                    return FileResult(source, False, '' if self.show_diff else None, digest, skipped=True)
+            tracking = reports_changes(transformers)
+            if content is None:
+                content = read_source(source)
+            # the model is built from the already read content - the file is read only once
+            if self.cache is None:
+                model = tokens_to_model(tokenize(content), source)
+            else:
+                model, model_data = self.load_model(source, content, digest)
+            old_text = self.get_source_text(model, content)
+            facts = prepare_transformers(model, transformers)
+            chunk_cache = None
+            if self.cache_chunks:
+                # different transformers can be dropped by prefilters for files with the same facts
+                used = [index for index, transformer in enumerate(self.transformers.values())
+                        if transformer in transformers]
+                chunk_cache = ChunkCache(self.cache, [used, facts])
+            stop = None
+            if tracking and self.check and not self.show_diff and staged is None:
+                # only the status is needed - the rest of the file is not transformed once a change is reported
+                def stop():
+                    return context.changes.changed
+            completed = self.transform_model(model, transformers, chunk_cache, facts, stop)
+            if not completed and model_to_text(model) == old_text:
+                # reported change did not change the text - the whole file has to be transformed to know the status
+                model = tokens_to_model(tokenize(content), source)
+                context.changes = ChangeTracker()
+                self.transform_model(model, transformers, None, prepare_transformers(model, transformers))
+        # chunks taken from the cache are not transformed, so their changes are not reported. Windows line endings
+        # are normalized by Robot Framework when the file is parsed - transformers do not see them
+        line_range = None
+        if tracking and chunk_cache is None and b'\r' not in content:
+            if not context.changes.changed:
+                return FileResult(source, False, '' if self.show_diff else None, digest,
+                                  model_cached=digest is not None and model_data is None, model_data=model_data)
+            line_range = context.changes.line_range()
+        new_text = model_to_text(model)
+        if staged is not None:
+            new_text = keep_changes_in_ranges(old_text, new_text, staged.line_ranges)
+        changed = new_text != old_text
+        diff = self.get_diff(model.source, old_text, new_text, line_range)
+        unstaged = False
+        if changed and not self.check:
+            # do not overwrite changes that are not staged with the transformed staged content
+            unstaged = self.overwrite and staged is not None and read_source(source) != staged.content
+            if not unstaged:
+                self.save_model(model, new_text)
+        return FileResult(source, changed, diff, digest,
+                          model_cached=digest is not None and model_data is None, model_data=model_data,
+                          chunk_cache=chunk_cache, unstaged=unstaged)
+
+    def transform_model(self, model, transformers, chunk_cache, facts, stop=None) -> bool:
+        if self.should_split(model):
+            return transform_in_chunks(model, transformers, self.chunk_executor, self.threads, chunk_cache, facts,
+                                       stop)
+        return transform_in_chunks(model, transformers, chunk_cache=chunk_cache, facts=facts, stop=stop)
+
+    def load_model(self, source, content: bytes, digest: str):
+        """
+        Rebuild the model from cached tokens if possible. Otherwise lex the file and return also serialized tokens
+        to be stored in the cache.
+        """
+        from robotidy.cache import deserialize_tokens, serialize_tokens, tokenize, tokens_to_model
+
+        data = self.cache.load_model_data(digest)
+        if data is not None:
+            return tokens_to_model(deserialize_tokens(data), source), None
+        tokens = tokenize(content)
+        return tokens_to_model(tokens, source), serialize_tokens(tokens)
+
+    def should_split(self, model) -> bool:
+        if not self.chunk_threshold or not model.sections:
+            return False
+        return model.sections[-1].end_lineno > self.chunk_threshold
+
+    @staticmethod
+    def get_source_text(model, content: Optional[bytes]) -> str:
+        """
+        Text of the model before it is transformed. Model keeps the content of the file as it is, so the already read
+        content is used if possible - except for Windows line endings that are normalized by Robot Framework.
+        """
+        if content is not None and b'\r' not in content:
+            from robotidy.cache import decode_source
+
+            return decode_source(content)
+        return model_to_text(model)
+
+    def save_model(self, model, text: Optional[str] = None):
+        """ Write ``text`` (serialized ``model``) to the source file of the model. """
+        if not self.overwrite:
+            return
+        if text is None:
+            text = model_to_text(model)
+        write_file(model.source, text)
+
+    def get_diff(self, path: str, old_text: str, new_text: str,
+                 line_range: Optional[Tuple[int, int]] = None) -> Optional[str]:
+        """ Diff of the file. If ``line_range`` with all changes is known, only lines around it are compared. """
         if not self.show_diff:
+            return None
+        old = old_text.splitlines()
+        new = new_text.splitlines()
+        lines = get_diff_lines(old, new, fromfile=f'{path}\tbefore', tofile=f'{path}\tafter', line_range=line_range)
+        return decorate_diff_with_color(lines)
+
+    @staticmethod
+    def output_diff(diff: Optional[str]):
+        if diff is None:
             return
-        old = old_model.text.splitlines()
-        new = new_model.text.splitlines()
-        lines = list(unified_diff(old, new, fromfile=f'{path}\tbefore', tofile=f'{path}\tafter'))
-        colorized_output = decorate_diff_with_color(lines)
         # click.echo(colorized_output, color=True)  # FIXME: does not display colours
-        print(colorized_output)
+        print(diff)
@@ -0,0 +1,468 @@
+"""
+Persistent cache of already formatted files.
+
+Files are identified by the hash of their content. Cache entries are valid only for the pipeline with the same
+fingerprint - robotidy and Robot Framework versions, transformers with their configurables (and the source and
+distribution version of transformers that are not built-in) and global formatting options. If the content hash of a
+file is found in the cache, the file is known to be formatted and it is not parsed nor transformed at all.
+
+The second tier of the cache stores parsed models, keyed only on the content hash and Robot Framework version. It
+is used when the file is not known to be formatted (for example after changing transformer configuration) - instead
+of lexing the file again, the model is rebuilt from the cached tokens. Tokens are stored in compact, column oriented
+and compressed form.
+
+The third tier stores transformed chunks of files - top-level sections or single test cases and keywords (see
+``robotidy.chunks``). Chunk is keyed on its tokens, the pipeline fingerprint and the file-wide facts collected by
+transformers. When only one keyword of a big file was modified, other chunks are taken from the cache and only the
+modified keyword goes through the transformers.
+
+Optionally (for ``--check`` runs on big repositories) the cache keeps also a manifest of files verified as formatted
+with their size, modification time and inode. Files with unchanged stat are reported as formatted without reading
+them.
+
+The cache also records how long it took to process every file. Files transformed in parallel are scheduled by these
+durations, the longest first (see ``robotidy.workers.longest_first``).
+
+The cache is stored in SQLite database so it can be safely used by several robotidy processes at once. The number of
+entries is limited - least recently used entries are evicted first, but parsed models of all files of the current run
+are kept. New entries are saved in batches during the run.
+"""
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import pickle
+import re
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from robotidy.utils import iter_statements
+from robotidy.version import __version__
+
+
+DEFAULT_MAX_SIZE = 100_000
+DEFAULT_MAX_MODELS = 10_000
+DEFAULT_MAX_CHUNKS = 1_000_000
+DEFAULT_MAX_MANIFEST = 200_000
+DEFAULT_MAX_DURATIONS = 200_000
+PICKLE_PROTOCOL = 4
+CACHE_FILE = 'cache.db'
+LOCK_TIMEOUT = 30  # seconds to wait for other robotidy process writing to the cache
+MAX_QUERY_PARAMS = 500
+
+
+def get_cache_dir() -> Path:
+    """ Return user cache directory. Can be overridden with ``ROBOTIDY_CACHE_DIR`` environment variable. """
+    if 'ROBOTIDY_CACHE_DIR' in os.environ:
+        return Path(os.environ['ROBOTIDY_CACHE_DIR'])
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or Path.home() / 'AppData' / 'Local'
+    elif sys.platform == 'darwin':
+        base = Path.home() / 'Library' / 'Caches'
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+    return Path(base, 'robotidy')
+
+
+def get_digest(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def get_rf_version() -> str:
+    """ Read Robot Framework version without importing ``robot`` package (which imports most of Robot Framework). """
+    if 'robot.version' in sys.modules:
+        return sys.modules['robot.version'].VERSION
+    spec = importlib.util.find_spec('robot')
+    if spec is not None and spec.origin:
+        try:
+            with open(Path(spec.origin).parent / 'version.py', encoding='utf-8') as f:
+                match = re.search(r"^VERSION\s*=\s*['\"]([^'\"]+)['\"]", f.read(), re.MULTILINE)
+        except OSError:
+            match = None
+        if match:
+            return match.group(1)
+    from robot.version import VERSION
+
+    return VERSION
+
+
+def get_fingerprint(transformers: List[Tuple[str, List[str]]], formatting_config, registry=None) -> str:
+    """
+    Fingerprint of the formatting pipeline. Files formatted with different pipeline need to be checked again. Code of
+    transformers that are not built-in is identified through ``registry`` (see ``TransformerRegistry.code_version``).
+    """
+    if registry is None:
+        from robotidy.registry import get_registry
+
+        registry = get_registry()
+    pipeline = {
+        'robotidy': __version__,
+        'robotframework': get_rf_version(),
+        'transformers': [[name, list(args), registry.code_version(name)] for name, args in transformers],
+        'formatting': vars(formatting_config)
+    }
+    return get_digest(json.dumps(pipeline, sort_keys=True).encode('utf-8'))
+
+
+class Cache:
+    """
+    Cache of formatted files for the pipeline with given ``fingerprint``, of parsed models and of transformed chunks.
+    Lookups can be done from any thread or process. New entries are collected and saved in one transaction by ``save``.
+    """
+    def __init__(self, cache_dir: Path, fingerprint: str, max_size: int = DEFAULT_MAX_SIZE,
+                 max_models: int = DEFAULT_MAX_MODELS, max_chunks: int = DEFAULT_MAX_CHUNKS,
+                 max_manifest: int = DEFAULT_MAX_MANIFEST, max_durations: int = DEFAULT_MAX_DURATIONS):
+        self.cache_dir = Path(cache_dir)
+        self.path = self.cache_dir / CACHE_FILE
+        self.fingerprint = fingerprint
+        self.max_size = max_size
+        self.max_models = max_models
+        self.max_chunks = max_chunks
+        self.max_manifest = max_manifest
+        self.max_durations = max_durations
+        self.rf_version = get_rf_version()
+        self.error = None
+        self._local = threading.local()
+
+    def __getstate__(self) -> Dict:
+        state = self.__dict__.copy()
+        del state['_local']
+        return state
+
+    def __setstate__(self, state: Dict):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """ SQLite connection can be only used by the thread that created it. """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(str(self.path), timeout=LOCK_TIMEOUT, isolation_level=None)
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS formatted ('
+                'fingerprint TEXT NOT NULL, digest TEXT NOT NULL, last_used REAL NOT NULL, '
+                'PRIMARY KEY (fingerprint, digest))'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS formatted_last_used ON formatted (last_used)')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS models ('
+                'digest TEXT NOT NULL, rf_version TEXT NOT NULL, data BLOB NOT NULL, last_used REAL NOT NULL, '
+                'PRIMARY KEY (digest, rf_version))'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS models_last_used ON models (last_used)')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS chunks ('
+                'key TEXT NOT NULL PRIMARY KEY, data BLOB NOT NULL, last_used REAL NOT NULL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS chunks_last_used ON chunks (last_used)')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS manifest ('
+                'fingerprint TEXT NOT NULL, path TEXT NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, '
+                'inode INTEGER NOT NULL, last_used REAL NOT NULL, PRIMARY KEY (fingerprint, path))'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS manifest_last_used ON manifest (last_used)')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS durations ('
+                'path TEXT NOT NULL PRIMARY KEY, seconds REAL NOT NULL, last_used REAL NOT NULL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS durations_last_used ON durations (last_used)')
+            self._local.connection = connection
+        return connection
+
+    def is_formatted(self, digest: str) -> bool:
+        if self.error:
+            return False
+        try:
+            row = self.connection.execute(
+                'SELECT 1 FROM formatted WHERE fingerprint = ? AND digest = ?', (self.fingerprint, digest)
+            ).fetchone()
+        except (sqlite3.Error, OSError) as err:
+            self.error = str(err)
+            return False
+        return row is not None
+
+    def load_model_data(self, digest: str) -> Optional[bytes]:
+        """ Return serialized tokens of the file with given content digest (see ``serialize_tokens``). """
+        if self.error:
+            return None
+        try:
+            row = self.connection.execute(
+                'SELECT data FROM models WHERE digest = ? AND rf_version = ?', (digest, self.rf_version)
+            ).fetchone()
+        except (sqlite3.Error, OSError) as err:
+            self.error = str(err)
+            return None
+        return row[0] if row is not None else None
+
+    def load_chunks(self, keys: List[str]) -> Dict[str, bytes]:
+        """ Return serialized transformed chunks (see ``serialize_nodes``) found in the cache. """
+        if self.error or not keys:
+            return {}
+        found = {}
+        try:
+            for start in range(0, len(keys), MAX_QUERY_PARAMS):
+                batch = keys[start:start + MAX_QUERY_PARAMS]
+                placeholders = ', '.join('?' * len(batch))
+                found.update(self.connection.execute(
+                    f'SELECT key, data FROM chunks WHERE key IN ({placeholders})', batch
+                ).fetchall())
+        except (sqlite3.Error, OSError) as err:
+            self.error = str(err)
+            return {}
+        return found
+
+    def load_manifest(self) -> Dict[str, Tuple[int, int, int]]:
+        """ Return ``(size, mtime_ns, inode)`` of files verified as formatted, by their absolute paths. """
+        if self.error:
+            return {}
+        try:
+            rows = self.connection.execute(
+                'SELECT path, size, mtime_ns, inode FROM manifest WHERE fingerprint = ?', (self.fingerprint,)
+            ).fetchall()
+        except (sqlite3.Error, OSError) as err:
+            self.error = str(err)
+            return {}
+        return {path: (size, mtime_ns, inode) for path, size, mtime_ns, inode in rows}
+
+    def load_durations(self) -> Dict[str, float]:
+        """ Return seconds it took to process files in the last run, by their absolute paths. """
+        if self.error:
+            return {}
+        try:
+            rows = self.connection.execute('SELECT path, seconds FROM durations').fetchall()
+        except (sqlite3.Error, OSError) as err:
+            self.error = str(err)
+            return {}
+        return dict(rows)
+
+    def save(self, formatted: Iterable[str], models: Optional[Dict[str, Optional[bytes]]] = None,
+             chunks: Optional[Dict[str, Optional[bytes]]] = None,
+             manifest: Optional[Dict[str, Tuple[int, int, int]]] = None,
+             durations: Optional[Dict[str, float]] = None):
+        """
+        Store (or refresh last usage time of) digests of formatted files, parsed models and transformed chunks.
+        ``models`` maps content digest to serialized tokens and ``chunks`` maps chunk key to serialized nodes - value
+        is None if the entry is already cached and only needs to be marked as used. ``manifest`` maps absolute paths
+        of formatted files to their stat (see ``get_stat``) and ``durations`` maps absolute paths of processed files
+        to seconds it took to process them. Least recently used entries above the size limits are evicted.
+        """
+        if self.error:
+            return
+        now = time.time()
+        rows = [(self.fingerprint, digest, now) for digest in formatted]
+        models = models or {}
+        new_models = [(digest, self.rf_version, data, now) for digest, data in models.items() if data is not None]
+        used_models = [(now, digest, self.rf_version) for digest, data in models.items() if data is None]
+        chunks = chunks or {}
+        new_chunks = [(key, data, now) for key, data in chunks.items() if data is not None]
+        used_chunks = [(now, key) for key, data in chunks.items() if data is None]
+        manifest = [(self.fingerprint, path, *stat, now) for path, stat in (manifest or {}).items()]
+        durations = [(path, seconds, now) for path, seconds in (durations or {}).items()]
+        try:
+            connection = self.connection
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                connection.executemany('INSERT OR REPLACE INTO formatted VALUES (?, ?, ?)', rows)
+                connection.executemany('INSERT OR REPLACE INTO models VALUES (?, ?, ?, ?)', new_models)
+                connection.executemany(
+                    'UPDATE models SET last_used = ? WHERE digest = ? AND rf_version = ?', used_models
+                )
+                connection.executemany('INSERT OR REPLACE INTO chunks VALUES (?, ?, ?)', new_chunks)
+                connection.executemany('UPDATE chunks SET last_used = ? WHERE key = ?', used_chunks)
+                connection.executemany('INSERT OR REPLACE INTO manifest VALUES (?, ?, ?, ?, ?, ?)', manifest)
+                connection.executemany('INSERT OR REPLACE INTO durations VALUES (?, ?, ?)', durations)
+                limits = (('formatted', self.max_size), ('models', self.max_models), ('chunks', self.max_chunks),
+                          ('manifest', self.max_manifest), ('durations', self.max_durations))
+                for table, max_size in limits:
+                    connection.execute(
+                        f'DELETE FROM {table} WHERE rowid IN '
+                        f'(SELECT rowid FROM {table} ORDER BY last_used DESC LIMIT -1 OFFSET ?)', (max_size,)
+                    )
+            except sqlite3.Error:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+        except (sqlite3.Error, OSError) as err:
+            self.error = str(err)
+
+    def keep_models(self, count: int):
+        """ Do not evict ``count`` most recently used models - models of all files of the current run are kept. """
+        self.max_models = max(self.max_models, count)
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+def get_stat(source) -> Optional[Tuple[int, int, int]]:
+    try:
+        stat = os.stat(source)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+
+def read_source(source) -> bytes:
+    with open(source, 'rb') as f:
+        return f.read()
+
+
+def decode_source(content: bytes) -> str:
+    return content.decode('utf-8-sig', errors='replace')
+
+
+def serialize_tokens(tokens: List) -> bytes:
+    """ Store tokens column by column (with token types replaced by indexes) and compress them. """
+    types = sorted({token.type for token in tokens})
+    type_index = {token_type: index for index, token_type in enumerate(types)}
+    columns = (
+        types,
+        [type_index[token.type] for token in tokens],
+        [token.value for token in tokens],
+        [token.lineno for token in tokens],
+        [token.col_offset for token in tokens],
+        [token.error for token in tokens]
+    )
+    return zlib.compress(pickle.dumps(columns, protocol=PICKLE_PROTOCOL), 1)
+
+
+def deserialize_tokens(data: bytes) -> List:
+    from robot.api import Token
+
+    types, type_indexes, values, linenos, col_offsets, errors = pickle.loads(zlib.decompress(data))
+    return [Token(types[type_index], value, lineno, col_offset, error)
+            for type_index, value, lineno, col_offset, error in zip(type_indexes, values, linenos, col_offsets, errors)]
+
+
+def tokenize(content: bytes) -> List:
+    from robot.api import get_tokens
+
+    return list(get_tokens(io.BytesIO(content)))
+
+
+def tokens_to_model(tokens: List, source):
+    """
+    Build model from tokens in the same way as ``robot.api.get_model`` does after lexing the file. Uses private
+    functions of Robot Framework parser - if they are not available, the text of the tokens is parsed again.
+    """
+    try:
+        from robot.parsing.parser.parser import _statements_to_model, _tokens_to_statements
+    except ImportError:
+        return _parse_tokens_text(tokens, source)
+    model = _statements_to_model(_tokens_to_statements(tokens), source)
+    model.validate_model()
+    return model
+
+
+def _parse_tokens_text(tokens: List, source):
+    from robot.api import get_model
+
+    model = get_model(io.StringIO(''.join(token.value for token in tokens)))
+    model.source = os.fspath(source)
+    return model
+
+
+def _dump_node(node, tokens: List):
+    """ Store the structure of the node. Tokens of its statements are appended to ``tokens``. """
+    from robot.parsing.model import blocks, statements
+
+    name = type(node).__name__
+    errors = tuple(getattr(node, 'errors', ()))
+    if isinstance(node, statements.Statement):
+        if getattr(statements, name, None) is not type(node):
+            raise TypeError(f'Unknown statement type: {name}')
+        tokens.extend(node.tokens)
+        return name, len(node.tokens), errors
+    if getattr(blocks, name, None) is not type(node):
+        raise TypeError(f'Unknown block type: {name}')
+    fields = []
+    for field in node._fields:
+        value = getattr(node, field, None)
+        if isinstance(value, list):
+            fields.append([_dump_node(child, tokens) for child in value])
+        else:
+            fields.append(_dump_node(value, tokens) if value is not None else None)
+    return name, fields, errors
+
+
+def _load_node(dumped, tokens: Iterator):
+    from robot.parsing.model import blocks, statements
+
+    name, content, errors = dumped
+    if isinstance(content, int):
+        return getattr(statements, name)([next(tokens) for _ in range(content)], errors)
+    node_class = getattr(blocks, name)
+    fields = {}
+    for field, value in zip(node_class._fields, content):
+        if isinstance(value, list):
+            fields[field] = [_load_node(child, tokens) for child in value]
+        else:
+            fields[field] = _load_node(value, tokens) if value is not None else None
+    node = node_class(**fields)
+    if errors:
+        node.errors = errors
+    return node
+
+
+def serialize_nodes(nodes: List) -> Optional[bytes]:
+    """
+    Serialize transformed nodes with their exact structure. Returns None if nodes contain types unknown to
+    Robot Framework (which could not be recreated).
+    """
+    tokens = []
+    try:
+        structure = [_dump_node(node, tokens) for node in nodes]
+    except TypeError:
+        return None
+    return zlib.compress(pickle.dumps((structure, serialize_tokens(tokens)), protocol=PICKLE_PROTOCOL), 1)
+
+
+def deserialize_nodes(data: bytes) -> List:
+    structure, tokens = pickle.loads(zlib.decompress(data))
+    tokens = iter(deserialize_tokens(tokens))
+    return [_load_node(dumped, tokens) for dumped in structure]
+
+
+class ChunkCache:
+    """
+    Transformed chunks of a single file. Chunk key depends on the tokens of the chunk (but not on their position in
+    the file), the pipeline fingerprint and the file-wide ``facts`` collected by transformers.
+    """
+    def __init__(self, cache: Cache, facts: List):
+        self.cache = cache
+        self.prefix = json.dumps([cache.fingerprint, facts], sort_keys=True)
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_key(self, node, context: str) -> str:
+        """ ``context`` describes the position of the node that may affect the transformation. """
+        content = hashlib.sha256(f'{self.prefix}\0{context}\0{type(node).__name__}'.encode('utf-8'))
+        for statement in iter_statements(node):
+            for token in statement.tokens:
+                content.update(f'\0{token.type}\1{token.value}'.encode('utf-8'))
+        return content.hexdigest()
+
+    def load(self, keys: List[str]) -> Dict[str, List]:
+        """ Return transformed nodes found in the cache. """
+        found = {}
+        for key, data in self.cache.load_chunks(keys).items():
+            found[key] = deserialize_nodes(data)
+            self.entries[key] = None
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def store(self, key: str, data: Optional[bytes]):
+        if data is not None:
+            self.entries[key] = data
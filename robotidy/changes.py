@@ -0,0 +1,95 @@
+"""
+Tracking of changes made by transformers.
+
+Transformers that declare ``reports_changes = True`` class attribute call ``mark_changed`` with the original line
+numbers of every node they really change (with ``node_lines`` before they modify the node)::
+
+    class MyTransformer(ModelTransformer):
+        reports_changes = True
+
+        def visit_KeywordCall(self, node):  # noqa
+            if needs_change(node):
+                mark_changed(node_lines(node))
+                ...
+
+If every transformer used for the file reports its changes, the file without any marked change is not serialized,
+compared or written at all, and the diff of the changed file is computed only around the changed lines. Marking a
+change that results in the same text is allowed - the file is then compared as usual.
+"""
+import re
+from difflib import SequenceMatcher, unified_diff
+from typing import Iterable, List, Optional, Tuple
+
+from robotidy.context import current_context
+
+
+DIFF_CONTEXT = 3
+HUNK_HEADER = re.compile(r'^@@ -(\d+)(,\d+)? \+(\d+)(,\d+)? @@')
+
+
+def node_lines(node) -> Tuple[int, int]:
+    """ Lines of the node (or token) - new nodes created by transformers do not have line numbers (-1). """
+    return node.lineno, getattr(node, 'end_lineno', node.lineno)
+
+
+def mark_changed(lines: Tuple[int, int]):
+    context = current_context()
+    if context is not None:
+        context.changes.mark(*lines)
+
+
+def reports_changes(transformers: Iterable) -> bool:
+    return all(getattr(transformer, 'reports_changes', False) for transformer in transformers)
+
+
+def get_diff_lines(old: List[str], new: List[str], fromfile: str, tofile: str,
+                   line_range: Optional[Tuple[int, int]] = None) -> List[str]:
+    """
+    Unified diff of ``old`` and ``new`` lines. If lines outside of ``line_range`` of ``old`` are known to be
+    unchanged, only the lines around the range are compared.
+    """
+    if line_range is None:
+        return list(unified_diff(old, new, fromfile=fromfile, tofile=tofile))
+    start = max(line_range[0] - 1 - DIFF_CONTEXT, 0)
+    suffix = max(len(old) - line_range[1] - DIFF_CONTEXT, 0)
+    new_end = len(new) - suffix
+    if new_end < start or old[:start] != new[:start] or old[len(old) - suffix:] != new[new_end:]:
+        return list(unified_diff(old, new, fromfile=fromfile, tofile=tofile))
+    lines = list(unified_diff(old[start:len(old) - suffix], new[start:new_end], fromfile=fromfile, tofile=tofile))
+    return [shift_hunk_header(line, start) for line in lines]
+
+
+def shift_hunk_header(line: str, offset: int) -> str:
+    match = HUNK_HEADER.match(line)
+    if match is None or not offset:
+        return line
+    old_start, old_length, new_start, new_length = match.groups()
+    return f'@@ -{int(old_start) + offset}{old_length or ""} +{int(new_start) + offset}{new_length or ""} @@' \
+        + line[match.end():]
+
+
+def keep_changes_in_ranges(old_text: str, new_text: str, line_ranges: List[Tuple[int, int]]) -> str:
+    """
+    ``new_text`` with only the changes that touch ``line_ranges`` of ``old_text`` - other lines keep their original
+    content. Used with ``--staged`` so transformers that do not check selected lines can not change other lines.
+    Line endings are taken from ``new_text``.
+    """
+    old = old_text.splitlines(keepends=True)
+    new = new_text.splitlines(keepends=True)
+    eol = next((line[len(line.rstrip('\r\n')):] for line in new if line.endswith('\n')), '\n')
+    matcher = SequenceMatcher(None, [line.rstrip('\r\n') for line in old], [line.rstrip('\r\n') for line in new],
+                              autojunk=False)
+    lines = []
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        # lines removed or replaced in the old text, or the lines around the place of inserted lines
+        first, last = (old_start + 1, old_end) if old_end > old_start else (old_start, old_start + 1)
+        if tag == 'equal' or any(start <= last and first <= end for start, end in line_ranges):
+            lines.extend(new[new_start:new_end])
+        else:
+            lines.extend(with_line_ending(line, eol) for line in old[old_start:old_end])
+    return ''.join(lines)
+
+
+def with_line_ending(line: str, eol: str) -> str:
+    content = line.rstrip('\r\n')
+    return content + eol if content != line else line
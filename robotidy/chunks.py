@@ -0,0 +1,280 @@
+"""
+Transforming a single file in chunks - processed concurrently or taken from the cache of transformed chunks.
+
+Transformers declare with ``scope`` class attribute how much of the file they need to see:
+
+- ``file`` (default) - transformer needs the whole file (for example it collects file-wide statistics),
+- ``section`` - transformer only needs the section it transforms (for example aligns the whole section),
+- ``block`` - transformer only needs the single test case, keyword or statement it transforms.
+
+Transformers can also implement following hooks:
+
+- ``prefilter(text)`` - called with the content of the file before it is parsed. Returns False if the transformer
+  can not change the file (also after it is transformed by transformers running before it) - then the transformer
+  is not used for this file. File is not parsed at all if no transformer is left,
+- ``prepare(model)`` - called once per file, before any transformer runs. It collects file-wide facts (and stores
+  them in ``FileState`` attributes, facts shared by transformers are read with ``robotidy.facts.get_facts``) so the
+  transformer does not need the whole file later. Returned value has to be JSON serializable - it is a part of the
+  cache key of transformed chunks,
+- ``transform_section_shell(section)`` - does the section level work of ``section`` scoped transformer (for example
+  trims empty lines around the section) without visiting test cases and keywords. Returns the section or None if it
+  should be removed,
+- ``finalize(model)`` - called with the whole model after all chunks were transformed.
+
+Consecutive transformers with ``section`` or ``block`` scope form a stage. Every section is a chunk. Test case and
+keyword sections are split further into the header and separate test cases and keywords if every transformer in the
+stage allows it: it has ``block`` scope, it does not handle this type of section or it implements
+``transform_section_shell`` (shells are transformed before the chunks). Chunks are transformed and stitched back in
+the original order. Transformers with ``file`` scope run over the whole model, one after another. Transformers of
+the stage transform the chunk in a single walk (see ``robotidy.pipeline``).
+"""
+import math
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from robotidy.context import current_context
+from robotidy.facts import collect_facts, needed_facts
+from robotidy.pipeline import get_visitor, transform_sections
+
+
+SCOPE_FILE = 'file'
+SCOPE_SECTION = 'section'
+SCOPE_BLOCK = 'block'
+SCOPES = (SCOPE_FILE, SCOPE_SECTION, SCOPE_BLOCK)
+CHUNKS_PER_WORKER = 2
+
+
+def get_scope(transformer) -> str:
+    scope = getattr(transformer, 'scope', SCOPE_FILE)
+    if scope not in SCOPES:
+        raise ValueError(f"Invalid scope '{scope}' of {type(transformer).__name__} transformer. "
+                         f"Possible values: {', '.join(SCOPES)}")
+    return scope
+
+
+def split_stages(transformers: Iterable) -> List[Tuple[str, List]]:
+    """
+    Group consecutive transformers into stages that can be run over the model at once.
+    Every transformer with ``file`` scope is a separate stage.
+    """
+    stages = []
+    for transformer in transformers:
+        scope = get_scope(transformer)
+        if scope == SCOPE_FILE or not stages or stages[-1][0] == SCOPE_FILE:
+            stages.append((scope, [transformer]))
+            continue
+        stage_scope = SCOPE_SECTION if SCOPE_SECTION in (scope, stages[-1][0]) else SCOPE_BLOCK
+        stages[-1] = (stage_scope, stages[-1][1] + [transformer])
+    return stages
+
+
+def prefilter_transformers(text: str, transformers: Iterable) -> List:
+    """ Drop transformers that can not change the file with ``text`` content according to their ``prefilter``. """
+    return [transformer for transformer in transformers
+            if not hasattr(transformer, 'prefilter') or transformer.prefilter(text)]
+
+
+def prepare_transformers(model, transformers: Iterable) -> List:
+    """
+    Let transformers collect file-wide facts from the model. Facts declared by transformers are collected in one
+    analysis pass first (see ``robotidy.facts``). Returns the list of facts returned by ``prepare`` hooks.
+    """
+    transformers = list(transformers)
+    context = current_context()
+    if context is not None:
+        context.facts = collect_facts(model, needed_facts(transformers))
+    return [transformer.prepare(model) if hasattr(transformer, 'prepare') else None for transformer in transformers]
+
+
+def finalize_transformers(model, transformers: Iterable):
+    for transformer in transformers:
+        if hasattr(transformer, 'finalize'):
+            transformer.finalize(model)
+
+
+def handles(transformer, node_class) -> bool:
+    """ Check if transformer has visitor method for ``node_class`` or any of its base classes. """
+    return any(hasattr(transformer, f'visit_{cls.__name__}') for cls in node_class.__mro__[:-2])
+
+
+def can_split(section, transformers) -> bool:
+    from robot.api.parsing import KeywordSection, TestCaseSection
+
+    if not isinstance(section, (TestCaseSection, KeywordSection)) or not section.body:
+        return False
+    for transformer in transformers:
+        if get_scope(transformer) == SCOPE_SECTION and handles(transformer, type(section)) \
+                and not hasattr(transformer, 'transform_section_shell'):
+            return False
+    return True
+
+
+def transform_section_shell(section, transformers):
+    for transformer in transformers:
+        if hasattr(transformer, 'transform_section_shell'):
+            section = transformer.transform_section_shell(section)
+            if section is None:
+                return None
+    return section
+
+
+def transform_node(node, transformers) -> List:
+    """
+    Run transformers one after another on ``node`` (in a single walk). Returns list of resulting nodes - transformer
+    can remove the node (by returning None) or replace it with several nodes.
+    """
+    return get_visitor(transformers).visit(node)
+
+
+def _transform_chunk(nodes, transformers, context, serialize, stop=None):
+    def transform():
+        results = []
+        for node in nodes:
+            if stop is not None and stop():
+                break
+            results.append(transform_node(node, transformers))
+        if serialize is None:
+            return results, None
+        return results, [serialize(result) for result in results]
+
+    if context is None:
+        return transform()
+    with context:
+        return transform()
+
+
+class _Item:
+    """ Node of the model transformed as a single unit. Cache key is None if it is not worth caching. """
+    def __init__(self, node, key: Optional[str] = None):
+        self.node = node
+        self.key = key
+        self.result = None
+
+
+def _plan_stage(model, transformers, chunk_cache) -> List[Tuple]:
+    """ Split the model into items. Returns list of (section, items) pairs - section is None if not split. """
+    from robot.parsing.model.blocks import Block
+
+    plan = []
+    for section in model.sections:
+        if not can_split(section, transformers):
+            key = chunk_cache.get_key(section, 'section') if chunk_cache is not None else None
+            plan.append((None, [_Item(section, key)]))
+            continue
+        last = section.body[-1]
+        section = transform_section_shell(section, transformers)
+        if section is None:
+            continue
+        items = [_Item(section.header)] if section.header is not None else []
+        for node in section.body:
+            key = None
+            if chunk_cache is not None and isinstance(node, Block):
+                key = chunk_cache.get_key(node, f'{type(section).__name__}:{node is last}')
+            items.append(_Item(node, key))
+        plan.append((section, items))
+    return plan
+
+
+def transform_stage(model, transformers, executor=None, workers: int = 1, chunk_cache=None, stop=None) -> bool:
+    """
+    Transform ``model`` with transformers of the stage. If ``stop`` is given, it is called before every chunk and the
+    remaining chunks are left as they are once it returns True. Returns False if the stage was stopped this way.
+    """
+    if executor is None and chunk_cache is None and stop is None:
+        transform_sections(model, transformers)
+        finalize_transformers(model, transformers)
+        return True
+    plan = _plan_stage(model, transformers, chunk_cache)
+    items = [item for _, section_items in plan for item in section_items]
+    if chunk_cache is not None:
+        cached = chunk_cache.load([item.key for item in items if item.key is not None])
+        for item in items:
+            if item.key in cached:
+                item.result = cached[item.key]
+    pending = [item for item in items if item.result is None]
+    completed = _transform_items(pending, transformers, executor, workers, chunk_cache, stop)
+    sections = []
+    for section, section_items in plan:
+        if section is None:
+            sections.extend(section_items[0].result)
+            continue
+        if section.header is not None:
+            header, *section_items = section_items
+            section.header = header.result[0] if header.result else None
+        section.body = [node for item in section_items for node in item.result]
+        sections.append(section)
+    model.sections = sections
+    if not completed:
+        return False
+    finalize_transformers(model, transformers)
+    return True
+
+
+def _transform_items(items: List[_Item], transformers, executor, workers: int, chunk_cache, stop=None) -> bool:
+    """ Transform ``items`` in chunks. Items left after ``stop`` returned True keep their node as the result. """
+    if not items:
+        return True
+    context = current_context()
+    serialize = None
+    if chunk_cache is not None:
+        from robotidy.cache import serialize_nodes
+
+        serialize = serialize_nodes
+    if executor is None:
+        chunks = [items]
+    else:
+        chunk_size = math.ceil(len(items) / (workers * CHUNKS_PER_WORKER))
+        chunks = [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)]
+    futures = []
+    for chunk in chunks:
+        nodes = [item.node for item in chunk]
+        if executor is None:
+            futures.append(_transform_chunk(nodes, transformers, context, serialize, stop))
+        else:
+            futures.append(executor.submit(_transform_chunk, nodes, transformers, context, serialize, stop))
+    completed = True
+    for chunk, future in zip(chunks, futures):
+        if executor is None:
+            results, serialized = future
+        elif completed or not future.cancel():
+            results, serialized = future.result()
+        else:
+            results, serialized = [], None
+        for index, item in enumerate(chunk):
+            if index >= len(results):
+                # not transformed - the chunk was stopped
+                item.result = [item.node]
+                completed = False
+                continue
+            item.result = results[index]
+            if item.key is not None:
+                chunk_cache.store(item.key, serialized[index])
+    return completed
+
+
+def transform_in_chunks(model, transformers: Iterable, executor=None, workers: int = 1, chunk_cache=None,
+                        facts: Optional[List] = None, stop: Optional[Callable[[], bool]] = None) -> bool:
+    """
+    Transform ``model`` with ``transformers``, running chunkable stages on ``executor`` (or in the current thread
+    if it is not given). Transformed chunks are taken from and stored in ``chunk_cache`` if it is given - it is used
+    only if there are no transformers with ``file`` scope. Transformers are prepared with the model unless ``facts``
+    collected from already prepared transformers are passed.
+
+    ``stop`` is called between stages and between chunks of the stage - the rest of the model is not transformed
+    once it returns True. It has to be cheap, as it is called often. Returns False if the transformation was stopped
+    this way (the model is then only partially transformed).
+    """
+    transformers = list(transformers)
+    if facts is None:
+        prepare_transformers(model, transformers)
+    stages = split_stages(transformers)
+    if len(stages) != 1 or stages[0][0] == SCOPE_FILE:
+        chunk_cache = None
+    for index, (scope, stage) in enumerate(stages):
+        if scope == SCOPE_FILE:
+            for transformer in stage:
+                get_visitor([transformer]).visit(model)
+        elif not transform_stage(model, stage, executor, workers, chunk_cache, stop):
+            return False
+        if stop is not None and index < len(stages) - 1 and stop():
+            return False
+    return True
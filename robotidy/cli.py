@@ -5,19 +5,31 @@ from typing import (
     Iterator,
     Iterable,
     Optional,
-    Any
+    Pattern,
+    Any,
+    Callable
 )
 from pathlib import Path
+import os
+import re
 import click
-import toml
 
 from robotidy.version import __version__
 from robotidy.app import Robotidy
-from robotidy.transformers import load_transformers
+from robotidy.config import FORMATTING_OPTIONS, ConfigResolver, get_transformers, parse_config, read_config_file
+from robotidy.files import DEFAULT_EXCLUDES, get_paths, read_file_list
+from robotidy.git import GitError, get_changed_files, get_staged_files
+from robotidy.registry import TransformerRegistry
+from robotidy.report import Report, merge_reports, parse_shard, select_shard
 from robotidy.utils import GlobalFormattingConfig, split_args_from_name_or_path
+from robotidy.workers import get_workers_count, gil_enabled
+
+try:
+    from click.core import ParameterSource
+except ImportError:  # Click < 8.0 does not tell where the value of the option comes from
+    ParameterSource = None
 
 
-INCLUDE_EXT = ('.robot', '.resource')
 HELP_MSG = f"""
 Version: {__version__}
 
@@ -76,6 +88,18 @@ class TransformType(click.ParamType):
         return name, args
 
 
+class WorkersType(click.ParamType):
+    name = "workers"
+
+    def convert(self, value, param, ctx):
+        if isinstance(value, int):
+            return value
+        try:
+            return get_workers_count(value)
+        except ValueError:
+            self.fail(f"{value!r} is not a positive integer or 'auto'", param, ctx)
+
+
 def find_project_root(srcs: Iterable[str]) -> Path:
     """Return a directory containing .git, or robotidy.toml.
     That directory will be a common parent of all files and directories
@@ -86,18 +110,13 @@ def find_project_root(srcs: Iterable[str]) -> Path:
     if not srcs:
         return Path("/").resolve()
 
-    path_srcs = [Path(Path.cwd(), src).resolve() for src in srcs]
-
-    # A list of lists of parents for each 'src'. 'src' is included as a
-    # "parent" of itself if it is a directory
-    src_parents = [
-        list(path.parents) + ([path] if path.is_dir() else []) for path in path_srcs
-    ]
-
-    common_base = max(
-        set.intersection(*(set(parents) for parents in src_parents)),
-        key=lambda path: path.parts,
-    )
+    # common parent of all sources - 'src' is its own "parent" if it is a directory
+    common_base = None
+    for src in srcs:
+        path = os.path.realpath(os.path.join(os.getcwd(), src))
+        base = path if os.path.isdir(path) else os.path.dirname(path)
+        common_base = base if common_base is None else os.path.commonpath([common_base, base])
+    common_base = Path(common_base)
 
     for directory in (common_base, *common_base.parents):
         if (directory / ".git").exists():
@@ -121,12 +140,7 @@ def read_config(ctx: click.Context, param: click.Parameter, value: Optional[str]
         value = find_config(ctx.params.get("src", ()))
         if value is None:
             return None
-    try:
-        config = parse_config(value)
-    except (toml.TomlDecodeError, OSError) as e:
-        raise click.FileError(
-            filename=value, hint=f"Error reading configuration file: {e}"
-        )
+    config = read_config_file(value)
     click.echo(f'Reading config from {value}')
     if not config:
         return None
@@ -144,44 +158,123 @@ def read_config(ctx: click.Context, param: click.Parameter, value: Optional[str]
         default_map.update(ctx.default_map)
     default_map.update(config.get('main', {}))
 
-    transformers = []
-    for transformer, configurables in config.get('transformers', {}).items():
-        if configurables:
-            transformer += ':' + ':'.join(f'{key}={value}' for key, value in configurables.items())
-        transformers.append(transformer)
-    default_map['transform'] = transformers
+    default_map['transform'] = get_transformers(config)
 
     ctx.default_map = default_map
     return value
 
 
-def parse_config(path: str) -> Dict[str, Any]:
-    config = toml.load(path)
-    return {k.replace('--', '').replace('-', '_'): v for k, v in config.items()}
+def from_command_line(ctx: click.Context, name: str) -> bool:
+    return ctx.get_parameter_source(name) == ParameterSource.COMMANDLINE
+
+
+def get_config_resolver(ctx: click.Context, transform: List[Tuple[str, Dict]],
+                        registry: Optional[TransformerRegistry] = None) -> Optional[ConfigResolver]:
+    """ Resolver of the nearest configuration file for every source. Not used if --config was given. """
+    if ParameterSource is None or from_command_line(ctx, 'config'):
+        return None
+    # defaults of the options themselves - not from the configuration file (``ctx.default_map``)
+    plain_ctx = click.Context(ctx.command)
+    defaults = {param.name: param.get_default(plain_ctx) for param in ctx.command.params
+                if param.name in FORMATTING_OPTIONS}
+    overrides = {name: ctx.params[name] for name in FORMATTING_OPTIONS if from_command_line(ctx, name)}
+    transformers = list(transform) if from_command_line(ctx, 'transform') else None
+    return ConfigResolver(defaults, overrides, transformers, registry)
+
+
+def iterate_sources(src: Tuple[str, ...], files_from: Optional[str], null: bool) -> Iterator[str]:
+    """ Sources from the command line followed by sources read from --files-from. """
+    yield from src
+    if files_from is None:
+        return
+    if files_from == '-':
+        yield from read_file_list(click.get_binary_stream('stdin'), null)
+        return
+    with open(files_from, 'rb') as f:
+        yield from read_file_list(f, null)
+
+
+def report_missing(missing: List[str]) -> Callable[[str], None]:
+    """ Report sources that do not exist while the files are discovered and collect them in ``missing``. """
+    def report(source: str):
+        click.echo(f"Path '{source}' does not exist", err=True)
+        missing.append(source)
+    return report
+
+
+def validate_shard(ctx: click.Context, param: click.Parameter, value: Optional[str]) -> Optional[Tuple[int, int]]:
+    if value is None:
+        return None
+    try:
+        return parse_shard(value)
+    except ValueError as err:
+        raise click.BadParameter(str(err)) from None
+
+
+def print_merged_reports(paths: Tuple[str, ...]) -> int:
+    merged = merge_reports(paths)
+    changed = merged.changed
+    for path in changed:
+        click.echo(f'Changed: {path}')
+    click.echo(f'{len(merged.files)} files in {len(paths)} reports, {len(changed)} changed')
+    if merged.errors:
+        raise click.ClickException('\n'.join(merged.errors))
+    return merged.status
+
+
+def validate_address(ctx: click.Context, param: click.Parameter, value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return None
+    from robotidy.distributed import parse_address
+
+    try:
+        parse_address(value)
+    except ValueError as err:
+        raise click.BadParameter(str(err)) from None
+    return value
+
+
+def run_remote_workers(address: str, src: Tuple[str, ...], workers: int, verbose: bool):
+    """ Transform files served by the coordinator (``--connect``) from the project with ``src`` sources. """
+    from robotidy.distributed import DistributedError, run_workers
+
+    try:
+        count = run_workers(address, find_project_root(src or (os.getcwd(),)), workers)
+    except (OSError, DistributedError) as err:
+        raise click.ClickException(f'Failed to transform files served on {address}: {err}')
+    if verbose:
+        click.echo(f'Transformed {count} files served on {address}')
+
+
+def get_coordinator(address: str, root: Path, timeout: int):
+    """ Coordinator listening on ``address`` (``--serve``). Actual address is printed for workers to connect. """
+    from robotidy.distributed import Coordinator
 
+    coordinator = Coordinator(address, root, timeout or None)
+    try:
+        coordinator.listen()
+    except OSError as err:
+        raise click.ClickException(f'Failed to listen on {address}: {err}')
+    click.echo(f'Serving files on {coordinator.bound_address}', err=True)
+    return coordinator
 
-def iterate_dir(paths: Iterable[Path]) -> Iterator[Path]:
-    for path in paths:
-        if path.is_file():
-            if path.suffix not in INCLUDE_EXT:
-                continue
-            yield path
-        elif path.is_dir():
-            yield from iterate_dir(path.iterdir())
 
+def transform_served_files(tidy: Robotidy) -> int:
+    from robotidy.distributed import DistributedError
 
-def get_paths(src: Tuple[str, ...]):
-    sources = set()
-    for s in src:
-        path = Path(s).resolve()
-        if path.is_file():
-            sources.add(path)
-        elif path.is_dir():
-            sources.update(iterate_dir(path.iterdir()))
-        elif s == '-':
-            sources.add(path)
+    try:
+        return tidy.transform_files()
+    except DistributedError as err:
+        raise click.ClickException(str(err))
 
-    return sources
+
+def validate_regex(ctx: click.Context, param: click.Parameter, value: Optional[str]) -> Optional[Pattern]:
+    if value is None:
+        return None
+    try:
+        return re.compile(value)
+    except re.error as err:
+        raise click.BadParameter(f'Not a valid regular expression: {err}') from None
 
 
 @click.command(cls=RawHelp, help=HELP_MSG, epilog=EPILOG)
@@ -196,11 +289,120 @@ def get_paths(src: Tuple[str, ...]):
     "src",
     nargs=-1,
     type=click.Path(
-        exists=True, file_okay=True, dir_okay=True, readable=True, allow_dash=True
+        file_okay=True, dir_okay=True, readable=True, allow_dash=True
     ),
     is_eager=True,
     metavar='[PATH(S)]'
 )
+@click.option(
+    '--exclude',
+    type=str,
+    default=DEFAULT_EXCLUDES,
+    callback=validate_regex,
+    metavar='REGEX',
+    help="A regular expression that matches files and directories that should be excluded from the recursive "
+         "search. Paths are relative to the project root and use / as separator, directories end with /.",
+    show_default=True
+)
+@click.option(
+    '--files-from',
+    type=click.Path(exists=True, file_okay=True, dir_okay=False, readable=True, allow_dash=True),
+    default=None,
+    metavar='PATH|-',
+    help="Read paths of files and directories to transform from the file (or standard input if -), one path per "
+         "line. Paths are read while files are transformed. Paths that do not exist are reported and skipped, and "
+         "the exit status is 2 after other files are transformed - the same as for [PATH(S)].",
+)
+@click.option(
+    '-0',
+    '--null',
+    is_flag=True,
+    help="Paths in --files-from are separated by NUL character instead of new line.",
+    show_default=True
+)
+@click.option(
+    '--changed-since',
+    type=str,
+    default=None,
+    metavar='REF',
+    help="Transform only files changed since git REF (in commits, staged or not) and untracked files. Changed "
+         "files are still filtered by [PATH(S)] and exclude options. Current directory is used if no [PATH(S)] "
+         "are given.",
+)
+@click.option(
+    '--staged',
+    is_flag=True,
+    help="Transform only lines of hunks staged in git. Content of files is read from the git index. Files are "
+         "overwritten only if they do not have other, not staged changes.",
+    show_default=True
+)
+@click.option(
+    '--extend-exclude',
+    type=str,
+    default=None,
+    callback=validate_regex,
+    metavar='REGEX',
+    help="Like --exclude, but adds additional files and directories on top of the excluded ones.",
+)
+@click.option(
+    '--skip-gitignore',
+    is_flag=True,
+    help="Do not exclude files and directories ignored by .gitignore files.",
+    show_default=True
+)
+@click.option(
+    '--shard',
+    type=str,
+    default=None,
+    callback=validate_shard,
+    metavar='INDEX/COUNT',
+    help="Transform only files from INDEX shard (starting from 1) of COUNT shards. Files are assigned to shards by "
+         "the hash of their path relative to the project root, so separate runs (for example on different CI "
+         "nodes) get disjoint sets of files.",
+)
+@click.option(
+    '--report',
+    type=click.Path(file_okay=True, dir_okay=False, writable=True, path_type=str),
+    default=None,
+    metavar='FILE',
+    help="Save paths of transformed files (with information if they were changed) and return status to JSON FILE.",
+)
+@click.option(
+    '--merge-reports',
+    type=click.Path(exists=True, file_okay=True, dir_okay=False, readable=True, path_type=str),
+    multiple=True,
+    metavar='FILE',
+    help="Merge JSON reports saved with --report (for example by all shards), print changed files and exit with "
+         "the combined return status.",
+)
+@click.option(
+    '--serve',
+    type=str,
+    default=None,
+    callback=validate_address,
+    metavar='HOST:PORT|unix:PATH',
+    help="Do not transform files but serve them to workers started with --connect (possibly on other hosts, with "
+         "the same project). Results are reported as if files were transformed locally. Use port 0 to select any "
+         "free port.",
+)
+@click.option(
+    '--serve-timeout',
+    type=click.IntRange(min=0),
+    default=60,
+    metavar='SECONDS',
+    help="Fail --serve if no worker is connected for SECONDS seconds while there are files left. Use 0 to wait "
+         "forever.",
+    show_default=True
+)
+@click.option(
+    '--connect',
+    type=str,
+    default=None,
+    callback=validate_address,
+    metavar='HOST:PORT|unix:PATH',
+    help="Transform files served with --serve until there are no files left. Files are read from the project of "
+         "[PATH(S)] (or current directory). Use --workers to start several workers.",
+)
 @click.option(
     '--overwrite/--no-overwrite',
     default=True,
@@ -220,6 +422,12 @@ def get_paths(src: Tuple[str, ...]):
          "Return code 1 means that at least 1 file would change. Any internal error will overwrite this status.",
     show_default=True
 )
+@click.option(
+    '--fail-fast',
+    is_flag=True,
+    help="Stop at the first file that would be changed. Requires --check.",
+    show_default=True
+)
 @click.option(
     '-s',
     '--spacecount',
@@ -264,6 +472,70 @@ def get_paths(src: Tuple[str, ...]):
          "Line numbers start from 1.",
     show_default=True
 )
+@click.option(
+    '-w',
+    '--workers',
+    type=WorkersType(),
+    default='1',
+    metavar='N|auto',
+    help="Number of worker processes used to transform files. "
+         "'auto' uses all CPUs available to the process (respecting the cgroup CPU quota).",
+    show_default=True
+)
+@click.option(
+    '--threads',
+    type=WorkersType(),
+    default='1',
+    metavar='N|auto',
+    help="Number of threads used to transform files. Threads share loaded transformers and run in parallel "
+         "only on free-threaded (no GIL) Python builds. Cannot be used together with --workers.",
+    show_default=True
+)
+@click.option(
+    '--chunk-threshold',
+    type=click.IntRange(min=1),
+    default=None,
+    metavar='LINES',
+    help="Transform files longer than LINES in chunks (sections, test cases and keywords) processed concurrently "
+         "by --threads threads. Transformers that need the whole file still run over the whole file. Used only on "
+         "free-threaded Python builds with GIL disabled - otherwise files are not split.",
+)
+@click.option(
+    '--cache/--no-cache',
+    default=False,
+    help="Skip files that are known to be already formatted with the same version and configuration. "
+         "Hash of the content of formatted files is stored in the cache directory.",
+    show_default=True
+)
+@click.option(
+    '--cache-dir',
+    type=click.Path(file_okay=False, dir_okay=True, writable=True, path_type=str),
+    default=None,
+    metavar='DIRECTORY',
+    help="Directory where the --cache is stored. Defaults to user cache directory or ROBOTIDY_CACHE_DIR "
+         "environment variable."
+)
+@click.option(
+    '--cache-chunks',
+    is_flag=True,
+    help="Cache also transformed sections, test cases and keywords. When the file was modified, only changed "
+         "sections, test cases and keywords are transformed again. Requires --cache.",
+    show_default=True
+)
+@click.option(
+    '--cache-stat',
+    is_flag=True,
+    help="Report files with the same size, modification time and inode as when they were last verified as "
+         "formatted without reading them. Requires --cache.",
+    show_default=True
+)
+@click.option(
+    '--fsync',
+    is_flag=True,
+    help="Flush overwritten files to the disk before exiting. Files are synced together after all files are "
+         "transformed instead of one by one.",
+    show_default=True
+)
 @click.option(
     '-v',
     '--verbose',
@@ -302,9 +574,23 @@ def cli(
         ctx: click.Context,
         transform: List[Tuple[str, Dict]],
         src: Tuple[str, ...],
+        files_from: Optional[str],
+        null: bool,
+        changed_since: Optional[str],
+        staged: bool,
+        exclude: Optional[Pattern],
+        extend_exclude: Optional[Pattern],
+        skip_gitignore: bool,
+        shard: Optional[Tuple[int, int]],
+        report: Optional[str],
+        merge_reports: Tuple[str, ...],
+        serve: Optional[str],
+        serve_timeout: int,
+        connect: Optional[str],
         overwrite: bool,
         diff: bool,
         check: bool,
+        fail_fast: bool,
         spacecount: int,
         lineseparator: str,
         usepipes: bool,
@@ -312,26 +598,77 @@ def cli(
         config: Optional[str],
         startline: Optional[int],
         endline: Optional[int],
+        workers: int,
+        threads: int,
+        chunk_threshold: Optional[int],
+        cache: bool,
+        cache_dir: Optional[str],
+        cache_chunks: bool,
+        cache_stat: bool,
+        fsync: bool,
         list_transformers: bool,
         describe_transformer: Optional[str]
 ):
+    if cache and not cache_dir:
+        from robotidy.cache import get_cache_dir
+
+        cache_dir = get_cache_dir()
+    cache_dir = Path(cache_dir) if cache else None
+    registry = TransformerRegistry(cache_dir)
     if list_transformers:
-        transformers = load_transformers(None)
         click.echo('Run --describe-transformer <transformer_name> to get more details. Transformers:')
-        for transformer in transformers:
+        for transformer in registry.names():
             click.echo(transformer)
         ctx.exit(0)
     if describe_transformer is not None:
-        transformers = load_transformers(None)
-        if describe_transformer in transformers:
+        metadata = registry.metadata(describe_transformer)
+        if metadata is not None:
             click.echo(f"Transformer {describe_transformer}:")
-            click.echo(transformers[describe_transformer].__doc__)
+            click.echo(metadata.doc)
         else:
             click.echo(f"Transformer with the name '{describe_transformer}' does not exist")
         ctx.exit(0)
+    if merge_reports:
+        ctx.exit(print_merged_reports(merge_reports))
+    if connect is not None:
+        run_remote_workers(connect, src, workers, verbose)
+        ctx.exit(0)
 
     if config and verbose:
         click.echo(f'Loaded {config} configuration file')
+    for name, args in transform:
+        registry.validate(name, args)
+    if workers > 1 and threads > 1:
+        raise click.BadOptionUsage(option_name='threads', message='--workers and --threads cannot be used together')
+    if chunk_threshold and threads == 1:
+        raise click.BadOptionUsage(option_name='chunk_threshold', message='--chunk-threshold requires --threads')
+    if cache_chunks and not cache:
+        raise click.BadOptionUsage(option_name='cache_chunks', message='--cache-chunks requires --cache')
+    if cache_stat and not cache:
+        raise click.BadOptionUsage(option_name='cache_stat', message='--cache-stat requires --cache')
+    if staged and changed_since is not None:
+        raise click.BadOptionUsage(option_name='staged',
+                                   message='--staged and --changed-since cannot be used together')
+    if staged and (startline is not None or endline is not None):
+        raise click.BadOptionUsage(option_name='staged',
+                                   message='--staged cannot be used with --startline or --endline')
+    if staged and cache_stat:
+        raise click.BadOptionUsage(option_name='staged', message='--staged cannot be used with --cache-stat')
+    if serve is not None and (workers > 1 or threads > 1):
+        raise click.BadOptionUsage(option_name='serve', message='--serve cannot be used with --workers or --threads')
+    if serve is not None and (cache or staged):
+        raise click.BadOptionUsage(option_name='serve', message='--serve cannot be used with --cache or --staged')
+    if fail_fast and not check:
+        raise click.BadOptionUsage(option_name='fail_fast', message='--fail-fast requires --check')
+    if null and files_from is None:
+        raise click.BadOptionUsage(option_name='null', message='-0 / --null requires --files-from')
+    if threads > 1 and verbose and gil_enabled():
+        click.echo('Running --threads with GIL enabled. Files will not be transformed in parallel')
+    if chunk_threshold and gil_enabled():
+        # chunks of the file are not transformed in parallel - splitting would only add overhead
+        click.echo('--chunk-threshold is ignored with GIL enabled. Files are split into chunks only on free-threaded '
+                   'Python builds', err=True)
+        chunk_threshold = None
 
     formatting_config = GlobalFormattingConfig(
         use_pipes=usepipes,
@@ -340,7 +677,23 @@ def cli(
         start_line=startline,
         end_line=endline
     )
-    sources = get_paths(src)
+    root = find_project_root(src or (os.getcwd(),))
+    changed, staged_files = None, None
+    try:
+        if changed_since is not None:
+            changed = get_changed_files(changed_since, str(root))
+        elif staged:
+            staged_files = get_staged_files(str(root))
+            changed = set(staged_files)
+    except GitError as err:
+        raise click.UsageError(str(err))
+    if changed is not None and not src and files_from is None:
+        src = (os.getcwd(),)
+    missing = []
+    sources = get_paths(iterate_sources(src, files_from, null), root, exclude, extend_exclude, not skip_gitignore,
+                        on_missing=report_missing(missing), only=changed)
+    if shard is not None:
+        sources = select_shard(sources, root, *shard)
     tidy = Robotidy(
         transformers=transform,
         src=sources,
@@ -348,7 +701,24 @@ def cli(
         show_diff=diff,
         formatting_config=formatting_config,
         verbose=verbose,
-        check=check
+        check=check,
+        workers=workers,
+        threads=threads,
+        chunk_threshold=chunk_threshold,
+        cache_dir=cache_dir,
+        cache_chunks=cache_chunks,
+        cache_stat=cache_stat,
+        registry=registry,
+        fsync=fsync,
+        config=config,
+        config_resolver=get_config_resolver(ctx, transform, registry),
+        staged=staged_files,
+        report=Report(report, root, shard) if report is not None else None,
+        coordinator=get_coordinator(serve, root, serve_timeout) if serve is not None else None,
+        fail_fast=fail_fast
     )
-    status = tidy.transform_files()
+    status = tidy.transform_files() if serve is None else transform_served_files(tidy)
+    if missing:
+        # missing paths are usage errors - listed paths should not pass the check silently
+        status = 2
     ctx.exit(status)
@@ -0,0 +1,141 @@
+"""
+Resolution of ``robotidy.toml`` configuration files per directory.
+
+Every file is formatted with the configuration from the nearest ``robotidy.toml`` file - found in the directory of
+the file or in its parents, up to the root of the project (directory with ``.git``). Options that decide how files are
+formatted (transformers with their configuration and global formatting options like ``spacecount``) can be different
+for every configuration file. Options of the run itself (``--check``, ``--workers``, ``--cache`` and others) are
+always taken from the configuration found for all sources (or given with ``--config``) and from the command line.
+
+Found configuration files are memoized per directory, so the file system is checked only once for every directory,
+and the pipeline for every distinct configuration file is created only once.
+"""
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import click
+
+from robotidy.utils import GlobalFormattingConfig, split_args_from_name_or_path
+
+
+CONFIG_NAME = 'robotidy.toml'
+PROJECT_ROOT_MARKER = '.git'
+# options from [main] section of the configuration file that decide how files are formatted
+FORMATTING_OPTIONS = ('spacecount', 'lineseparator', 'usepipes', 'startline', 'endline')
+
+
+def parse_config(path: str) -> Dict[str, Any]:
+    import toml
+
+    config = toml.load(path)
+    return {k.replace('--', '').replace('-', '_'): v for k, v in config.items()}
+
+
+def read_config_file(path: str) -> Dict[str, Any]:
+    """ Parsed configuration file. Errors are reported with the path of the file. """
+    import toml
+
+    try:
+        return parse_config(path)
+    except (toml.TomlDecodeError, OSError) as err:
+        raise click.FileError(filename=path, hint=f'Error reading configuration file: {err}')
+
+
+def get_transformers(config: Dict[str, Any]) -> List[str]:
+    """ Transformers from the configuration, in the same format as ``--transform`` option (``Name:param=value``). """
+    transformers = []
+    for transformer, configurables in config.get('transformers', {}).items():
+        if configurables:
+            transformer += ':' + ':'.join(f'{key}={value}' for key, value in configurables.items())
+        transformers.append(transformer)
+    return transformers
+
+
+def to_bool(value) -> bool:
+    if isinstance(value, str):
+        return value.lower() in ('true', '1', 'yes')
+    return bool(value)
+
+
+def to_int(value) -> Optional[int]:
+    return None if value is None else int(value)
+
+
+class ConfigResolver:
+    """
+    Finds the nearest configuration file of every source and creates formatting options from it.
+    Options given on the command line (``overrides`` and ``transformers`` if not None) take precedence over the
+    configuration files. ``defaults`` are used for options not set anywhere. Names and configurables of transformers
+    from the configuration files are validated with ``registry`` if it is given - without importing transformers.
+    """
+    def __init__(self, defaults: Dict[str, Any], overrides: Dict[str, Any],
+                 transformers: Optional[List[Tuple[str, List[str]]]] = None, registry=None):
+        self.defaults = defaults
+        self.overrides = overrides
+        self.transformers = transformers
+        self.registry = registry
+        # directory -> path of the nearest configuration file (None if there is no configuration file)
+        self.configs: Dict[str, Optional[str]] = {}
+        self.pipelines: Dict[Optional[str], Tuple] = {}
+
+    def find(self, directory: str) -> Optional[str]:
+        """ Path of the nearest configuration file for ``directory``. Every checked directory is memoized. """
+        visited = []
+        current = directory
+        while True:
+            if current in self.configs:
+                found = self.configs[current]
+                break
+            visited.append(current)
+            candidate = os.path.join(current, CONFIG_NAME)
+            if os.path.isfile(candidate):
+                found = os.path.realpath(candidate)
+                break
+            parent = os.path.dirname(current)
+            if parent == current or os.path.exists(os.path.join(current, PROJECT_ROOT_MARKER)):
+                found = None
+                break
+            current = parent
+        for path in visited:
+            self.configs[path] = found
+        return found
+
+    def find_for_source(self, source) -> Optional[str]:
+        return self.find(os.path.dirname(os.path.abspath(source)))
+
+    def get_pipeline(self, config: Optional[str]) -> Tuple[List[Tuple[str, List[str]]], GlobalFormattingConfig]:
+        """ Transformers and global formatting options for the configuration file (or defaults if it is None). """
+        pipeline = self.pipelines.get(config)
+        if pipeline is None:
+            pipeline = self.pipelines[config] = self.load_pipeline(config)
+        return pipeline
+
+    def load_pipeline(self, config: Optional[str]) -> Tuple[List[Tuple[str, List[str]]], GlobalFormattingConfig]:
+        parsed = read_config_file(config) if config is not None else {}
+        main = parsed.get('main', {})
+        options = {name: self.overrides.get(name, main.get(name, self.defaults.get(name)))
+                   for name in FORMATTING_OPTIONS}
+        formatting_config = GlobalFormattingConfig(
+            use_pipes=to_bool(options['usepipes']),
+            space_count=int(options['spacecount']),
+            line_sep=options['lineseparator'],
+            start_line=to_int(options['startline']),
+            end_line=to_int(options['endline'])
+        )
+        transformers = self.transformers
+        if transformers is None:
+            transformers = [split_args_from_name_or_path(transformer) for transformer in get_transformers(parsed)]
+            self.validate(config, transformers)
+        return transformers, formatting_config
+
+    def validate(self, config: str, transformers: List[Tuple[str, List[str]]]):
+        if self.registry is None:
+            return
+        for name, args in transformers:
+            if not self.registry.exists(name):
+                raise click.BadParameter(f"Importing '{name}' failed: transformer with this name, module or path "
+                                         f"does not exist.", param_hint=f"configuration file '{config}'")
+            try:
+                self.registry.validate(name, args)
+            except click.BadOptionUsage as err:
+                raise click.BadParameter(err.message, param_hint=f"configuration file '{config}'") from None
@@ -0,0 +1,102 @@
+"""
+Context of the file that is currently being transformed.
+
+Transformers are loaded once and the same instances are used for every file - also from multiple threads when
+running with ``--threads``. Any state that is only valid for the currently transformed file should be kept in
+``FileContext`` instead of the transformer instance. ``FileState`` descriptor does it transparently::
+
+    class MyTransformer(ModelTransformer):
+        last_section = FileState(default=None)
+
+        def visit_File(self, node):  # noqa
+            self.last_section = node.sections[-1] if node.sections else None
+            return self.generic_visit(node)
+
+Outside of ``FileContext`` (for example when transformer is used directly through Robot Framework API)
+the value is stored on the instance.
+"""
+import threading
+from typing import List, Optional, Tuple
+
+
+_local = threading.local()
+
+
+class ChangeTracker:
+    """ Line ranges (in the original file) changed by transformers. """
+    def __init__(self):
+        self.ranges = []
+        self._lock = threading.Lock()
+
+    def mark(self, start: int, end: int):
+        with self._lock:
+            self.ranges.append((start, end))
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.ranges)
+
+    def line_range(self) -> Optional[Tuple[int, int]]:
+        """ First and last changed line. None if some change does not have original line numbers. """
+        if not self.ranges or any(start < 1 or end < start for start, end in self.ranges):
+            return None
+        return min(start for start, _ in self.ranges), max(end for _, end in self.ranges)
+
+
+class FileContext:
+    """
+    State of the single file transformation. Active for current thread inside ``with`` block.
+    The same context can be activated by several threads at once (when file is transformed in chunks).
+    """
+    def __init__(self, source):
+        self.source = source
+        self.state = {}
+        # facts collected in the shared analysis pass (see ``robotidy.facts``)
+        self.facts = None
+        # changes reported by transformers (see ``robotidy.changes``)
+        self.changes = ChangeTracker()
+        # lines selected for transforming (with ``--staged``), None if the whole file is selected
+        self.line_ranges: Optional[List[Tuple[int, int]]] = None
+
+    def __enter__(self):
+        _context_stack().append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _context_stack().pop()
+
+
+def _context_stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+def current_context() -> Optional[FileContext]:
+    stack = getattr(_local, 'stack', None)
+    return stack[-1] if stack else None
+
+
+class FileState:
+    """ Transformer attribute which value is stored in the context of the currently transformed file. """
+    def __init__(self, default=None):
+        self.default = default
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        context = current_context()
+        if context is None:
+            return instance.__dict__.get(self.name, self.default)
+        return context.state.get((id(instance), self.name), self.default)
+
+    def __set__(self, instance, value):
+        context = current_context()
+        if context is None:
+            instance.__dict__[self.name] = value
+        else:
+            context.state[(id(instance), self.name)] = value
@@ -1,6 +1,6 @@
 import functools
 
-from robotidy.utils import node_within_lines
+from robotidy.utils import node_within_lines, node_within_ranges
 
 
 def return_node_untouched(node):
@@ -9,7 +9,8 @@ def return_node_untouched(node):
 
 def check_start_end_line(func):
     """
-    Do not transform node if it's not within passed start_line and end_line.
+    Do not transform node if it's not within passed start_line and end_line (and within lines selected for the file
+    with ``--staged``).
     """
     @functools.wraps(func)
     def wrapper(self, node):
@@ -18,7 +19,7 @@ def check_start_end_line(func):
                 node.end_lineno,
                 self.formatting_config.start_line,
                 self.formatting_config.end_line
-        ):
+        ) or not node_within_ranges(node.lineno, node.end_lineno):
             return return_node_untouched(node)
         return func(self, node)
     return wrapper
@@ -0,0 +1,366 @@
+"""
+Distributing files of a single run across worker processes on several hosts.
+
+The coordinator (``--serve ADDRESS``) discovers files as usual and serves them in batches over TCP or Unix socket.
+Workers (``--connect ADDRESS``) pull batches until there is nothing left, transform the files from their own copy of
+the project and report results back, so faster workers and workers with smaller files simply take more batches. The
+coordinator outputs diffs, saves reports and returns the status in the same order and format as a local run.
+
+The protocol uses JSON messages, one message per line:
+
+- after the worker connects, the coordinator sends ``{"type": "config", "robotidy": {...}}`` with the options of the
+  run (transformers, formatting options, ``overwrite``, ``check`` and ``diff``),
+- the worker asks for files with ``{"type": "get"}``. The coordinator replies with
+  ``{"type": "batch", "files": [[index, path], ...]}`` (paths relative to the project root), ``{"type": "wait"}`` if
+  all files are taken but some of them can still be returned to the queue, or ``{"type": "done"}``,
+- the worker reports results with ``{"type": "results", "results": [{"index": 0, "changed": true, "diff": null,
+  "duration": 0.1}, ...]}`` (or ``{"index": 0, "error": "message"}``). There is no reply.
+
+Files of a worker that disconnects before reporting all results are returned to the queue. If no worker is connected
+for ``idle_timeout`` seconds while there are files left, the coordinator fails. Workers trust the coordinator (it
+decides if the files are overwritten), so the coordinator should listen only on trusted networks.
+"""
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from robotidy.report import relative_path
+from robotidy.workers import batch_sources
+
+
+WAIT_INTERVAL = 0.1  # seconds the worker waits before asking for files again
+DEFAULT_IDLE_TIMEOUT = 60  # seconds the coordinator waits for a worker while there are files left
+LINE_SEPARATORS = {'\r\n': 'windows', '\n': 'unix'}
+
+
+class DistributedError(Exception):
+    pass
+
+
+def parse_address(address: str) -> Tuple[int, object]:
+    """ Socket family and address from ``unix:PATH`` or ``HOST:PORT`` (``[HOST]:PORT`` for IPv6) string. """
+    if address.startswith('unix:'):
+        if not hasattr(socket, 'AF_UNIX'):
+            raise ValueError('Unix sockets are not supported on this platform')
+        return socket.AF_UNIX, address[len('unix:'):]
+    host, separator, port = address.rpartition(':')
+    if not separator or not port.isdigit():
+        raise ValueError(f"Address should be in HOST:PORT or unix:PATH format, got '{address}'")
+    family = socket.AF_INET6 if host.startswith('[') else socket.AF_INET
+    return family, (host.strip('[]') or 'localhost', int(port))
+
+
+def format_address(family: int, address) -> str:
+    if family == getattr(socket, 'AF_UNIX', None):
+        return f'unix:{address}'
+    host, port = address[:2]
+    return f'[{host}]:{port}' if family == socket.AF_INET6 else f'{host}:{port}'
+
+
+def send_message(stream, message: Dict):
+    stream.write(json.dumps(message).encode('utf-8') + b'\n')
+    stream.flush()
+
+
+def read_message(stream) -> Optional[Dict]:
+    """ Next message from the stream or None if the other side closed the connection. """
+    line = stream.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+def remote_args(tidy) -> Dict:
+    """ JSON serializable options of ``Robotidy`` instance sent to the workers. """
+    formatting_config = tidy.formatting_config
+    resolver = tidy.config_resolver
+    return {
+        'transformers': [[name, list(args)] for name, args in tidy.transformers_config],
+        'formatting': {
+            'use_pipes': formatting_config.use_pipes,
+            'space_count': formatting_config.space_count,
+            'line_sep': LINE_SEPARATORS.get(formatting_config.line_sep, 'native'),
+            'start_line': formatting_config.start_line,
+            'end_line': formatting_config.end_line
+        },
+        'overwrite': tidy.overwrite,
+        'show_diff': tidy.show_diff,
+        'check': tidy.check,
+        'config_resolver': None if resolver is None else {
+            'defaults': resolver.defaults,
+            'overrides': resolver.overrides,
+            'transformers': resolver.transformers
+        }
+    }
+
+
+def create_tidy(args: Dict):
+    """ ``Robotidy`` instance of the worker created from the options received from the coordinator. """
+    from robotidy.app import Robotidy
+    from robotidy.config import ConfigResolver
+    from robotidy.registry import TransformerRegistry
+    from robotidy.utils import GlobalFormattingConfig
+
+    registry = TransformerRegistry(None)
+    resolver = args['config_resolver']
+    if resolver is not None:
+        transformers = resolver['transformers']
+        if transformers is not None:
+            transformers = [(name, list(params)) for name, params in transformers]
+        resolver = ConfigResolver(resolver['defaults'], resolver['overrides'], transformers, registry)
+    return Robotidy(
+        transformers=[(name, list(params)) for name, params in args['transformers']],
+        src=(),
+        overwrite=args['overwrite'],
+        show_diff=args['show_diff'],
+        formatting_config=GlobalFormattingConfig(**args['formatting']),
+        verbose=False,
+        check=args['check'],
+        registry=registry,
+        config_resolver=resolver
+    )
+
+
+class CoordinatorServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class CoordinatorServer6(CoordinatorServer):
+    address_family = socket.AF_INET6
+
+
+class Coordinator:
+    """
+    Queue of discovered files served to the workers. Results are yielded in the order of the files. Fails if no worker
+    is connected for ``idle_timeout`` seconds (None to wait forever) while results are missing.
+    """
+    def __init__(self, address: str, root: Path, idle_timeout: Optional[float] = DEFAULT_IDLE_TIMEOUT):
+        self.family, self.address = parse_address(address)
+        self.root = root
+        self.idle_timeout = idle_timeout
+        self.server = None
+        self.config = None
+        self.condition = threading.Condition()
+        self.batches: Iterator[List[Path]] = iter(())
+        self.paths: Dict[int, Path] = {}
+        # batches returned to the queue by disconnected workers
+        self.retry = deque()
+        self.taken = 0
+        self.exhausted = False
+        self.in_flight = 0
+        self.results = {}
+        self.connected = 0
+        # time since there is no connected worker
+        self.idle_since = time.monotonic()
+
+    @property
+    def bound_address(self) -> str:
+        return format_address(self.family, self.server.server_address)
+
+    def listen(self):
+        """ Bind the socket so the workers can connect (even before the files are served). """
+        if self.server is not None:
+            return
+        if self.family == getattr(socket, 'AF_UNIX', None):
+            if os.path.exists(self.address):
+                os.remove(self.address)
+            self.server = socketserver.ThreadingUnixStreamServer(self.address, CoordinatorHandler)
+            self.server.daemon_threads = True
+        elif self.family == socket.AF_INET6:
+            self.server = CoordinatorServer6(self.address, CoordinatorHandler)
+        else:
+            self.server = CoordinatorServer(self.address, CoordinatorHandler)
+        self.server.coordinator = self
+
+    def transform(self, sources: Iterable[Path], config: Dict) -> Iterator:
+        """ Serve ``sources`` to the workers and yield ``FileResult`` of every file, in the order of sources. """
+        self.listen()
+        self.config = config
+        self.batches = batch_sources(sources)
+        with self.condition:
+            self.idle_since = time.monotonic()
+            first = self.take_new()
+            if first:
+                self.retry.append(first)
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield from self.ordered_results()
+        finally:
+            self.server.shutdown()
+            self.server.server_close()
+            thread.join()
+            if self.family == getattr(socket, 'AF_UNIX', None) and os.path.exists(self.address):
+                os.remove(self.address)
+
+    def ordered_results(self) -> Iterator:
+        index = 0
+        while True:
+            with self.condition:
+                while index not in self.results:
+                    if self.exhausted and index >= self.taken:
+                        return
+                    self.condition.wait(self.idle_time_left())
+                result = self.results.pop(index)
+            if isinstance(result, DistributedError):
+                raise result
+            yield result
+            index += 1
+
+    def idle_time_left(self) -> Optional[float]:
+        """ Seconds left until the idle timeout (None if a worker is connected). Must be called with the condition. """
+        if self.connected or self.idle_timeout is None:
+            return None
+        left = self.idle_since + self.idle_timeout - time.monotonic()
+        if left <= 0:
+            raise DistributedError(f'No worker connected for {self.idle_timeout} seconds')
+        return left
+
+    def connect_worker(self):
+        with self.condition:
+            self.connected += 1
+            self.condition.notify_all()
+
+    def disconnect_worker(self):
+        with self.condition:
+            self.connected -= 1
+            if not self.connected:
+                self.idle_since = time.monotonic()
+            self.condition.notify_all()
+
+    def take_new(self) -> List[Tuple[int, str]]:
+        """ Next batch of discovered files. Must be called with the condition acquired. """
+        if self.exhausted:
+            return []
+        batch = next(self.batches, None)
+        if batch is None:
+            self.exhausted = True
+            self.condition.notify_all()
+            return []
+        files = []
+        for path in batch:
+            self.paths[self.taken] = path
+            files.append((self.taken, relative_path(path, self.root)))
+            self.taken += 1
+        return files
+
+    def take(self) -> Tuple[str, List[Tuple[int, str]]]:
+        """ Batch for the worker - ``batch``, ``wait`` or ``done`` with the list of files. """
+        with self.condition:
+            files = self.retry.popleft() if self.retry else self.take_new()
+            if files:
+                self.in_flight += len(files)
+                return 'batch', files
+            return ('wait' if self.in_flight else 'done'), []
+
+    def add_results(self, results: List[Dict]):
+        from robotidy.app import FileResult
+
+        with self.condition:
+            for result in results:
+                index = result['index']
+                source = self.paths.pop(index)
+                if 'error' in result:
+                    self.results[index] = DistributedError(f"Failed to transform '{source}': {result['error']}")
+                else:
+                    self.results[index] = file_result = FileResult(source, result['changed'], result['diff'])
+                    file_result.duration = result.get('duration')
+                self.in_flight -= 1
+            self.condition.notify_all()
+
+    def return_files(self, files: List[Tuple[int, str]]):
+        """ Return files of the disconnected worker to the queue. """
+        if not files:
+            return
+        with self.condition:
+            self.in_flight -= len(files)
+            self.retry.append(files)
+            self.condition.notify_all()
+
+
+class CoordinatorHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        coordinator: Coordinator = self.server.coordinator
+        pending = {}
+        coordinator.connect_worker()
+        try:
+            send_message(self.wfile, {'type': 'config', 'robotidy': coordinator.config})
+            while True:
+                message = read_message(self.rfile)
+                if message is None:
+                    break
+                if message['type'] == 'get':
+                    reply, files = coordinator.take()
+                    pending.update(files)
+                    send_message(self.wfile, {'type': reply, 'files': files})
+                elif message['type'] == 'results':
+                    results = [result for result in message['results'] if pending.pop(result['index'], None)]
+                    coordinator.add_results(results)
+        except (OSError, ValueError, KeyError):
+            pass
+        finally:
+            coordinator.return_files(list(pending.items()))
+            coordinator.disconnect_worker()
+
+
+def connect(address: str) -> socket.socket:
+    family, address = parse_address(address)
+    if family == getattr(socket, 'AF_UNIX', None):
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.connect(address)
+        return sock
+    return socket.create_connection(address)
+
+
+def transform_remote_file(tidy, root: Path, index: int, path: str) -> Dict:
+    source = (root / path).resolve()
+    try:
+        source.relative_to(root)
+    except ValueError:
+        return {'index': index, 'error': 'path is outside of the project root'}
+    try:
+        result = tidy.transform_file(source)
+    except Exception as err:  # noqa - error is reported to the coordinator
+        return {'index': index, 'error': f'{type(err).__name__}: {err}'}
+    return {'index': index, 'changed': result.changed, 'diff': result.diff, 'duration': result.duration}
+
+
+def run_worker(address: str, root: Path) -> int:
+    """ Transform files served by the coordinator until there is nothing left. Returns the number of files. """
+    root = root.resolve()
+    transformed = 0
+    with connect(address) as sock, sock.makefile('rwb') as stream:
+        message = read_message(stream)
+        if message is None or message['type'] != 'config':
+            raise DistributedError(f'Unexpected message from the coordinator: {message}')
+        tidy = create_tidy(message['robotidy'])
+        while True:
+            send_message(stream, {'type': 'get'})
+            message = read_message(stream)
+            if message is None or message['type'] == 'done':
+                break
+            if message['type'] == 'wait':
+                time.sleep(WAIT_INTERVAL)
+                continue
+            results = [transform_remote_file(tidy, root, index, path) for index, path in message['files']]
+            send_message(stream, {'type': 'results', 'results': results})
+            transformed += len(results)
+    return transformed
+
+
+def run_workers(address: str, root: Path, workers: int = 1) -> int:
+    """ Run ``workers`` worker processes (each with its own connection) and return the number of files. """
+    if workers == 1:
+        return run_worker(address, root)
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_worker, address, root) for _ in range(workers)]
+        return sum(future.result() for future in futures)
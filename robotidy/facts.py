@@ -0,0 +1,227 @@
+"""
+Facts about the file collected in a single analysis pass, before any transformer modifies the model.
+
+Transformers declare names of facts they need with ``facts`` attribute and read them in ``prepare`` method::
+
+    class MyTransformer(ModelTransformer):
+        facts = ('assignment_signs',)
+
+        def prepare(self, model):
+            signs = get_facts(model, self.facts)['assignment_signs']
+
+Facts are gathered by collectors - every collector is called with the nodes it handles (``visit_<NodeClass>``
+methods, matching also base classes of the node) and returns the fact from ``result`` method. Collectors of all
+facts needed by loaded transformers visit the model together, in one walk. Other packages can register their own
+collectors with ``register_collector`` - collectors without ``result`` method are rejected when they are registered::
+
+    @register_collector
+    class ForLoops(Collector):
+        name = 'for_loops'
+
+        def __init__(self):
+            self.count = 0
+
+        def visit_For(self, node):  # noqa
+            self.count += 1
+
+        def result(self):
+            return self.count
+"""
+import ast
+import inspect
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import Dict, Iterable, List
+
+from robotidy.context import current_context
+from robotidy.utils import normalize_name
+
+
+_collectors = {}
+
+
+class Collector(ABC):
+    """ Base class of collectors. New instance is created for every file. """
+    name = None
+
+    @abstractmethod
+    def result(self):
+        """ The collected fact. """
+
+
+def register_collector(collector_class):
+    """ Register collector under its ``name``. Can be used as a class decorator. """
+    if not collector_class.name:
+        raise ValueError(f'Collector {collector_class.__name__} does not have a name')
+    if inspect.isabstract(collector_class):
+        missing = ', '.join(sorted(collector_class.__abstractmethods__))
+        raise ValueError(f'Collector {collector_class.__name__} does not implement: {missing}')
+    _collectors[collector_class.name] = collector_class
+    return collector_class
+
+
+def get_collector(name: str):
+    try:
+        return _collectors[name]
+    except KeyError:
+        raise ValueError(f"Unknown fact '{name}'. Registered facts: {', '.join(sorted(_collectors))}") from None
+
+
+class FileFacts:
+    """ Facts collected from the file, by the name of the fact. """
+    def __init__(self, values: Dict = None):
+        self.values = dict(values or {})
+
+    def __getitem__(self, name: str):
+        return self.values[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.values
+
+    def get(self, name: str, default=None):
+        return self.values.get(name, default)
+
+    def update(self, other: 'FileFacts'):
+        self.values.update(other.values)
+
+
+def find_visitor(collector, node_class):
+    for cls in node_class.__mro__:
+        visitor = getattr(collector, f'visit_{cls.__name__}', None)
+        if visitor is not None:
+            return visitor
+    return None
+
+
+def iter_child_nodes(node) -> List:
+    children = []
+    for _, value in ast.iter_fields(node):
+        if isinstance(value, list):
+            children.extend(item for item in value if isinstance(item, ast.AST))
+        elif isinstance(value, ast.AST):
+            children.append(value)
+    return children
+
+
+def collect_facts(model, names: Iterable[str]) -> FileFacts:
+    """ Collect facts with given names in one walk of the model (in the same order as ``ast.NodeVisitor``). """
+    collectors = [get_collector(name)() for name in dict.fromkeys(names)]
+    if not collectors:
+        return FileFacts()
+    handlers = {}
+    stack = [model]
+    while stack:
+        node = stack.pop()
+        node_class = type(node)
+        if node_class not in handlers:
+            handlers[node_class] = [visitor for visitor in (find_visitor(collector, node_class)
+                                                            for collector in collectors) if visitor is not None]
+        for handler in handlers[node_class]:
+            handler(node)
+        stack.extend(reversed(iter_child_nodes(node)))
+    return FileFacts({collector.name: collector.result() for collector in collectors})
+
+
+def needed_facts(transformers: Iterable) -> List[str]:
+    return list(dict.fromkeys(name for transformer in transformers for name in getattr(transformer, 'facts', ())))
+
+
+def get_facts(model, names: Iterable[str]) -> FileFacts:
+    """
+    Facts of the currently transformed file collected in the shared analysis pass. Facts that were not collected
+    (for example when transformer is used directly through Robot Framework API) are collected now.
+    """
+    context = current_context()
+    facts = context.facts if context is not None and context.facts is not None else FileFacts()
+    missing = [name for name in names if name not in facts]
+    if missing:
+        facts.update(collect_facts(model, missing))
+        if context is not None:
+            context.facts = facts
+    return facts
+
+
+@register_collector
+class AssignmentSigns(Collector):
+    """ Number of assignments (variables and keyword calls) by the used sign (``=``, `` =`` or no sign). """
+    name = 'assignment_signs'
+
+    def __init__(self):
+        self.signs = Counter()
+
+    def visit_KeywordCall(self, node):  # noqa
+        if node.assign:  # if keyword returns any value
+            self.signs[self.get_assignment_sign(node.assign[-1])] += 1
+
+    def visit_Variable(self, node):  # noqa
+        self.signs[self.get_assignment_sign(node.get_token('VARIABLE').value)] += 1
+
+    @staticmethod
+    def get_assignment_sign(token_value):
+        return token_value[token_value.find('}')+1:]
+
+    def result(self):
+        return dict(self.signs)
+
+
+@register_collector
+class TemplatePresence(Collector):
+    """ Whether any test case uses ``Test Template`` from the settings. """
+    name = 'templated'
+
+    def __init__(self):
+        self.templated = False
+
+    def visit_TestTemplate(self, node):  # noqa
+        if node.value:
+            self.templated = True
+
+    def result(self):
+        return self.templated
+
+
+@register_collector
+class SectionInventory(Collector):
+    """ Types of the sections in the order of the file. """
+    name = 'sections'
+
+    def __init__(self):
+        self.sections = []
+
+    def visit_Section(self, node):  # noqa
+        self.sections.append(type(node).__name__)
+
+    def result(self):
+        return self.sections
+
+
+@register_collector
+class MaxLineLength(Collector):
+    """ Length of the longest line (without line separator). """
+    name = 'max_line_length'
+
+    def __init__(self):
+        self.max_length = 0
+
+    def visit_Statement(self, node):  # noqa
+        for line in node.lines:
+            self.max_length = max(self.max_length, len(''.join(token.value for token in line).rstrip('\r\n')))
+
+    def result(self):
+        return self.max_length
+
+
+@register_collector
+class KeywordCalls(Collector):
+    """ Number of calls by the normalized name of the keyword. """
+    name = 'keyword_calls'
+
+    def __init__(self):
+        self.calls = Counter()
+
+    def visit_KeywordCall(self, node):  # noqa
+        if node.keyword:
+            self.calls[normalize_name(node.keyword)] += 1
+
+    def result(self):
+        return dict(self.calls)
@@ -0,0 +1,265 @@
+"""
+Discovery of Robot Framework files to transform.
+
+Directories are walked with ``os.scandir`` and files are yielded as they are found, so transforming can start before
+the whole tree is walked. Entries of every directory are visited in the sorted order, so the order of files does not
+depend on the file system. Paths (relative to the project root, with ``/`` separators and a ``/`` in front) are
+matched against ``--exclude`` and ``--extend-exclude`` regular expressions - directories end with ``/``, the same as
+in black. Patterns from ``.gitignore`` files of the project are honoured too. Files reachable through several paths
+(symbolic links, hard links) are transformed only once.
+
+Sources can be also read from the file (``--files-from``) - paths are read while the files are transformed, so the
+list can be arbitrarily long. Discovery can be limited to the given set of files (for example files changed in git,
+see ``robotidy.git``) - directories without any of these files are not walked at all.
+"""
+import os
+import re
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Optional, Pattern, Set, Tuple
+
+
+INCLUDE_EXT = ('.robot', '.resource')
+DEFAULT_EXCLUDES = r'/(\.direnv|\.eggs|\.git|\.hg|\.nox|\.tox|\.venv|venv|\.svn|_build|buck-out|build|dist|node_modules)/'
+GITIGNORE = '.gitignore'
+READ_SIZE = 64 * 1024
+
+
+def translate_pattern(pattern: str) -> str:
+    """ Translate ``.gitignore`` pattern (without negation and trailing slash) to the regular expression. """
+    anchored = '/' in pattern
+    if pattern.startswith('/'):
+        pattern = pattern[1:]
+    parts, index, length = [], 0, len(pattern)
+    while index < length:
+        char = pattern[index]
+        if pattern.startswith('**/', index) and (index == 0 or pattern[index - 1] == '/'):
+            parts.append('(?:.*/)?')
+            index += 3
+        elif pattern.startswith('/**', index) and index + 3 == length:
+            parts.append('/.*')
+            index += 3
+        elif pattern.startswith('**', index):
+            parts.append('.*')
+            index += 2
+        elif char == '*':
+            parts.append('[^/]*')
+            index += 1
+        elif char == '?':
+            parts.append('[^/]')
+            index += 1
+        elif char == '[' and pattern.find(']', index + 2) != -1:
+            end = pattern.find(']', index + 2)
+            content = pattern[index + 1:end].replace('\\', '\\\\')
+            if content.startswith('!'):
+                content = '^' + content[1:]
+            parts.append(f'[{content}]')
+            index = end + 1
+        elif char == '\\' and index + 1 < length:
+            parts.append(re.escape(pattern[index + 1]))
+            index += 2
+        else:
+            parts.append(re.escape(char))
+            index += 1
+    regex = ''.join(parts)
+    if not anchored:
+        regex = '(?:.*/)?' + regex
+    return regex + r'\Z'
+
+
+def parse_gitignore(lines: Iterable[str]) -> List[Tuple[Pattern, bool, bool]]:
+    """ Parse lines of ``.gitignore`` file. Returns list of (regex, negated, directories only) rules. """
+    rules = []
+    for line in lines:
+        line = re.sub(r'(?<!\\) +$', '', line.rstrip('\r\n'))
+        if not line or line.startswith('#'):
+            continue
+        negated = line.startswith('!')
+        if negated:
+            line = line[1:]
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if line:
+            rules.append((re.compile(translate_pattern(line)), negated, dir_only))
+    return rules
+
+
+class GitIgnore:
+    """ Rules of ``.gitignore`` files that apply to the directory, from the project root down to the directory. """
+    def __init__(self, rules: Tuple = ()):
+        # (directory of .gitignore relative to the project root, regex, negated, directories only)
+        self.rules = rules
+
+    def child(self, directory: str, relative: str) -> 'GitIgnore':
+        """ Rules for the subdirectory - extended with its own ``.gitignore`` file if it exists. """
+        try:
+            with open(os.path.join(directory, GITIGNORE), encoding='utf-8', errors='replace') as f:
+                rules = parse_gitignore(f)
+        except OSError:
+            return self
+        if not rules:
+            return self
+        return GitIgnore(self.rules + tuple((relative, *rule) for rule in rules))
+
+    def is_ignored(self, relative: str, is_dir: bool) -> bool:
+        """ Check if the path relative to the project root is ignored. The last matching rule wins. """
+        ignored = False
+        for base, regex, negated, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if base:
+                if not relative.startswith(base + '/'):
+                    continue
+                path = relative[len(base) + 1:]
+            else:
+                path = relative
+            if regex.match(path):
+                ignored = not negated
+        return ignored
+
+
+class FileWalker:
+    """ Yields Robot Framework files from given sources, skipping excluded paths and files already yielded. """
+    def __init__(self, root: Path, exclude: Optional[Pattern] = None, extend_exclude: Optional[Pattern] = None,
+                 use_gitignore: bool = True, on_missing: Optional[Callable[[str], None]] = None,
+                 only: Optional[Set[str]] = None):
+        self.root = root
+        self.excludes = [pattern for pattern in (exclude, extend_exclude) if pattern is not None]
+        self.use_gitignore = use_gitignore
+        # called with sources that do not exist
+        self.on_missing = on_missing
+        # absolute paths of the only files that can be yielded (all files if None) and of their parent directories
+        self.only = only
+        self.only_dirs = get_parents(only) if only is not None else None
+        self.seen: Set = set()
+
+    def iterate(self, src: Iterable[str]) -> Iterator[Path]:
+        for source in src:
+            path = Path(source).resolve()
+            if path.is_file():
+                if self.is_selected(str(path), False) and self.first_visit(str(path), os.stat(path)):
+                    yield path
+            elif path.is_dir():
+                relative = self.relative(path)
+                if self.is_selected(str(path), True) and self.first_visit(str(path), os.stat(path)):
+                    yield from self.walk(str(path), relative, self.get_gitignore(path))
+            elif source == '-':
+                yield path
+            elif self.on_missing is not None:
+                self.on_missing(source)
+
+    def walk(self, directory: str, relative: str, gitignore: GitIgnore) -> Iterator[Path]:
+        try:
+            with os.scandir(directory) as iterator:
+                entries = sorted(iterator, key=lambda item: item.name)
+        except OSError:
+            return
+        for entry in entries:
+            entry_relative = f'{relative}/{entry.name}' if relative else entry.name
+            try:
+                is_dir = entry.is_dir()
+                if not is_dir and not (entry.name.endswith(INCLUDE_EXT) and entry.is_file()):
+                    continue
+                if not self.is_selected(entry.path, is_dir):
+                    continue
+                if self.is_excluded(entry_relative, is_dir) or gitignore.is_ignored(entry_relative, is_dir):
+                    continue
+                if not self.first_visit(entry.path, entry.stat()):
+                    continue
+            except OSError:
+                continue
+            if is_dir:
+                child_gitignore = self.get_child_gitignore(gitignore, entry.path, entry_relative)
+                yield from self.walk(entry.path, entry_relative, child_gitignore)
+            else:
+                yield Path(entry.path)
+
+    def relative(self, path: Path) -> str:
+        try:
+            relative = path.relative_to(self.root).as_posix()
+        except ValueError:
+            return path.as_posix().strip('/')
+        return '' if relative == '.' else relative
+
+    def is_selected(self, path: str, is_dir: bool) -> bool:
+        """ Check if the file (or directory containing any file) is in ``only`` files. """
+        if self.only is None:
+            return True
+        return path in (self.only_dirs if is_dir else self.only)
+
+    def is_excluded(self, relative: str, is_dir: bool) -> bool:
+        path = f'/{relative}/' if is_dir else f'/{relative}'
+        return any(pattern.search(path) for pattern in self.excludes)
+
+    def get_gitignore(self, directory: Path) -> GitIgnore:
+        """ Rules of ``.gitignore`` files from the project root down to ``directory``. """
+        gitignore = GitIgnore()
+        if not self.use_gitignore:
+            return gitignore
+        try:
+            parents = directory.relative_to(self.root).parts
+        except ValueError:
+            return gitignore
+        current = self.root
+        gitignore = gitignore.child(str(current), '')
+        for part in parents:
+            current = current / part
+            gitignore = gitignore.child(str(current), self.relative(current))
+        return gitignore
+
+    def get_child_gitignore(self, gitignore: GitIgnore, directory: str, relative: str) -> GitIgnore:
+        if not self.use_gitignore:
+            return gitignore
+        return gitignore.child(directory, relative)
+
+    def first_visit(self, path: str, stat_result) -> bool:
+        """ Remember the file or directory by its inode. Returns False if it was already visited. """
+        # inode is not known on some file systems (and in os.scandir results on Windows)
+        key = (stat_result.st_dev, stat_result.st_ino) if stat_result.st_ino else os.path.realpath(path)
+        if key in self.seen:
+            return False
+        self.seen.add(key)
+        return True
+
+
+def get_parents(paths: Iterable[str]) -> Set[str]:
+    """ All parent directories of given absolute paths. """
+    parents = set()
+    for path in paths:
+        parent = os.path.dirname(path)
+        while parent not in parents:
+            parents.add(parent)
+            path, parent = parent, os.path.dirname(parent)
+            if parent == path:
+                break
+    return parents
+
+
+def read_file_list(stream: BinaryIO, null_separated: bool = False) -> Iterator[str]:
+    """ Paths separated by new lines (or NUL characters) from binary ``stream``, yielded while it is read. """
+    separator = b'\0' if null_separated else b'\n'
+    rest = b''
+    while True:
+        chunk = stream.read(READ_SIZE)
+        if not chunk:
+            break
+        *paths, rest = (rest + chunk).split(separator)
+        yield from decode_paths(paths, null_separated)
+    yield from decode_paths([rest], null_separated)
+
+
+def decode_paths(paths: List[bytes], null_separated: bool) -> Iterator[str]:
+    for path in paths:
+        if not null_separated:
+            path = path.rstrip(b'\r')
+        if path:
+            yield os.fsdecode(path)
+
+
+def get_paths(src: Iterable[str], root: Path, exclude: Optional[Pattern] = None,
+              extend_exclude: Optional[Pattern] = None, use_gitignore: bool = True,
+              on_missing: Optional[Callable[[str], None]] = None, only: Optional[Set[str]] = None) -> Iterator[Path]:
+    """
+    Robot Framework files from ``src`` files and directories, yielded while the directories are walked. If ``only``
+    is given, only files from this set of absolute paths are yielded.
+    """
+    return FileWalker(root, exclude, extend_exclude, use_gitignore, on_missing, only).iterate(src)
@@ -0,0 +1,134 @@
+"""
+Selection of files to transform from the local git repository.
+
+``--changed-since REF`` transforms only files changed relative to ``REF`` (committed, staged and not staged changes)
+and untracked files that are not ignored. Git is asked for all changed files at once - with single ``git diff`` and
+single ``git ls-files`` process regardless of the number of changed files. Changed files are then used to limit the
+normal discovery of files (see ``robotidy.files``), so sources and exclude rules still apply.
+
+``--staged`` transforms the content of files staged in the git index, limited to the lines of staged hunks. Staged
+files and their hunks are read with two ``git diff --cached`` calls and the content of all staged files is read
+with single ``git cat-file --batch`` process.
+"""
+import os
+import re
+import subprocess
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from robotidy.files import INCLUDE_EXT
+
+
+HUNK_HEADER = re.compile(rb'^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@')
+DIFF_HEADER = b'diff --git '
+STAGED_DIFF = ['diff', '--cached', '--no-renames', '--diff-filter=AM', '--no-ext-diff', '--no-color']
+
+
+class GitError(Exception):
+    pass
+
+
+class StagedFile:
+    """ Content of the file in the git index and line ranges (numbered from 1, inclusive) of its staged hunks. """
+    def __init__(self, path: str, content: bytes, line_ranges: List[Tuple[int, int]]):
+        self.path = path
+        self.content = content
+        self.line_ranges = line_ranges
+
+
+def run_git(args: List[str], cwd: str, stdin: Optional[bytes] = None) -> bytes:
+    """ Run git command in ``cwd`` directory and return its standard output. """
+    try:
+        process = subprocess.run(['git', *args], cwd=cwd, input=stdin, stdout=subprocess.PIPE,
+                                 stderr=subprocess.PIPE)
+    except OSError as err:
+        raise GitError(f'Failed to run git: {err}') from None
+    if process.returncode:
+        message = process.stderr.decode(errors='replace').strip()
+        raise GitError(f"Command 'git {' '.join(args)}' failed: {message}")
+    return process.stdout
+
+
+def split_paths(output: bytes) -> List[str]:
+    """ Paths from the output of git command called with ``-z`` option. """
+    return [os.fsdecode(path) for path in output.split(b'\0') if path]
+
+
+def get_git_root(directory: str) -> str:
+    """ Top-level directory of the git repository that contains ``directory``. """
+    root = run_git(['rev-parse', '--show-toplevel'], directory).decode().strip()
+    return os.path.realpath(root)
+
+
+def get_changed_files(ref: str, directory: str) -> Set[str]:
+    """
+    Absolute paths of Robot Framework files changed since ``ref`` (in commits, the index or the working tree) and of
+    untracked files in the repository that contains ``directory``. Deleted files are not included.
+    """
+    root = get_git_root(directory)
+    changed = run_git(['diff', '--name-only', '-z', '--no-renames', '--diff-filter=d', ref, '--'], root)
+    untracked = run_git(['ls-files', '-z', '--others', '--exclude-standard'], root)
+    return {
+        os.path.join(root, os.path.normpath(path))
+        for path in split_paths(changed) + split_paths(untracked)
+        if path.endswith(INCLUDE_EXT)
+    }
+
+
+def parse_raw_diff(output: bytes) -> Iterator[Tuple[str, str]]:
+    """ Paths and blob ids of new versions of files from the output of ``git diff --raw -z --no-abbrev``. """
+    fields = output.split(b'\0')
+    for status, path in zip(fields[0::2], fields[1::2]):
+        yield os.fsdecode(path), status.split()[3].decode()
+
+
+def parse_hunks(output: bytes) -> List[List[Tuple[int, int]]]:
+    """
+    Line ranges (in the new version) of hunks of every file from the output of ``git diff -U0``, in the order of
+    files. Hunks that only remove lines do not select any line.
+    """
+    files = []
+    for line in output.split(b'\n'):
+        if line.startswith(DIFF_HEADER):
+            files.append([])
+            continue
+        match = HUNK_HEADER.match(line)
+        if match is None or not files:
+            continue
+        start, count = int(match.group(1)), int(match.group(2) or 1)
+        if count:
+            files[-1].append((start, start + count - 1))
+    return files
+
+
+def read_blobs(blobs: List[str], cwd: str) -> Dict[str, bytes]:
+    """ Content of git objects read with single ``git cat-file --batch`` process. """
+    output = run_git(['cat-file', '--batch'], cwd, stdin=''.join(f'{blob}\n' for blob in blobs).encode())
+    contents, position = {}, 0
+    while position < len(output):
+        header_end = output.index(b'\n', position)
+        header = output[position:header_end].split()
+        position = header_end + 1
+        if len(header) != 3:
+            raise GitError(f"Failed to read git object: {b' '.join(header).decode(errors='replace')}")
+        size = int(header[2])
+        contents[header[0].decode()] = output[position:position + size]
+        position += size + 1
+    return contents
+
+
+def get_staged_files(directory: str) -> Dict[str, StagedFile]:
+    """
+    Robot Framework files added or modified in the index of the git repository that contains ``directory``, by
+    their absolute paths.
+    """
+    root = get_git_root(directory)
+    raw = run_git([*STAGED_DIFF, '--raw', '-z', '--no-abbrev'], root)
+    hunks = parse_hunks(run_git([*STAGED_DIFF, '-U0'], root))
+    files = [(path, blob, line_ranges) for (path, blob), line_ranges in zip(parse_raw_diff(raw), hunks)
+             if path.endswith(INCLUDE_EXT) and line_ranges]
+    contents = read_blobs(sorted({blob for _, blob, _ in files}), root)
+    staged = {}
+    for path, blob, line_ranges in files:
+        path = os.path.join(root, os.path.normpath(path))
+        staged[path] = StagedFile(path, contents[blob], line_ranges)
+    return staged
@@ -0,0 +1,176 @@
+"""
+Running several transformers over the model in a single walk.
+
+Visiting the model with every transformer separately walks the whole tree once per transformer. ``FusedVisitor``
+walks the tree once and for every node calls the handlers (``visit_<NodeClass>`` methods) of the transformers in the
+configured order. Transformers that do not handle the node descend into its children together. The result is the same
+as running transformers one after another: handler of the transformer is called only after all transformers before it
+finished the node with its whole subtree. Handlers that call ``generic_visit`` still walk the subtree on their own.
+
+Transformers can declare node types they handle with ``node_types`` class attribute, for example::
+
+    class AlignSettings(ModelTransformer):
+        node_types = (SettingSection,)
+
+        def visit_SettingSection(self, node):  # noqa
+            ...
+
+The walk then skips subtrees that can not contain nodes of these types - in the example above the transformer does not
+visit test cases and keywords at all. Transformers without ``node_types`` visit every node.
+
+Transformers with custom ``visit`` or ``generic_visit`` method are called only with the top level node.
+"""
+import ast
+from typing import Iterable, List, Optional, Tuple
+
+
+MAX_VISITORS = 64
+# statements that can be only found inside test cases and keywords
+BODY_STATEMENTS = ('KeywordCall', 'TemplateArguments', 'ForHeader', 'IfHeader', 'ElseIfHeader', 'ElseHeader', 'End',
+                   'TestCaseName', 'KeywordName')
+# marks transformer that does not need to visit the node at all
+SKIP = object()
+
+_visitors = {}
+
+
+def is_opaque(transformer) -> bool:
+    """ Check if transformer replaces the default dispatch or walk - then it has to visit the node on its own. """
+    from robot.api.parsing import ModelTransformer
+
+    transformer_class = type(transformer)
+    return getattr(transformer_class, 'visit', None) not in (ModelTransformer.visit, ast.NodeTransformer.visit) \
+        or getattr(transformer_class, 'generic_visit', None) is not ast.NodeTransformer.generic_visit
+
+
+def find_handler(transformer, node_class):
+    """ Same lookup as in ``visit`` of the transformer. Returns None if the transformer only visits children. """
+    if is_opaque(transformer):
+        return transformer.visit
+    find_visitor = getattr(transformer, '_find_visitor', None)
+    if find_visitor is not None:
+        return find_visitor(node_class)
+    return getattr(transformer, f'visit_{node_class.__name__}', None)
+
+
+def may_contain(node_class, target_class) -> bool:
+    """ Check if subtree of the node of ``node_class`` can contain node of ``target_class`` (True if not sure). """
+    from robot.parsing.model import blocks, statements
+
+    if issubclass(node_class, statements.Statement):
+        return False
+    if issubclass(node_class, blocks.File):
+        return True
+    if issubclass(target_class, (blocks.File, blocks.Section)):
+        return False
+    if issubclass(node_class, (blocks.TestCaseSection, blocks.KeywordSection)):
+        return True
+    if issubclass(node_class, blocks.Section):
+        # settings, variables and comments contain only the header and statements
+        body_statements = tuple(getattr(statements, name) for name in BODY_STATEMENTS if hasattr(statements, name))
+        return issubclass(target_class, statements.Statement) and not issubclass(target_class, body_statements)
+    # test case, keyword or control structure
+    return not issubclass(target_class, (statements.SectionHeader, blocks.TestCase, blocks.Keyword))
+
+
+def needs_visit(transformer, node_class) -> bool:
+    """ Check if transformer can handle the node of ``node_class`` or any node in its subtree. """
+    node_types = getattr(transformer, 'node_types', None)
+    if node_types is None:
+        return True
+    return any(issubclass(node_class, node_type) or may_contain(node_class, node_type) for node_type in node_types)
+
+
+def as_list(result) -> List:
+    if result is None:
+        return []
+    if isinstance(result, list):
+        return result
+    return [result]
+
+
+class FusedVisitor:
+    """ Applies ``transformers`` to the node in one walk, using dispatch table built per node class. """
+    def __init__(self, transformers: Iterable):
+        self.transformers = list(transformers)
+        self.handlers = {}
+
+    def get_handlers(self, node_class) -> Tuple:
+        handlers = self.handlers.get(node_class)
+        if handlers is None:
+            handlers = tuple(self.find_handler(transformer, node_class) for transformer in self.transformers)
+            self.handlers[node_class] = handlers
+        return handlers
+
+    @staticmethod
+    def find_handler(transformer, node_class):
+        handler = find_handler(transformer, node_class)
+        if handler is None and not needs_visit(transformer, node_class):
+            return SKIP
+        return handler
+
+    def visit(self, node) -> List:
+        """
+        Transform ``node``. Returns list of resulting nodes - transformer can remove the node (by returning None)
+        or replace it with several nodes, same as in ``ast.NodeTransformer.generic_visit``.
+        """
+        return self.visit_with(node, tuple(range(len(self.transformers))))
+
+    def visit_with(self, node, indexes: Tuple[int, ...]) -> List:
+        """ Transform ``node`` with transformers with given ``indexes``. """
+        handlers = self.get_handlers(type(node))
+        descending = []
+        for position, index in enumerate(indexes):
+            handler = handlers[index]
+            if handler is SKIP:
+                continue
+            if handler is None:
+                descending.append(index)
+                continue
+            if descending:
+                self.generic_visit(node, tuple(descending))
+                descending = []
+            result = handler(node)
+            if result is not node:
+                remaining = indexes[position + 1:]
+                return [transformed for current in as_list(result)
+                        for transformed in self.visit_with(current, remaining)]
+        if descending:
+            self.generic_visit(node, tuple(descending))
+        return [node]
+
+    def generic_visit(self, node, indexes: Tuple[int, ...]):
+        """ ``ast.NodeTransformer.generic_visit`` for several transformers at once. """
+        for field, old_value in ast.iter_fields(node):
+            if isinstance(old_value, list):
+                new_values = []
+                for value in old_value:
+                    if isinstance(value, ast.AST):
+                        new_values.extend(self.visit_with(value, indexes))
+                    else:
+                        new_values.append(value)
+                old_value[:] = new_values
+            elif isinstance(old_value, ast.AST):
+                new_nodes = self.visit_with(old_value, indexes)
+                if not new_nodes:
+                    delattr(node, field)
+                else:
+                    setattr(node, field, new_nodes[0] if len(new_nodes) == 1 else new_nodes)
+
+
+def get_visitor(transformers: Iterable) -> FusedVisitor:
+    """ Visitor reused between files, so the dispatch table is built only once for the same transformers. """
+    transformers = list(transformers)
+    key = tuple(id(transformer) for transformer in transformers)
+    visitor = _visitors.get(key)
+    if visitor is None:
+        if len(_visitors) >= MAX_VISITORS:
+            _visitors.clear()
+        visitor = _visitors[key] = FusedVisitor(transformers)
+    return visitor
+
+
+def transform_sections(model, transformers: Iterable, visitor: Optional[FusedVisitor] = None):
+    """ Transform all sections of ``model`` in one walk. """
+    visitor = visitor or get_visitor(transformers)
+    model.sections = [node for section in model.sections for node in visitor.visit(section)]
@@ -0,0 +1,284 @@
+"""
+Registry of available transformers.
+
+Built-in transformers and transformers from other packages are registered in ``robotidy.transformers`` entry point
+group, for example in ``setup.py``::
+
+    entry_points={'robotidy.transformers': ['MyTransformer = my_package.transformers:MyTransformer']}
+
+Registered transformers can be used by name (``--transform MyTransformer``). Transformer classes are imported only
+when they are used to transform files. Documentation and configurables of the transformer are read from the source
+code of its module without importing it and cached, so ``--list-transformers``, ``--describe-transformer`` and the
+validation of configurables do not import transformers and their dependencies.
+"""
+import ast
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import click
+
+from robotidy.transformers import TRANSFORMERS
+
+
+ENTRY_POINT_GROUP = 'robotidy.transformers'
+METADATA_CACHE_FILE = 'transformers.json'
+
+
+class TransformerMetadata:
+    """
+    Documentation and names of configurables (parameters of ``__init__``) of the transformer. ``parameters`` is None
+    if they could not be read - or the transformer accepts any keyword arguments.
+    """
+    def __init__(self, name: str, doc: Optional[str], parameters: Optional[List[str]]):
+        self.name = name
+        self.doc = doc
+        self.parameters = parameters
+
+    def to_json(self) -> Dict:
+        return {'name': self.name, 'doc': self.doc, 'parameters': self.parameters}
+
+    @classmethod
+    def from_json(cls, data: Dict) -> 'TransformerMetadata':
+        return cls(data['name'], data['doc'], data['parameters'])
+
+
+class TransformerSpec:
+    """ Registered transformer - class ``attr`` from ``module`` (of distribution with ``version`` if it is known). """
+    def __init__(self, name: str, module: str, attr: str, version: Optional[str] = None):
+        self.name = name
+        self.module = module
+        self.attr = attr
+        self.version = version
+        # transformer class resolved on the first ``load``
+        self._class = None
+
+    @property
+    def import_name(self) -> str:
+        """ Name for Robot Framework ``Importer`` - it imports class with the same name as the module. """
+        if self.module.rsplit('.', 1)[-1] == self.attr:
+            return self.module
+        return f'{self.module}.{self.attr}'
+
+    def load(self, args):
+        """ Instance of the transformer created with ``args``. The class is imported and resolved only once. """
+        from robot.errors import DataError
+        from robot.utils.importer import Importer
+
+        importer = Importer()
+        if self._class is None:
+            self._class = importer.import_class_or_module(self.import_name)
+        try:
+            # arguments are converted the same way as by ``import_class_or_module(..., instantiate_with_args=args)``
+            return importer._instantiate_class(self._class, list(args))
+        except DataError as err:
+            importer._raise_import_failed(self.import_name, err)
+
+
+def get_entry_points() -> List:
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:  # Python 3.7
+        try:
+            from importlib_metadata import entry_points
+        except ImportError:
+            return []
+    if sys.version_info >= (3, 10):
+        return list(entry_points(group=ENTRY_POINT_GROUP))
+    return list(entry_points().get(ENTRY_POINT_GROUP, ()))
+
+
+def module_path(module: str) -> Optional[str]:
+    """ Path of the source file of the module, found without importing it. """
+    try:
+        module_spec = importlib.util.find_spec(module)
+    except (ImportError, ValueError):
+        return None
+    return module_spec.origin if module_spec is not None else None
+
+
+def transformer_path(name: str) -> Optional[str]:
+    """ Source file of not registered transformer given by path or module name (``module`` or ``module.Class``). """
+    if os.path.isdir(name):
+        return os.path.join(name, '__init__.py')
+    if os.path.isfile(name):
+        return name
+    path = module_path(name)
+    if path is None and '.' in name:
+        # class from the module
+        path = module_path(name.rpartition('.')[0])
+    return path
+
+
+def file_digest(path: Optional[str]) -> Optional[str]:
+    if path is None:
+        return None
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def read_metadata(name: str, source: str, class_name: str) -> Optional[TransformerMetadata]:
+    """ Read transformer metadata from the source code of its module. """
+    for node in ast.parse(source).body:
+        if isinstance(node, ast.ClassDef) and node.name == class_name:
+            return TransformerMetadata(name, ast.get_docstring(node, clean=False), get_init_parameters(node))
+    return None
+
+
+def get_init_parameters(class_node: ast.ClassDef) -> Optional[List[str]]:
+    for node in class_node.body:
+        if isinstance(node, ast.FunctionDef) and node.name == '__init__':
+            if node.args.kwarg is not None:
+                return None
+            args = getattr(node.args, 'posonlyargs', []) + node.args.args + node.args.kwonlyargs
+            return [arg.arg for arg in args[1:]]
+    # __init__ is inherited (ModelTransformer does not accept any arguments) or the class is more complex
+    return [] if all(isinstance(base, ast.Name) and base.id in ('ModelTransformer', 'NodeTransformer')
+                     for base in class_node.bases) else None
+
+
+class TransformerRegistry:
+    """
+    Built-in transformers and transformers registered through entry points. Entry points are scanned only when
+    name is not one of built-in transformers. Metadata read from the source code is cached in ``cache_dir``.
+    """
+    def __init__(self, cache_dir: Optional[Path] = None):
+        self.cache_dir = cache_dir
+        self.builtin = {name: TransformerSpec(name, f'robotidy.transformers.{name}', name) for name in TRANSFORMERS}
+        self._specs = None
+        self._metadata = {}
+        self._metadata_cache = None
+
+    @property
+    def specs(self) -> Dict[str, TransformerSpec]:
+        if self._specs is None:
+            specs = dict(self.builtin)
+            for entry_point in get_entry_points():
+                module, _, attr = entry_point.value.partition(':')
+                version = getattr(getattr(entry_point, 'dist', None), 'version', None)
+                specs.setdefault(entry_point.name,
+                                 TransformerSpec(entry_point.name, module.strip(), attr.strip(), version))
+            self._specs = specs
+        return self._specs
+
+    def names(self) -> List[str]:
+        return list(self.specs)
+
+    def get(self, name: str) -> Optional[TransformerSpec]:
+        if name in self.builtin:
+            return self.builtin[name]
+        return self.specs.get(name)
+
+    def exists(self, name: str) -> bool:
+        """ Transformer is registered or can be found as a module or path (without importing it). """
+        return self.get(name) is not None or transformer_path(name) is not None
+
+    def metadata(self, name: str) -> Optional[TransformerMetadata]:
+        spec = self.get(name)
+        if spec is None:
+            return None
+        if name not in self._metadata:
+            self._metadata[name] = self.read_cached_metadata(spec)
+        return self._metadata[name]
+
+    def code_version(self, name: str) -> Optional[str]:
+        """
+        Identifier of the code of the transformer that is not built-in (built-in transformers are versioned with
+        robotidy) - the version of its distribution and the hash of its module source. None for built-in transformers.
+        """
+        if name in self.builtin:
+            return None
+        spec = self.get(name)
+        if spec is None:
+            return f'None:{file_digest(transformer_path(name))}'
+        return f'{spec.version}:{file_digest(module_path(spec.module))}'
+
+    def read_cached_metadata(self, spec: TransformerSpec) -> TransformerMetadata:
+        path = module_path(spec.module)
+        if path is None or not path.endswith('.py'):
+            return self.import_metadata(spec)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return self.import_metadata(spec)
+        key = f'{spec.name}:{spec.attr}:{path}:{stat.st_size}:{stat.st_mtime_ns}'
+        cache = self.load_metadata_cache()
+        if key in cache:
+            return TransformerMetadata.from_json(cache[key])
+        with open(path, encoding='utf-8') as f:
+            metadata = read_metadata(spec.name, f.read(), spec.attr)
+        if metadata is None:
+            return self.import_metadata(spec)
+        cache[key] = metadata.to_json()
+        self.save_metadata_cache()
+        return metadata
+
+    @staticmethod
+    def import_metadata(spec: TransformerSpec) -> TransformerMetadata:
+        """ Fallback for transformers that can not be found in the source code. """
+        import inspect
+
+        module = importlib.import_module(spec.module)
+        transformer_class = getattr(module, spec.attr)
+        try:
+            parameters = inspect.signature(transformer_class).parameters.values()
+        except (TypeError, ValueError):
+            return TransformerMetadata(spec.name, transformer_class.__doc__, None)
+        if any(param.kind == param.VAR_KEYWORD for param in parameters):
+            return TransformerMetadata(spec.name, transformer_class.__doc__, None)
+        return TransformerMetadata(spec.name, transformer_class.__doc__, [param.name for param in parameters])
+
+    def load_metadata_cache(self) -> Dict:
+        if self._metadata_cache is None:
+            self._metadata_cache = {}
+            if self.cache_dir is not None:
+                try:
+                    with open(Path(self.cache_dir, METADATA_CACHE_FILE), encoding='utf-8') as f:
+                        self._metadata_cache = json.load(f)
+                except (OSError, ValueError):
+                    pass
+        return self._metadata_cache
+
+    def save_metadata_cache(self):
+        if self.cache_dir is None:
+            return
+        path = Path(self.cache_dir, METADATA_CACHE_FILE)
+        tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._metadata_cache, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def validate(self, name: str, args: List[str]):
+        """ Check that named configurables (``name=value``) are accepted by the transformer. """
+        metadata = self.metadata(name)
+        if metadata is None or metadata.parameters is None:
+            return
+        for arg in args:
+            param, separator, _ = arg.partition('=')
+            if separator and param not in metadata.parameters:
+                message = f"Invalid configurable name: '{param}' for transformer: '{name}'."
+                if metadata.parameters:
+                    message += ' Possible values:\n    ' + '\n    '.join(metadata.parameters)
+                raise click.BadOptionUsage(option_name='transform', message=message)
+
+
+_default_registry = None
+
+
+def get_registry() -> TransformerRegistry:
+    """ Registry shared by the whole process (without persistent metadata cache). """
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = TransformerRegistry()
+    return _default_registry
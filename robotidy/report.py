@@ -0,0 +1,150 @@
+"""
+Splitting the run across CI nodes and merging results of the nodes.
+
+``--shard INDEX/COUNT`` transforms only files assigned to the given shard. The shard of the file is decided by the
+stable hash of its path relative to the project root, so every node gets a disjoint subset of files without any
+coordination, and all nodes together cover every file exactly once.
+
+Every node can save its results to the JSON report with ``--report``. Reports of all shards are merged with
+``--merge-reports`` into one list of changed files and one return status.
+"""
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import click
+
+from robotidy.version import __version__
+
+
+REPORT_VERSION = 1
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """ Parse ``INDEX/COUNT`` shard (indexes start from 1). """
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError(f"Shard should be in INDEX/COUNT format, got '{value}'") from None
+    if count < 1:
+        raise ValueError(f'Shard count should be greater than 0, got {count}')
+    if not 1 <= index <= count:
+        raise ValueError(f'Shard index should be between 1 and {count}, got {index}')
+    return index, count
+
+
+def relative_path(path, root: Path) -> str:
+    """ Path relative to the project root with ``/`` separators (or absolute path if it is outside of the root). """
+    path = Path(path)
+    try:
+        return path.relative_to(root).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+def get_shard(relative: str, count: int) -> int:
+    """ Shard (from 1) of the file. Depends only on the relative path - not on the machine or the Python process. """
+    digest = hashlib.sha1(relative.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count + 1
+
+
+def select_shard(paths: Iterable[Path], root: Path, index: int, count: int) -> Iterator[Path]:
+    for path in paths:
+        if get_shard(relative_path(path, root), count) == index:
+            yield path
+
+
+class Report:
+    """ Results of the run saved to the JSON file. Paths are stored relative to the project root. """
+    def __init__(self, path: str, root: Path, shard: Optional[Tuple[int, int]] = None):
+        self.path = path
+        self.root = root
+        self.shard = shard
+        self.files: List[Dict] = []
+
+    def add(self, source, changed: bool):
+        self.files.append({'path': relative_path(source, self.root), 'changed': changed})
+
+    def save(self, status: int):
+        report = {
+            'version': REPORT_VERSION,
+            'robotidy': __version__,
+            'shard': list(self.shard) if self.shard is not None else None,
+            'status': status,
+            'files': self.files
+        }
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+
+class MergedReport:
+    def __init__(self):
+        self.status = 0
+        self.files: List[Dict] = []
+        self.shards = set()
+        self.shard_count = None
+        self.errors = []
+
+    @property
+    def changed(self) -> List[str]:
+        return [file['path'] for file in self.files if file['changed']]
+
+    def missing_shards(self) -> List[int]:
+        if self.shard_count is None:
+            return []
+        return [index for index in range(1, self.shard_count + 1) if index not in self.shards]
+
+
+def read_report(path: str) -> Dict:
+    """ Report saved with ``--report``. Reports that can not be read (for example truncated) raise ``FileError``. """
+    try:
+        with open(path, encoding='utf-8') as f:
+            report = json.load(f)
+    except (OSError, ValueError) as err:
+        raise click.FileError(filename=path, hint=f'Error reading report: {err}')
+    if not isinstance(report, dict):
+        raise click.FileError(filename=path, hint='Error reading report: not a JSON object')
+    if report.get('version') != REPORT_VERSION:
+        return report
+    try:
+        status, files, shard = int(report['status']), list(report['files']), report['shard']
+        if any(not isinstance(file, dict) or 'path' not in file or 'changed' not in file for file in files):
+            raise ValueError('invalid entry in files')
+        if shard is not None:
+            index, count = shard
+            shard = [int(index), int(count)]
+    except (KeyError, TypeError, ValueError) as err:
+        raise click.FileError(filename=path, hint=f'Invalid report: {err}')
+    return {**report, 'status': status, 'files': files, 'shard': shard}
+
+
+def merge_reports(paths: Iterable[str]) -> MergedReport:
+    """
+    Merge reports of several runs. The status is the highest status of the runs. Shards that do not have a report
+    and reports of shards from different splits are reported as errors.
+    """
+    merged = MergedReport()
+    for path in paths:
+        report = read_report(path)
+        if report.get('version') != REPORT_VERSION:
+            merged.errors.append(f"Unsupported version of the report '{path}': {report.get('version')}")
+            continue
+        merged.status = max(merged.status, report['status'])
+        merged.files.extend(report['files'])
+        if report['shard'] is None:
+            continue
+        index, count = report['shard']
+        if merged.shard_count is None:
+            merged.shard_count = count
+        elif merged.shard_count != count:
+            merged.errors.append(f"Report '{path}' is for shard {index}/{count} but other reports are for "
+                                 f"{merged.shard_count} shards")
+            continue
+        if index in merged.shards:
+            merged.errors.append(f"Shard {index}/{count} is reported more than once")
+        merged.shards.add(index)
+    for index in merged.missing_shards():
+        merged.errors.append(f'Report of shard {index}/{merged.shard_count} is missing')
+    merged.files.sort(key=lambda file: file['path'])
+    return merged
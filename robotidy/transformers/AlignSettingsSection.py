@@ -2,15 +2,18 @@ from collections import defaultdict
 
 from robot.api.parsing import (
     ModelTransformer,
+    SettingSection,
     Token
 )
 from robot.parsing.model import Statement
 
+from robotidy.changes import mark_changed, node_lines
 from robotidy.utils import (
     node_outside_selection,
     round_to_four,
     tokens_by_lines,
-    left_align
+    left_align,
+    model_to_text
 )
 
 
@@ -44,12 +47,23 @@ class AlignSettingsSection(ModelTransformer):
     Supports global formatting params: ``--startline``, ``--endline`` and ``--space_count``
     (for columns with fixed length).
     """
+    scope = 'section'
+    node_types = (SettingSection,)
+    reports_changes = True
+
     def __init__(self, up_to_column: int = 0):
         self.up_to_column = up_to_column - 1
 
     def visit_SettingSection(self, node):  # noqa
         if node_outside_selection(node, self.formatting_config):
             return node
+        lines, text = node_lines(node), model_to_text(node)
+        self.align_section(node)
+        if model_to_text(node) != text:
+            mark_changed(lines)
+        return node
+
+    def align_section(self, node):
         statements = []
         for child in node.body:
             if node_outside_selection(child, self.formatting_config):
@@ -60,10 +74,9 @@ class AlignSettingsSection(ModelTransformer):
                 statements.append(list(tokens_by_lines(child)))
         nodes_to_be_aligned = [st for st in statements if isinstance(st, list)]
         if not nodes_to_be_aligned:
-            return node
+            return
         look_up = self.create_look_up(nodes_to_be_aligned, self.up_to_column)  # for every col find longest value
         node.body = self.align_rows(statements, look_up, self.up_to_column)
-        return node
 
     def align_rows(self, statements, look_up, up_to_column=-1):
         aligned_statements = []
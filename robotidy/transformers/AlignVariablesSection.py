@@ -2,15 +2,18 @@ from collections import defaultdict
 
 from robot.api.parsing import (
     ModelTransformer,
-    Token
+    Token,
+    VariableSection
 )
 from robot.parsing.model import Statement
 
+from robotidy.changes import mark_changed, node_lines
 from robotidy.utils import (
     node_outside_selection,
     round_to_four,
     tokens_by_lines,
-    left_align
+    left_align,
+    model_to_text
 )
 
 
@@ -36,10 +39,20 @@ class AlignVariablesSection(ModelTransformer):
 
     Supports global formatting params: ``--startline`` and ``--endline``.
     """
+    scope = 'section'
+    node_types = (VariableSection,)
+    reports_changes = True
 
     def visit_VariableSection(self, node):  # noqa
         if node_outside_selection(node, self.formatting_config):
             return node
+        lines, text = node_lines(node), model_to_text(node)
+        self.align_section(node)
+        if model_to_text(node) != text:
+            mark_changed(lines)
+        return node
+
+    def align_section(self, node):
         statements = []
         for child in node.body:
             if node_outside_selection(child, self.formatting_config):
@@ -50,10 +63,9 @@ class AlignVariablesSection(ModelTransformer):
                 statements.append(list(tokens_by_lines(child)))
         nodes_to_be_aligned = [st for st in statements if isinstance(st, list)]
         if not nodes_to_be_aligned:
-            return node
+            return
         look_up = self.create_look_up(nodes_to_be_aligned)  # for every col find longest value
         node.body = self.align_rows(statements, look_up)
-        return node
 
     def align_rows(self, statements, look_up):
         aligned_statements = []
@@ -1,14 +1,19 @@
 import re
-import ast
 from collections import Counter
 
 import click
 from robot.api.parsing import (
     ModelTransformer,
     Variable,
+    VariableSection,
+    KeywordCall,
     Token
 )
 
+from robotidy.changes import mark_changed, node_lines
+from robotidy.context import FileState
+from robotidy.facts import get_facts
+
 
 class AssignmentNormalizer(ModelTransformer):
     """
@@ -53,10 +58,17 @@ class AssignmentNormalizer(ModelTransformer):
     (possible types are: ``remove``, ``equal_sign`` ('='), ``space_and_equal_sign`` (' =').
 
     """
+    scope = 'block'
+    node_types = (KeywordCall, VariableSection)
+    reports_changes = True
+
+    file_equal_sign_type = FileState(default=None)
+    prepared = FileState(default=False)
+
     def __init__(self, equal_sign_type: str = 'autodetect'):
         self.remove_equal_sign = re.compile(r'\s?=$')
-        self.file_equal_sign_type = None
         self.equal_sign_type = self.parse_equal_sign_type(equal_sign_type)
+        self.facts = ('assignment_signs',) if self.equal_sign_type is None else ()
 
     @staticmethod
     def parse_equal_sign_type(value):
@@ -74,18 +86,25 @@ class AssignmentNormalizer(ModelTransformer):
             )
         return types[value]
 
-    def visit_File(self, node):  # noqa
+    def prepare(self, model):
         """
         If no assignment sign was set the file will be scanned to find most common assignment sign.
-        This auto detection will happen for every file separately.
+        This auto detection will happen for every file separately, before any transformer modifies it.
         """
         if self.equal_sign_type is None:
-            equal_sign_type = self.auto_detect_equal_sign(node)
-            if equal_sign_type is None:
-                return node
-            self.file_equal_sign_type = equal_sign_type
+            self.file_equal_sign_type = self.auto_detect_equal_sign(model)
+        self.prepared = True
+        return self.file_equal_sign_type
+
+    def finalize(self, model):
+        self.prepared = False
+
+    def visit_File(self, node):  # noqa
+        if not self.prepared:
+            self.prepare(node)
         self.generic_visit(node)
-        self.file_equal_sign_type = None
+        self.finalize(node)
+        return node
 
     def visit_KeywordCall(self, node):  # noqa
         if node.assign:  # if keyword returns any value
@@ -102,43 +121,20 @@ class AssignmentNormalizer(ModelTransformer):
         return node
 
     def normalize_equal_sign(self, token):
-        token.value = re.sub(self.remove_equal_sign, '', token.value)
+        if self.equal_sign_type is None and self.file_equal_sign_type is None:
+            return
+        value = re.sub(self.remove_equal_sign, '', token.value)
         if self.equal_sign_type:
-            token.value += self.equal_sign_type
+            value += self.equal_sign_type
         elif self.file_equal_sign_type:
-            token.value += self.file_equal_sign_type
+            value += self.file_equal_sign_type
+        if value != token.value:
+            mark_changed(node_lines(token))
+            token.value = value
 
     @staticmethod
     def auto_detect_equal_sign(node):
-        auto_detector = AssignmentTypeDetector()
-        auto_detector.visit(node)
-        return auto_detector.most_common
-
-
-class AssignmentTypeDetector(ast.NodeVisitor):
-    def __init__(self):
-        self.sign_counter = Counter()
-        self.most_common = None
-
-    def visit_File(self, node):  # noqa
-        self.generic_visit(node)
-        if len(self.sign_counter) >= 2:
-            self.most_common = self.sign_counter.most_common(1)[0][0]
-
-    def visit_KeywordCall(self, node):  # noqa
-        if node.assign:  # if keyword returns any value
-            sign = self.get_assignment_sign(node.assign[-1])
-            self.sign_counter[sign] += 1
-
-    def visit_VariableSection(self, node):  # noqa
-        for child in node.body:
-            if not isinstance(child, Variable):
-                continue
-            var_token = child.get_token(Token.VARIABLE)
-            sign = self.get_assignment_sign(var_token.value)
-            self.sign_counter[sign] += 1
-        return node
-
-    @staticmethod
-    def get_assignment_sign(token_value):
-        return token_value[token_value.find('}')+1:]
+        sign_counter = Counter(get_facts(node, ['assignment_signs'])['assignment_signs'])
+        if len(sign_counter) >= 2:
+            return sign_counter.most_common(1)[0][0]
+        return None
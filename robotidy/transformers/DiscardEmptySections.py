@@ -4,6 +4,8 @@ from robot.api.parsing import (
     Comment,
     CommentSection
 )
+from robot.parsing.model.blocks import Section
+from robotidy.changes import mark_changed, node_lines
 from robotidy.decorators import check_start_end_line
 
 
@@ -19,6 +21,10 @@ class DiscardEmptySections(ModelTransformer):
 
     Supports global formatting params: ``--startline`` and ``--endline``.
     """
+    scope = 'section'
+    node_types = (Section,)
+    reports_changes = True
+
     def __init__(self, allow_only_comments: bool = False):
         # If True then sections only with comments are not considered as empty
         self.allow_only_comments = allow_only_comments
@@ -28,5 +34,9 @@ class DiscardEmptySections(ModelTransformer):
         anything_but = EmptyLine if self.allow_only_comments or isinstance(node, CommentSection)\
             else (Comment, EmptyLine)
         if all(isinstance(child, anything_but) for child in node.body):
+            mark_changed(node_lines(node))
             return None
         return node
+
+    def transform_section_shell(self, node):
+        return self.visit_Section(node)
@@ -1,12 +1,18 @@
 from typing import Optional
-import ast
 
 from robot.api.parsing import (
     ModelTransformer,
     EmptyLine,
+    KeywordSection,
+    TestCaseSection,
     Token
 )
 
+from robotidy.changes import mark_changed, node_lines
+from robotidy.context import FileState
+from robotidy.facts import get_facts
+from robotidy.utils import model_to_text
+
 
 class NormalizeNewLines(ModelTransformer):
     """
@@ -21,85 +27,132 @@ class NormalizeNewLines(ModelTransformer):
     If the suite contains Test Template tests will not be separated by empty lines unless ``separate_templated_tests``
     is set to True.
     """
+    scope = 'section'
+    reports_changes = True
+
+    facts = ('templated',)
+
+    templated = FileState(default=False)
+    last_blocks = FileState(default=None)
+    # empty lines removed from the end of the last blocks and sections - compared with appended lines in finalize
+    removed_from_blocks = FileState(default=None)
+    removed_from_sections = FileState(default=None)
+
     def __init__(self, test_case_lines: int = 1, keyword_lines: Optional[int] = None, section_lines: int = 1,
                  separate_templated_tests: bool = False):
         self.test_case_lines = test_case_lines
         self.keyword_lines = keyword_lines if keyword_lines is not None else test_case_lines
         self.section_lines = section_lines
         self.separate_templated_tests = separate_templated_tests
-        self.last_section = None
-        self.last_test = None
-        self.last_keyword = None
-        self.templated = False
+
+    def prepare(self, model):
+        self.templated = not self.separate_templated_tests and self.is_templated(model)
+        self.last_blocks = set()
+        self.removed_from_blocks = {}
+        self.removed_from_sections = []
+        return self.templated
+
+    def finalize(self, model):
+        """ Empty lines are appended after every section - remove them from the last one. """
+        last_section = model.sections[-1] if model.sections else None
+        if last_section is not None:
+            self.trim_trailing_empty_lines(last_section)
+        for section, lines, last_block, removed in self.removed_from_sections:
+            # empty lines at the end of the last block are moved after the section
+            removed = self.removed_from_blocks.get(last_block, []) + removed
+            appended = self.section_lines if section is not last_section else 0
+            if self.empty_lines_changed(removed, appended):
+                mark_changed(lines)
+        self.last_blocks = None
+        self.removed_from_blocks = None
+        self.removed_from_sections = None
 
     def visit_File(self, node):  # noqa
-        self.templated = not self.separate_templated_tests and self.is_templated(node)
-        self.last_section = node.sections[-1] if node.sections else None
-        return self.generic_visit(node)
+        if self.last_blocks is None:
+            self.prepare(node)
+        self.generic_visit(node)
+        self.finalize(node)
+        return node
 
     def visit_Section(self, node):  # noqa
-        self.trim_leading_empty_lines(node)
-        self.trim_trailing_empty_lines(node)
-        empty_line = EmptyLine.from_params()
-        if node is self.last_section:
-            return self.generic_visit(node)
-        node.body.extend([empty_line] * self.section_lines)
+        self.transform_section_shell(node)
         return self.generic_visit(node)
 
-    def visit_TestCaseSection(self, node):  # noqa
-        self.last_test = node.body[-1] if node.body else None
-        return self.visit_Section(node)
-
-    def visit_KeywordSection(self, node):  # noqa
-        self.last_keyword = node.body[-1] if node.body else None
-        return self.visit_Section(node)
+    def transform_section_shell(self, node):
+        last_block = None
+        if isinstance(node, (TestCaseSection, KeywordSection)) and node.body:
+            last_block = node.body[-1]
+            self.last_blocks.add(last_block)
+        lines = node_lines(node)
+        removed = self.trim_empty_lines(node, lines)
+        self.removed_from_sections.append((node, lines, last_block, removed))
+        node.body.extend([EmptyLine.from_params()] * self.section_lines)
+        return node
 
     def visit_TestCase(self, node):  # noqa
-        self.trim_leading_empty_lines(node)
-        self.trim_trailing_empty_lines(node)
-        if node is not self.last_test and not self.templated:
-            node.body.extend([EmptyLine.from_params()] * self.test_case_lines)
+        lines_between = 0 if self.templated else self.test_case_lines
+        self.normalize_block_lines(node, lines_between)
         return self.generic_visit(node)
 
     def visit_Keyword(self, node):  # noqa
-        self.trim_leading_empty_lines(node)
-        self.trim_trailing_empty_lines(node)
-        if node is not self.last_keyword:
-            node.body.extend([EmptyLine.from_params()] * self.keyword_lines)
+        self.normalize_block_lines(node, self.keyword_lines)
         return self.generic_visit(node)
 
+    def normalize_block_lines(self, node, lines_between):
+        lines = node_lines(node)
+        removed = self.trim_empty_lines(node, lines)
+        if node in self.last_blocks:
+            self.removed_from_blocks[node] = removed
+            return
+        node.body.extend([EmptyLine.from_params()] * lines_between)
+        if self.empty_lines_changed(removed, lines_between):
+            mark_changed(lines)
+
     def visit_Statement(self, node):  # noqa
         tokens = []
+        changed = False
         for line in node.lines:
-            if line[-1].type == Token.EOL:
+            if line[-1].type == Token.EOL and line[-1].value != '\n':
+                changed = True
                 line[-1].value = '\n'  # TODO: use global formatting in the future
             tokens.extend(line)
+        if changed:
+            mark_changed(node_lines(node))
         node.tokens = tokens
         return node
 
+    def trim_empty_lines(self, node, lines):
+        """ Remove leading and trailing empty lines. Returns removed trailing lines (all lines if body was empty). """
+        leading = self.trim_leading_empty_lines(node)
+        if not node.body:
+            return leading
+        if leading:
+            mark_changed(lines)
+        return self.trim_trailing_empty_lines(node)
+
+    @staticmethod
+    def empty_lines_changed(removed, appended: int) -> bool:
+        """ Check if ``removed`` empty lines are different than ``appended`` number of new empty lines. """
+        return len(removed) != appended or any(model_to_text(line) != '\n' for line in removed)
+
     @staticmethod
     def trim_trailing_empty_lines(node):
+        """ Remove empty lines from the end of the node. Returns removed lines. """
+        removed = []
         if not hasattr(node, 'body'):
-            return
+            return removed
         while node.body and isinstance(node.body[-1], EmptyLine):
-            node.body.pop()
+            removed.insert(0, node.body.pop())
+        return removed
 
     @staticmethod
     def trim_leading_empty_lines(node):
+        """ Remove empty lines from the start of the node. Returns removed lines. """
+        removed = []
         while node.body and isinstance(node.body[0], EmptyLine):
-            node.body.pop(0)
+            removed.append(node.body.pop(0))
+        return removed
 
     @staticmethod
     def is_templated(node):
-        template_finder = TestTemplateFinder()
-        template_finder.visit(node)
-        return template_finder.templated
-
-
-class TestTemplateFinder(ast.NodeVisitor):
-    def __init__(self):
-        self.templated = False
-
-    def visit_TestTemplate(self, node):  # noqa
-        if node.value:
-            self.templated = True
+        return get_facts(node, ['templated'])['templated']
@@ -1,8 +1,12 @@
+import re
+
 from robot.api.parsing import (
     ModelTransformer,
-    SectionHeader
+    SectionHeader,
+    Token
 )
 
+from robotidy.changes import mark_changed, node_lines
 from robotidy.decorators import check_start_end_line
 
 
@@ -30,15 +34,36 @@ class NormalizeSectionHeaderName(ModelTransformer):
 
     Supports global formatting params: ``--startline`` and ``--endline``.
     """
+    scope = 'block'
+    node_types = (SectionHeader,)
+    reports_changes = True
+
+    HEADER_LINE = re.compile(r'^(?:\*|\|\s+\*)[^\n]*', re.MULTILINE)
+    SEPARATOR = re.compile(r'\s{2,}|\t')
+
     def __init__(self, uppercase: bool = False):
         self.uppercase = uppercase
+        self.normalized_names = {self.normalize_name(header_type) for header_type in Token.HEADER_TOKENS}
+
+    def prefilter(self, text):
+        """ Nothing to normalize if every section header is already in normalized form. """
+        for match in self.HEADER_LINE.finditer(text):
+            line = match.group()
+            if line.startswith('|'):
+                return True
+            if self.SEPARATOR.split(line.rstrip(), 1)[0] not in self.normalized_names:
+                return True
+        return False
+
+    def normalize_name(self, header_type):
+        normalized_name = SectionHeader.from_params(type=header_type).data_tokens[0].value
+        return normalized_name.upper() if self.uppercase else normalized_name
 
     @check_start_end_line
     def visit_SectionHeader(self, node):  # noqa
-        normalized_section = SectionHeader.from_params(type=node.type)
-        normalized_name = normalized_section.data_tokens[0].value
-        if self.uppercase:
-            normalized_name = normalized_name.upper()
+        normalized_name = self.normalize_name(node.type)
         # we only modify header token value in order to preserver optional data driven testing column names
-        node.data_tokens[0].value = normalized_name
+        if node.data_tokens[0].value != normalized_name:
+            mark_changed(node_lines(node))
+            node.data_tokens[0].value = normalized_name
         return node
@@ -4,6 +4,7 @@ from robot.api.parsing import (
 )
 from robot.utils.normalizing import normalize_whitespace
 
+from robotidy.changes import mark_changed, node_lines
 from robotidy.decorators import check_start_end_line
 
 
@@ -36,6 +37,9 @@ class NormalizeSettingName(ModelTransformer):
 
     Supports global formatting params: ``--startline`` and ``--endline``.
     """
+    scope = 'block'
+    reports_changes = True
+
     @check_start_end_line
     def visit_Statement(self, node):  # noqa
         if node.type not in Token.SETTING_TOKENS:
@@ -45,7 +49,9 @@ class NormalizeSettingName(ModelTransformer):
             name = f'[{self.normalize_name(name[1:-1])}]'
         else:
             name = self.normalize_name(name)
-        node.data_tokens[0].value = name
+        if node.data_tokens[0].value != name:
+            mark_changed(node_lines(node))
+            node.data_tokens[0].value = name
         return node
 
     @staticmethod
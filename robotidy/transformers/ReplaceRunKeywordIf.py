@@ -10,6 +10,7 @@ from robot.api.parsing import (
 )
 from robotidy.utils import normalize_name, after_last_dot
 from robotidy.decorators import check_start_end_line
+from robotidy.changes import mark_changed, node_lines
 
 
 def insert_separators(indent, tokens, space_count):
@@ -67,12 +68,25 @@ class ReplaceRunKeywordIf(ModelTransformer):
         END
 
     """
+    scope = 'block'
+    node_types = (KeywordCall,)
+    reports_changes = True
+
+    @staticmethod
+    def prefilter(text):
+        """ Names of keywords are normalized the same way, so ``Run Keyword If`` can not be used without the match. """
+        return 'runkeywordif' in normalize_name(text)
+
     @check_start_end_line
     def visit_KeywordCall(self, node):  # noqa
         if not node.keyword:
             return node
         if after_last_dot(normalize_name(node.keyword)) == 'runkeywordif':
-            return self.create_branched(node)
+            lines = node_lines(node)
+            branched = self.create_branched(node)
+            if branched is not node:
+                mark_changed(lines)
+            return branched
         return node
 
     def create_branched(self, node):
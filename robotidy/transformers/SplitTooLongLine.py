@@ -1,7 +1,9 @@
 from robot.api.parsing import (
+    KeywordCall,
     ModelTransformer,
     Token
 )
+from robotidy.changes import mark_changed, node_lines
 from robotidy.decorators import check_start_end_line
 
 
@@ -31,15 +33,24 @@ class SplitTooLongLine(ModelTransformer):
 
     Supports global formatting params: ``space_count``, ``--startline`` and ``--endline``.
     """
+    scope = 'block'
+    node_types = (KeywordCall,)
+    reports_changes = True
+
     def __init__(self, line_length: int = 120, split_on_every_arg: bool = False):
         super().__init__()
         self.line_length = line_length
         self.split_on_every_arg = split_on_every_arg
 
+    def prefilter(self, text):
+        """ Nothing to split if every line (with the line separator) is shorter than ``line_length``. """
+        return max(map(len, text.split('\n'))) + 1 >= self.line_length
+
     @check_start_end_line
     def visit_KeywordCall(self, node):  # noqa
         if all(line[-1].end_col_offset < self.line_length for line in node.lines):
             return node
+        mark_changed(node_lines(node))
         return self.split_keyword_call(node)
 
     def split_keyword_call(self, node):
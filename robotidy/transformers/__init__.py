@@ -3,11 +3,17 @@ Transformers are classes used to transform passed Robot Framework code model.
 
 To create your own transformer you need to create file with the same name as your transformer class. Your class
 need to inherit from ``ModelTransformer`` or ``ast.NodeTransformer`` class. Finally put name of your transformer in
-``TRANSFORMERS`` variable in this file.
-"""
-from robot.utils.importer import Importer
+``TRANSFORMERS`` variable in this file and register it in ``robotidy.transformers`` entry point group in
+``setup.py``. Transformers from other packages are registered in the same entry point group (see
+``robotidy.registry``).
+
+Transformer instances are shared between processed files (and threads). Store state that is valid only for the
+currently transformed file in ``robotidy.context.FileState`` attributes. Use ``scope`` class attribute to declare
+if transformer can be run on a part of the file (see ``robotidy.chunks``).
 
-TRANSFORMERS = frozenset((
+Transformer modules (and Robot Framework) are imported only when transformers are loaded.
+"""
+TRANSFORMERS = (
     'AlignSettingsSection',
     'AlignVariablesSection',
     'AssignmentNormalizer',
@@ -17,20 +23,26 @@ TRANSFORMERS = frozenset((
     'NormalizeSettingName',
     'ReplaceRunKeywordIf',
     'SplitTooLongLine'
-))
+)
+
 
+def load_transformers(allowed_transformers, registry=None):
+    """
+    Load transformers with given names and arguments (or all built-in transformers if ``allowed_transformers`` is
+    empty). Names are resolved through ``robotidy.registry``, unknown names are imported as module or path.
+    """
+    from robot.utils.importer import Importer
+    from robotidy.registry import get_registry
 
-def load_transformers(allowed_transformers):
-    """ Dynamically load all classes from this file with attribute `name` defined in allowed_transformers """
+    registry = registry or get_registry()
     if allowed_transformers:
         loaded_transformers = dict()
         for name, args in allowed_transformers:
-            name = f'robotidy.transformers.{name}' if name in TRANSFORMERS else name
-            loaded_transformers[name] = Importer().import_class_or_module(
-                name,
-                instantiate_with_args=args
-            )
+            spec = registry.get(name)
+            if spec is None:
+                loaded_transformers[name] = Importer().import_class_or_module(name, instantiate_with_args=args)
+            else:
+                loaded_transformers[spec.import_name if name in TRANSFORMERS else name] = spec.load(args)
         return loaded_transformers
     else:
-        return {name: Importer().import_class_or_module(f'robotidy.transformers.{name}', instantiate_with_args=())
-                for name in TRANSFORMERS}
+        return {name: registry.get(name).load(()) for name in TRANSFORMERS}
@@ -1,24 +1,80 @@
+"""
+Helpers shared by robotidy modules and transformers. Robot Framework is imported only when the helpers are used so
+importing this module does not slow down robotidy startup.
+"""
+import ast
 import os
-from typing import List
+import shutil
+import tempfile
+from typing import Iterable, Iterator, List, Optional, Tuple
 
-from robot.api.parsing import (
-    ModelVisitor,
-    Token
-)
-from robot.parsing.model import Statement
+from robotidy.context import current_context
 
 
-class StatementLinesCollector(ModelVisitor):
+def iter_statements(node) -> Iterator:
+    """ Yield statements of ``node`` in the order they appear in the file. """
+    from robot.parsing.model import Statement
+
+    if isinstance(node, Statement):
+        yield node
+        return
+    for child in ast.iter_child_nodes(node):
+        yield from iter_statements(child)
+
+
+def model_to_text(model) -> str:
+    """ Writeable presentation of Robot Framework model - the same text as written by ``model.save()``. """
+    return ''.join([token.value for statement in iter_statements(model) for token in statement.tokens])
+
+
+def write_file(path, text: str):
+    """
+    Replace content of the file with ``text`` atomically - the text is written to the temporary file in the same
+    directory which is renamed over the original file. Permissions of the original file are preserved.
+    """
+    path = os.path.realpath(path)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f'.{os.path.basename(path)}.', suffix='.tmp')
+    try:
+        with open(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def sync_files(paths: Iterable):
+    """
+    Flush written files to the disk. Directories of the files are flushed too (where it is supported), so the
+    renames done by ``write_file`` are persisted. Only given files are flushed, not all dirty pages of the system.
+    """
+    directories = set()
+    for path in paths:
+        path = os.path.realpath(path)
+        with open(path, 'rb+') as f:
+            os.fsync(f.fileno())
+        directories.add(os.path.dirname(path))
+    if os.name != 'posix':
+        # directories can not be opened on Windows
+        return
+    for directory in sorted(directories):
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class StatementLinesCollector:
     """
     Used to get writeable presentation of Robot Framework model.
     """
     def __init__(self, model):
-        self.text = ''
-        self.visit(model)
-
-    def visit_Statement(self, node):  # noqa
-        for token in node.tokens:
-            self.text += token.value
+        self.text = model_to_text(model)
 
     def __eq__(self, other):
         return other.text == self.text
@@ -74,6 +130,20 @@ def node_within_lines(node_start, node_end, start_line, end_line):
     return True
 
 
+def selected_line_ranges() -> Optional[List[Tuple[int, int]]]:
+    """ Line ranges selected for the currently transformed file (with ``--staged``) or None if not limited. """
+    context = current_context()
+    return context.line_ranges if context is not None else None
+
+
+def node_within_ranges(node_start, node_end):
+    """ Check if node is within one of the line ranges selected for the currently transformed file. """
+    line_ranges = selected_line_ranges()
+    if line_ranges is None:
+        return True
+    return any(start <= node_start and node_end <= end for start, end in line_ranges)
+
+
 def node_outside_selection(node, formatting_config):
     """
     Contrary to ``node_within_lines`` it just checks if node is fully outside selected lines.
@@ -82,6 +152,9 @@ def node_outside_selection(node, formatting_config):
     if formatting_config.start_line and formatting_config.start_line > node.end_lineno or \
             formatting_config.end_line and formatting_config.end_line < node.lineno:
         return True
+    line_ranges = selected_line_ranges()
+    if line_ranges is not None:
+        return all(start > node.end_lineno or end < node.lineno for start, end in line_ranges)
     return False
 
 
@@ -122,6 +195,8 @@ def round_to_four(number):
 
 
 def tokens_by_lines(node):
+    from robot.api import Token
+
     for index, line in enumerate(node.lines):
         if line:
             if line[0].type == Token.VARIABLE and not line[0].value:
@@ -134,6 +209,8 @@ def tokens_by_lines(node):
 
 def left_align(node):
     """ remove leading separator token """
+    from robot.parsing.model import Statement
+
     tokens = list(node.tokens)
     if tokens:
         tokens[0].value = tokens[0].value.lstrip(' \t')
@@ -0,0 +1,192 @@
+"""
+Running robotidy in multiple worker processes or threads.
+
+With processes, sources are grouped into batches (small files are sent together to keep IPC overhead low) and
+transformed by worker processes. Every worker loads its own set of transformers. Threads share the transformers
+loaded by the main thread - per-file state is kept in ``robotidy.context.FileContext``. Threads run in parallel
+only on free-threaded (no GIL) Python builds.
+
+In both cases results are returned in the same order as sources were passed so the output and the return status
+are the same as with the serial run. Files are scheduled by their estimated processing time, the longest first, so
+a big file picked up at the end of the run does not keep all other workers idle.
+"""
+import math
+import os
+import sys
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+
+BATCH_SIZE = 64 * 1024  # summed size (in bytes) of source files sent to a worker in one task
+MAX_BATCH_FILES = 32
+CGROUP_ROOT = '/sys/fs/cgroup'
+
+_worker_tidy = None
+_worker_stop = None
+
+
+def cgroup_cpu_limit(root: str = CGROUP_ROOT) -> Optional[int]:
+    """
+    Return the number of CPUs allowed by the cgroup CPU quota or None if the quota is not set.
+    Both cgroup v2 (``cpu.max``) and cgroup v1 (``cpu.cfs_quota_us`` and ``cpu.cfs_period_us``) are supported.
+    """
+    try:
+        with open(os.path.join(root, 'cpu.max')) as f:
+            quota, period = f.read().split()
+        if quota == 'max':
+            return None
+        return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    for controller in ('cpu', 'cpu,cpuacct'):
+        try:
+            with open(os.path.join(root, controller, 'cpu.cfs_quota_us')) as f:
+                quota = int(f.read())
+            with open(os.path.join(root, controller, 'cpu.cfs_period_us')) as f:
+                period = int(f.read())
+        except (OSError, ValueError):
+            continue
+        if quota <= 0 or period <= 0:
+            return None
+        return max(1, math.ceil(quota / period))
+    return None
+
+
+def available_cpu_count() -> int:
+    if hasattr(os, 'sched_getaffinity'):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, limit)
+    return max(1, cpus)
+
+
+def gil_enabled() -> bool:
+    """ Return False only on free-threaded Python build with GIL disabled. """
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    return is_gil_enabled() if is_gil_enabled is not None else True
+
+
+def get_workers_count(value: str) -> int:
+    """ Convert ``--workers`` or ``--threads`` value to number of workers. ``auto`` means number of available CPUs. """
+    if value == 'auto':
+        return available_cpu_count()
+    count = int(value)
+    if count < 1:
+        raise ValueError(f'Number of workers should be greater than 0, got {count}')
+    return count
+
+
+def batch_sources(sources: Iterable[Path], batch_size: int = BATCH_SIZE,
+                  max_files: int = MAX_BATCH_FILES) -> Iterator[List[Path]]:
+    """ Group sources into batches with summed file size not bigger than ``batch_size``. Order is preserved. """
+    batch, size = [], 0
+    for source in sources:
+        try:
+            source_size = os.stat(source).st_size
+        except OSError:
+            source_size = 0
+        if batch and (size + source_size > batch_size or len(batch) >= max_files):
+            yield batch
+            batch, size = [], 0
+        batch.append(source)
+        size += source_size
+    if batch:
+        yield batch
+
+
+def longest_first(sources: List[Path], durations: Dict[str, float]) -> List[int]:
+    """
+    Indexes of ``sources`` ordered by estimated processing time, the longest first. The time is taken from
+    ``durations`` recorded in previous runs (by absolute paths). Other files are estimated by their size, using the
+    average time per byte of files with known duration.
+    """
+    sizes, known = [], {}
+    for index, source in enumerate(sources):
+        try:
+            sizes.append(os.stat(source).st_size)
+        except OSError:
+            sizes.append(0)
+        duration = durations.get(str(Path(source).absolute()))
+        if duration is not None:
+            known[index] = duration
+    known_size = sum(sizes[index] for index in known)
+    rate = sum(known.values()) / known_size if known_size else 1.0
+    estimates = [known.get(index, size * rate) for index, size in enumerate(sizes)]
+    # stable sort - files with the same estimate keep the order of sources
+    return sorted(range(len(sources)), key=lambda index: -estimates[index])
+
+
+def restore_order(results: Iterable, order: List[int]) -> Iterator:
+    """ Yield ``results`` of sources transformed in the ``order`` (list of indexes) in the original order. """
+    pending = {}
+    next_index = 0
+    for index, result in zip(order, results):
+        pending[index] = result
+        while next_index in pending:
+            yield pending.pop(next_index)
+            next_index += 1
+
+
+def _init_worker(tidy_args, stop):
+    global _worker_tidy, _worker_stop
+    from robotidy.app import Robotidy
+
+    _worker_tidy = Robotidy(**tidy_args)
+    _worker_stop = stop
+
+
+def _transform_batch(batch):
+    results = []
+    for source in batch:
+        if _worker_stop.is_set():
+            break
+        result = _worker_tidy.transform_file(source)
+        results.append(result)
+        if _worker_tidy.fail_fast and _worker_tidy.check and result.changed:
+            # the run stops at this file - the rest of the batch would not be used
+            break
+    return results
+
+
+def transform_in_processes(tidy_args, sources: Iterable[Path], workers: int):
+    """
+    Transform ``sources`` using ``workers`` processes. ``tidy_args`` are used to create ``Robotidy`` instance
+    in every worker. Yields results in the same order as sources. If the results stop being consumed (for example
+    with ``--fail-fast``), pending batches are cancelled and running batches stop before their next file. With
+    ``--fail-fast`` the batch also ends at its first changed file.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    stop = multiprocessing.Event()
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(tidy_args, stop))
+    futures = [executor.submit(_transform_batch, batch) for batch in batch_sources(sources)]
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        stop.set()
+        for future in futures:
+            future.cancel()
+        executor.shutdown()
+
+
+def transform_in_threads(transform: Callable, sources: Iterable[Path], threads: int):
+    """
+    Transform ``sources`` with ``transform`` function using ``threads`` threads. Yields results in order. Files that
+    are not started yet are skipped if the results stop being consumed.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    executor = ThreadPoolExecutor(max_workers=threads)
+    futures = [executor.submit(transform, source) for source in sources]
+    try:
+        for future in futures:
+            yield future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown()
@@ -1,6 +1,7 @@
 import pathlib
 from setuptools import setup
 from robotidy.version import __version__
+from robotidy.transformers import TRANSFORMERS
 
 
 HERE = pathlib.Path(__file__).parent
@@ -34,7 +35,7 @@ setup(
     platforms="any",
     classifiers=CLASSIFIERS,
     keywords='robotframework',
-    packages=['robotidy'],
+    packages=['robotidy', 'robotidy.transformers'],
     include_package_data=True,
     python_requires=">=3.7",
     install_requires=[
@@ -46,5 +47,8 @@ setup(
         'dev': ['pytest', 'pylama', 'pylama_pylint', 'coverage'],
         'doc': ['sphinx', 'sphinx_rtd_theme']
     },
-    entry_points={'console_scripts': ['robotidy=robotidy.cli:cli']},
+    entry_points={
+        'console_scripts': ['robotidy=robotidy.cli:cli'],
+        'robotidy.transformers': [f'{name} = robotidy.transformers.{name}:{name}' for name in TRANSFORMERS]
+    },
 )
@@ -11,12 +11,16 @@ from robotidy.cli import cli
 from robotidy.utils import decorate_diff_with_color
 
 
-def save_tmp_model(self, model):
+def save_tmp_model(self, model, text=None):
     """ Decorator that disables default robotidy save to file mechanism and replace with mocked one.
     That way we can save output to 'actual' directory for easy comparison with expected files.  """
     path = Path(Path(__file__).parent, 'actual', Path(model.source).name)
     print(path)
-    model.save(output=path)
+    if text is None:
+        model.save(output=path)
+        return
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
 
 
 def run_tidy(
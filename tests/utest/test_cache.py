@@ -0,0 +1,226 @@
+import pickle
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+from robot.api import get_model
+
+from robotidy.cache import (
+    Cache,
+    deserialize_nodes,
+    deserialize_tokens,
+    get_digest,
+    get_fingerprint,
+    serialize_nodes,
+    serialize_tokens,
+    tokenize,
+    tokens_to_model
+)
+from robotidy.utils import GlobalFormattingConfig, StatementLinesCollector
+from .utils import run_tidy
+
+
+ATEST_DIR = Path(Path(__file__).parent.parent, 'atest', 'transformers')
+
+
+def formatting_config(space_count=4):
+    return GlobalFormattingConfig(
+        use_pipes=False, space_count=space_count, line_sep='unix', start_line=None, end_line=None
+    )
+
+
+class TestCache:
+    def test_fingerprint_depends_on_pipeline(self):
+        fingerprint = get_fingerprint([('SplitTooLongLine', [])], formatting_config())
+        assert fingerprint == get_fingerprint([('SplitTooLongLine', [])], formatting_config())
+        assert fingerprint != get_fingerprint([('SplitTooLongLine', ['line_length=140'])], formatting_config())
+        assert fingerprint != get_fingerprint([('SplitTooLongLine', [])], formatting_config(space_count=2))
+        assert fingerprint != get_fingerprint([('NormalizeNewLines', [])], formatting_config())
+
+    def test_fingerprint_depends_on_custom_transformer_code(self, tmp_path):
+        transformer = tmp_path / 'CustomTransformer.py'
+        transformer.write_text('class CustomTransformer:\n    pass\n')
+        fingerprint = get_fingerprint([(str(transformer), [])], formatting_config())
+        assert fingerprint == get_fingerprint([(str(transformer), [])], formatting_config())
+        transformer.write_text('class CustomTransformer:\n    scope = "block"\n')
+        assert fingerprint != get_fingerprint([(str(transformer), [])], formatting_config())
+
+    def test_save_and_lookup(self, tmp_path):
+        cache = Cache(tmp_path, 'fingerprint')
+        digest = get_digest(b'*** Settings ***\n')
+        assert not cache.is_formatted(digest)
+        cache.save([digest])
+        assert cache.is_formatted(digest)
+        assert not Cache(tmp_path, 'other fingerprint').is_formatted(digest)
+        cache.close()
+
+    def test_least_recently_used_evicted(self, tmp_path):
+        cache = Cache(tmp_path, 'fingerprint', max_size=2)
+        cache.save(['first'])
+        cache.save(['second'])
+        cache.save(['first'])
+        cache.save(['third'])
+        assert cache.is_formatted('first')
+        assert not cache.is_formatted('second')
+        assert cache.is_formatted('third')
+
+    def test_cache_is_picklable(self, tmp_path):
+        cache = Cache(tmp_path, 'fingerprint')
+        cache.save(['digest'])
+        unpickled = pickle.loads(pickle.dumps(cache))
+        assert unpickled.is_formatted('digest')
+
+    def test_error_disables_cache(self, tmp_path):
+        not_dir = tmp_path / 'file'
+        not_dir.write_text('')
+        cache = Cache(not_dir, 'fingerprint')
+        assert not cache.is_formatted('digest')
+        assert cache.error
+        cache.save(['digest'])
+
+    def test_formatted_files_skipped(self, tmp_path):
+        source = str(Path(Path(__file__).parent, 'testdata', 'check', 'golden.robot'))
+        args = ['--cache', '--cache-dir', str(tmp_path), '--check', '--verbose',
+                '--transform', 'NormalizeSectionHeaderName', source]
+        result = run_tidy(args)
+        assert 'Cache: 0 hits, 1 misses' in result.output
+        result = run_tidy(args)
+        assert 'Cache: 1 hits, 0 misses' in result.output
+        result = run_tidy(args[:-2] + ['NormalizeSectionHeaderName:uppercase=True', source], exit_code=1)
+        assert 'Cache: 0 hits, 1 misses' in result.output
+
+    def test_model_rebuilt_from_serialized_tokens(self):
+        source = Path(Path(__file__).parent, 'testdata', 'check', 'not_golden.robot')
+        tokens = tokenize(source.read_bytes())
+        model = tokens_to_model(deserialize_tokens(serialize_tokens(tokens)), source)
+        expected = get_model(source)
+        assert StatementLinesCollector(model) == StatementLinesCollector(expected)
+        assert [type(section) for section in model.sections] == [type(section) for section in expected.sections]
+        assert model.source == expected.source
+
+    def test_model_rebuilt_without_private_parser_api(self):
+        source = Path(Path(__file__).parent, 'testdata', 'check', 'not_golden.robot')
+        tokens = tokenize(source.read_bytes())
+        expected = tokens_to_model(tokens, source)
+        with patch.dict(sys.modules, {'robot.parsing.parser.parser': None}):
+            model = tokens_to_model(tokens, source)
+        assert StatementLinesCollector(model) == StatementLinesCollector(expected)
+        assert model.source == expected.source
+
+    def test_private_parser_api_available(self):
+        # supported Robot Framework versions build the model from tokens without parsing the text again
+        from robot.parsing.parser.parser import _statements_to_model, _tokens_to_statements  # noqa
+
+    def test_models_of_current_run_kept(self, tmp_path):
+        cache = Cache(tmp_path, 'fingerprint', max_models=1)
+        cache.keep_models(2)
+        cache.save([], {'first': b'data'})
+        cache.save([], {'second': b'data'})
+        assert cache.load_model_data('first') == b'data'
+        assert cache.load_model_data('second') == b'data'
+
+    def test_models_saved_in_batches(self, tmp_path):
+        sources = tmp_path / 'sources'
+        sources.mkdir()
+        for index in range(3):
+            (sources / f'test{index}.robot').write_text(f'*** test cases ***\nTest {index}\n    No Operation\n')
+        args = ['--cache', '--cache-dir', str(tmp_path / 'cache'), '--check', '--verbose', '--transform']
+        with patch('robotidy.app.CACHE_SAVE_BATCH', 1), patch.object(Cache, 'save', autospec=True,
+                                                                     side_effect=Cache.save) as save_mock:
+            run_tidy(args + ['NormalizeSectionHeaderName', str(sources)], exit_code=1)
+        assert save_mock.call_count == 4
+        result = run_tidy(args + ['NormalizeSectionHeaderName:uppercase=True', str(sources)], exit_code=1)
+        assert 'Parsed model cache: 3 hits, 0 misses' in result.output
+
+    def test_model_cache(self, tmp_path):
+        cache = Cache(tmp_path, 'fingerprint')
+        assert cache.load_model_data('digest') is None
+        cache.save([], {'digest': b'data'})
+        cache.save([], {'digest': None})
+        assert cache.load_model_data('digest') == b'data'
+
+    def test_parsed_model_reused_after_config_change(self, tmp_path):
+        source = str(Path(Path(__file__).parent, 'testdata', 'check', 'not_golden.robot'))
+        args = ['--cache', '--cache-dir', str(tmp_path), '--check', '--verbose', '--transform']
+        result = run_tidy(args + ['NormalizeSectionHeaderName', source], exit_code=1)
+        assert 'Parsed model cache: 0 hits, 1 misses' in result.output
+        result = run_tidy(args + ['NormalizeSectionHeaderName:uppercase=True', source], exit_code=1)
+        assert 'Parsed model cache: 1 hits, 0 misses' in result.output
+
+    def test_nodes_rebuilt_with_structure(self):
+        source = ATEST_DIR / 'ReplaceRunKeywordIf' / 'expected' / 'tests.robot'
+        expected = get_model(source)
+        sections = deserialize_nodes(serialize_nodes(expected.sections))
+        assert [type(section) for section in sections] == [type(section) for section in expected.sections]
+        assert [[type(node) for node in section.body] for section in sections] == \
+               [[type(node) for node in section.body] for section in expected.sections]
+        model = get_model(source)
+        model.sections = sections
+        assert StatementLinesCollector(model) == StatementLinesCollector(expected)
+
+    def test_chunk_cache(self, tmp_path):
+        cache = Cache(tmp_path, 'fingerprint')
+        assert cache.load_chunks(['key']) == {}
+        cache.save([], chunks={'key': b'data', 'other': b'other data'})
+        cache.save([], chunks={'key': None})
+        assert cache.load_chunks(['key', 'missing']) == {'key': b'data'}
+
+    def test_modified_file_transformed_with_cached_chunks(self, tmp_path):
+        source = tmp_path / 'source' / 'tests.robot'
+        source.parent.mkdir()
+        content = (ATEST_DIR / 'NormalizeNewLines' / 'source' / 'tests.robot').read_text()
+        modified = content.replace('*** Keywords ***', '*** Keywords ***\nNew Keyword\n    Log  new\n')
+        expected = tmp_path / 'expected.robot'
+        expected.write_text(modified)
+        run_tidy(['--no-cache', str(expected)])
+
+        args = ['--cache', '--cache-chunks', '--cache-dir', str(tmp_path / 'cache'), '--verbose', str(source)]
+        source.write_text(content)
+        result = run_tidy(args)
+        assert 'Chunk cache: 0 hits' in result.output
+        source.write_text(modified)
+        result = run_tidy(args)
+        assert 'Chunk cache: 0 hits' not in result.output
+        assert source.read_text() == expected.read_text()
+
+    def test_cache_chunks_requires_cache(self):
+        result = run_tidy(['--cache-chunks', str(ATEST_DIR)], exit_code=2)
+        assert '--cache-chunks requires --cache' in result.output
+
+    def test_manifest(self, tmp_path):
+        cache = Cache(tmp_path, 'fingerprint')
+        assert cache.load_manifest() == {}
+        cache.save([], manifest={'/src/tests.robot': (10, 20, 30)})
+        assert cache.load_manifest() == {'/src/tests.robot': (10, 20, 30)}
+        assert Cache(tmp_path, 'other fingerprint').load_manifest() == {}
+
+    def test_durations(self, tmp_path):
+        cache = Cache(tmp_path, 'fingerprint')
+        assert cache.load_durations() == {}
+        cache.save([], durations={'/src/tests.robot': 0.5})
+        cache.save([], durations={'/src/other.robot': 1.5})
+        assert Cache(tmp_path, 'other fingerprint').load_durations() == {'/src/tests.robot': 0.5,
+                                                                         '/src/other.robot': 1.5}
+
+    def test_durations_recorded(self, tmp_path):
+        source = tmp_path / 'golden.robot'
+        source.write_text(Path(Path(__file__).parent, 'testdata', 'check', 'golden.robot').read_text())
+        run_tidy(['--cache', '--cache-dir', str(tmp_path / 'cache'), '--check', '--transform',
+                  'NormalizeSectionHeaderName', str(source)])
+        durations = Cache(tmp_path / 'cache', 'fingerprint').load_durations()
+        assert list(durations) == [str(source.resolve())]
+
+    def test_unchanged_files_not_read_with_cache_stat(self, tmp_path):
+        source = tmp_path / 'golden.robot'
+        source.write_text(Path(Path(__file__).parent, 'testdata', 'check', 'golden.robot').read_text())
+        args = ['--cache', '--cache-stat', '--cache-dir', str(tmp_path / 'cache'), '--check', '--verbose',
+                '--transform', 'NormalizeSectionHeaderName', str(source)]
+        result = run_tidy(args)
+        assert 'Stat manifest: 0 hits, 1 misses' in result.output
+        with patch('robotidy.cache.read_source') as read_source:
+            result = run_tidy(args)
+        assert 'Stat manifest: 1 hits, 0 misses' in result.output
+        read_source.assert_not_called()
+        source.write_text(source.read_text() + '\n*** keywords ***\n')
+        result = run_tidy(args, exit_code=1)
+        assert 'Stat manifest: 0 hits, 1 misses' in result.output
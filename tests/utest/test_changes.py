@@ -0,0 +1,77 @@
+from difflib import unified_diff
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from robot.api import get_model
+
+from robotidy.changes import get_diff_lines, keep_changes_in_ranges, reports_changes
+from robotidy.chunks import transform_in_chunks
+from robotidy.context import ChangeTracker, FileContext
+from robotidy.utils import model_to_text
+from .utils import load_default_transformers, run_tidy
+
+
+ATEST_DIR = Path(Path(__file__).parent.parent, 'atest', 'transformers')
+
+
+class TestChanges:
+    def test_default_transformers_report_changes(self):
+        assert reports_changes(load_default_transformers())
+
+    @pytest.mark.parametrize('source', [
+        'NormalizeNewLines/source/tests.robot',
+        'NormalizeNewLines/expected/tests.robot',
+        'AlignSettingsSection/source/test.robot',
+        'AssignmentNormalizer/expected/common_equal_sign.robot',
+        'DiscardEmptySections/source/removes_empty_sections.robot',
+        'ReplaceRunKeywordIf/expected/tests.robot'
+    ])
+    def test_changes_reported(self, source):
+        model = get_model(ATEST_DIR / source)
+        old_text = model_to_text(model)
+        with FileContext(model.source) as context:
+            transform_in_chunks(model, load_default_transformers())
+        assert context.changes.changed == (model_to_text(model) != old_text)
+
+    def test_line_range(self):
+        changes = ChangeTracker()
+        assert changes.line_range() is None
+        changes.mark(10, 12)
+        changes.mark(3, 3)
+        assert changes.changed
+        assert changes.line_range() == (3, 12)
+        # node created by the transformer does not have line numbers
+        changes.mark(-1, -1)
+        assert changes.line_range() is None
+
+    @pytest.mark.parametrize('line_range', [(20, 22), (1, 40), (15, 30), None])
+    def test_diff_lines(self, line_range):
+        old = [f'line {index}' for index in range(1, 41)]
+        new = old[:19] + ['changed', 'added'] + old[22:]
+        expected = list(unified_diff(old, new, fromfile='before', tofile='after'))
+        assert get_diff_lines(old, new, 'before', 'after', line_range) == expected
+
+    def test_diff_lines_outside_of_range(self):
+        old = [f'line {index}' for index in range(1, 41)]
+        new = ['changed'] + old[1:]
+        expected = list(unified_diff(old, new, fromfile='before', tofile='after'))
+        assert get_diff_lines(old, new, 'before', 'after', (20, 22)) == expected
+
+    def test_unchanged_file_not_serialized(self):
+        source = str(ATEST_DIR / 'NormalizeNewLines' / 'expected' / 'tests.robot')
+        with patch('robotidy.app.model_to_text') as model_to_text_mock, \
+                patch('robotidy.app.Robotidy.save_model') as save_model_mock:
+            run_tidy(['--transform', 'NormalizeNewLines', source])
+        model_to_text_mock.assert_not_called()
+        save_model_mock.assert_not_called()
+
+    @pytest.mark.parametrize('line_ranges, expected', [
+        ([(2, 2)], 'A\nB\nc\nd\n'),
+        ([(4, 4)], 'a\nb\nc\nx\nd\n'),
+        ([(1, 4)], 'A\nB\nc\nx\nd\n'),
+        ([(3, 3)], 'a\nb\nc\nx\nd\n'),
+        ([(5, 5)], 'a\nb\nc\nd\n')
+    ])
+    def test_keep_changes_in_ranges(self, line_ranges, expected):
+        assert keep_changes_in_ranges('a\nb\nc\nd\n', 'A\nB\nc\nx\nd\n', line_ranges) == expected
@@ -0,0 +1,117 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from robot.api import get_model
+from robot.api.parsing import ModelTransformer
+
+from robotidy.cache import read_source
+from robotidy.chunks import can_split, prefilter_transformers, split_stages, transform_in_chunks
+from robotidy.transformers.NormalizeSectionHeaderName import NormalizeSectionHeaderName
+from robotidy.transformers.ReplaceRunKeywordIf import ReplaceRunKeywordIf
+from robotidy.transformers.SplitTooLongLine import SplitTooLongLine
+from robotidy.utils import StatementLinesCollector
+from .utils import load_default_transformers, run_tidy
+
+
+ATEST_DIR = Path(Path(__file__).parent.parent, 'atest', 'transformers')
+
+
+class Transformer:
+    def __init__(self, scope=None):
+        if scope is not None:
+            self.scope = scope
+
+    def __repr__(self):
+        return getattr(self, 'scope', 'default')
+
+
+class SectionTransformer(Transformer):
+    def visit_Section(self, node):  # noqa
+        return node
+
+
+class TestChunks:
+    def test_split_stages(self):
+        transformers = [Transformer('block'), Transformer('block'), Transformer(), Transformer('block'),
+                        Transformer('section'), Transformer('file'), Transformer('section')]
+        stages = [(scope, len(stage)) for scope, stage in split_stages(transformers)]
+        assert stages == [('block', 2), ('file', 1), ('section', 2), ('file', 1), ('section', 1)]
+
+    def test_invalid_scope(self):
+        with pytest.raises(ValueError) as err:
+            split_stages([Transformer('statement')])
+        assert "Invalid scope 'statement' of Transformer transformer" in str(err.value)
+
+    def test_default_transformers_split_keywords(self):
+        model = get_model(ATEST_DIR / 'NormalizeNewLines' / 'source' / 'tests.robot')
+        transformers = load_default_transformers()
+        splittable = [type(section).__name__ for section in model.sections if can_split(section, transformers)]
+        assert splittable == ['TestCaseSection', 'KeywordSection']
+        keywords = model.sections[2]
+        assert can_split(keywords, list(transformers) + [Transformer('section')])
+        assert not can_split(keywords, list(transformers) + [SectionTransformer('section')])
+
+    @pytest.mark.parametrize('source', [
+        'ReplaceRunKeywordIf/source/tests.robot',
+        'SplitTooLongLine/source/tests.robot',
+        'NormalizeNewLines/source/tests.robot',
+        'DiscardEmptySections/source/removes_empty_sections.robot'
+    ])
+    def test_chunks_same_as_sequential(self, source):
+        transformers = load_default_transformers()
+        expected = get_model(ATEST_DIR / source)
+        for transformer in transformers:
+            transformer.visit(expected)
+        actual = get_model(ATEST_DIR / source)
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            transform_in_chunks(actual, transformers, executor, workers=3)
+        assert StatementLinesCollector(actual) == StatementLinesCollector(expected)
+
+    def test_stop_between_stages(self):
+        # file, section and file stage
+        transformers = [ModelTransformer(), *load_default_transformers(), ModelTransformer()]
+        model = get_model(ATEST_DIR / 'SplitTooLongLine/source/tests.robot')
+        assert not transform_in_chunks(model, transformers, stop=lambda: True)
+        calls = []
+        assert transform_in_chunks(model, transformers, stop=lambda: calls.append(1) or False)
+        assert calls
+
+    @pytest.mark.parametrize('args, visited', [
+        (['--check'], 1),
+        (['--check', '--diff'], 2)
+    ])
+    def test_check_stops_at_first_change(self, tmp_path, args, visited):
+        source = tmp_path / 'test.robot'
+        source.write_text('*** Test Cases ***\nTest 1\n    Log    ' + 'a' * 130 + '\n\nTest 2\n    Log    '
+                          + 'b' * 130 + '\n')
+        with patch.object(SplitTooLongLine, 'visit_KeywordCall', autospec=True,
+                          side_effect=SplitTooLongLine.visit_KeywordCall) as visit_mock:
+            run_tidy(args + ['--no-overwrite', str(source)], exit_code=1)
+        # the second test case is not transformed if the diff is not needed
+        assert visit_mock.call_count == visited
+
+    @pytest.mark.parametrize('transformer, text, expected', [
+        (ReplaceRunKeywordIf(), 'Keyword\n    BuiltIn.Run_Keyword If    ${cond}    Keyword\n', True),
+        (ReplaceRunKeywordIf(), 'Keyword\n    Run Keyword    Keyword\n', False),
+        (SplitTooLongLine(line_length=20), 'Keyword\n    Short Line\n', False),
+        (SplitTooLongLine(line_length=20), 'Keyword\n    Log    Too long line\n', True),
+        (NormalizeSectionHeaderName(), '*** Settings ***\n*** Test Cases ***    Column\n', False),
+        (NormalizeSectionHeaderName(), '*** Settings ***\n*test case\n', True),
+        (NormalizeSectionHeaderName(uppercase=True), '*** Settings ***\n', True)
+    ])
+    def test_prefilter(self, transformer, text, expected):
+        assert prefilter_transformers(text, [transformer]) == ([transformer] if expected else [])
+
+    def test_not_parsed_if_all_transformers_dropped(self):
+        source = str(Path(Path(__file__).parent, 'testdata', 'check', 'golden.robot'))
+        with patch('robotidy.cache.tokenize') as tokenize_mock:
+            run_tidy(['--check', '--transform', 'ReplaceRunKeywordIf', source])
+        tokenize_mock.assert_not_called()
+
+    def test_source_read_once(self):
+        source = str(Path(Path(__file__).parent, 'testdata', 'check', 'not_golden.robot'))
+        with patch('robotidy.cache.read_source', wraps=read_source) as read_source_mock:
+            run_tidy(['--check', '--no-overwrite', '--transform', 'NormalizeSectionHeaderName', source], exit_code=1)
+        read_source_mock.assert_called_once()
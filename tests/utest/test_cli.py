@@ -1,3 +1,4 @@
+import json
 from unittest.mock import patch
 from pathlib import Path
 
@@ -31,15 +32,13 @@ class TestCli:
         result = run_tidy(args, exit_code=1)
         assert expected_output in str(result.exception)
 
-    # TODO: raise exception if kwarg does not match
-    # def test_not_existing_configurable(self):
-    #     expected_output = "Usage: cli [OPTIONS] [PATH(S)]\n\n" \
-    #                       "Error: Invalid configurable name: 'missing_configurable' for transformer: " \
-    #                       "'DiscardEmptySections'\n"
-    #
-    #     args = '--transform DiscardEmptySections:allow_only_commentss=True'.split()
-    #     result = run_tidy(args, exit_code=2)
-    #     assert expected_output == result.output
+    def test_not_existing_configurable(self):
+        expected_output = "Error: Invalid configurable name: 'allow_only_commentss' for transformer: " \
+                          "'DiscardEmptySections'. Possible values:\n    allow_only_comments\n"
+
+        args = '--transform DiscardEmptySections:allow_only_commentss=True'.split()
+        result = run_tidy(args, exit_code=2)
+        assert expected_output in result.output
 
     def test_invalid_configurable_usage(self):
         expected_output = "Importing 'DiscardEmptySections=allow_only_comments=False' failed: " \
@@ -154,3 +153,95 @@ class TestCli:
             ['--check', '--overwrite', '--transform', 'NormalizeSectionHeaderName', str(source)],
             exit_code=return_status
         )
+
+    def test_fail_fast_requires_check(self):
+        result = run_tidy(['--fail-fast', '.'], exit_code=2)
+        assert '--fail-fast requires --check' in result.output
+
+    def test_fail_fast(self, tmp_path):
+        for index in range(3):
+            (tmp_path / f'test{index}.robot').write_text('*** test cases ***\nTest\n    No Operation\n')
+        report = tmp_path / 'report.json'
+        args = ['--check', '--no-overwrite', '--report', str(report), str(tmp_path)]
+        run_tidy(args, exit_code=1)
+        assert len(json.loads(report.read_text())['files']) == 3
+        run_tidy(['--fail-fast'] + args, exit_code=1)
+        assert [file['changed'] for file in json.loads(report.read_text())['files']] == [True]
+
+    def test_unchanged_file_not_saved(self):
+        source = str(Path(Path(__file__).parent, 'testdata', 'check', 'golden.robot'))
+        with patch('robotidy.app.Robotidy.save_model') as save_model_mock:
+            run_tidy(['--overwrite', '--transform', 'NormalizeSectionHeaderName', source])
+        save_model_mock.assert_not_called()
+
+    @pytest.mark.parametrize('fsync', [True, False])
+    def test_fsync(self, fsync):
+        check_dir = Path(Path(__file__).parent, 'testdata', 'check')
+        args = ['--overwrite', '--transform', 'NormalizeSectionHeaderName', str(check_dir)]
+        with patch('robotidy.app.sync_files') as sync_files_mock:
+            run_tidy(['--fsync'] + args if fsync else args)
+        if fsync:
+            sync_files_mock.assert_called_once_with([check_dir / 'not_golden.robot'])
+        else:
+            sync_files_mock.assert_not_called()
+
+    def test_workers_output_same_as_serial(self):
+        source = str(Path(Path(__file__).parent, 'testdata', 'check'))
+        args = ['--check', '--diff', '--no-overwrite', '--transform', 'NormalizeSectionHeaderName', source]
+        serial = run_tidy(args, exit_code=1)
+        parallel = run_tidy(['--workers', '2'] + args, exit_code=1)
+        assert serial.output == parallel.output
+
+    def test_invalid_workers_count(self):
+        result = run_tidy(['--workers', 'many'], exit_code=2)
+        assert "'many' is not a positive integer or 'auto'" in result.output
+
+    def test_threads_output_same_as_serial(self):
+        source = str(Path(Path(__file__).parent.parent, 'atest', 'transformers', 'NormalizeNewLines', 'source'))
+        args = ['--check', '--diff', '--no-overwrite', '--transform', 'NormalizeNewLines', source]
+        serial = run_tidy(args, exit_code=1)
+        threaded = run_tidy(['--threads', '4'] + args, exit_code=1)
+        assert serial.output == threaded.output
+
+    def test_workers_and_threads_exclusive(self):
+        result = run_tidy(['--workers', '2', '--threads', '2'], exit_code=2)
+        assert '--workers and --threads cannot be used together' in result.output
+
+    def test_chunk_threshold_requires_threads(self):
+        result = run_tidy(['--chunk-threshold', '100'], exit_code=2)
+        assert '--chunk-threshold requires --threads' in result.output
+
+    @pytest.mark.parametrize('gil', [True, False])
+    def test_chunk_threshold_ignored_with_gil(self, gil):
+        source = str(Path(Path(__file__).parent, 'testdata', 'check', 'golden.robot'))
+        with patch('robotidy.cli.gil_enabled', return_value=gil), \
+                patch('robotidy.cli.Robotidy.transform_files', return_value=0) as transform_files_mock, \
+                patch('robotidy.cli.Robotidy.__init__', return_value=None) as init_mock:
+            result = run_tidy(['--threads', '2', '--chunk-threshold', '100', source])
+        transform_files_mock.assert_called_once()
+        assert init_mock.call_args.kwargs['chunk_threshold'] == (None if gil else 100)
+        assert ('--chunk-threshold is ignored with GIL enabled' in result.output) == gil
+
+    def test_invalid_exclude(self):
+        result = run_tidy(['--exclude', '(unclosed', '.'], exit_code=2)
+        assert 'Not a valid regular expression' in result.output
+
+    def test_files_from(self, tmp_path):
+        check_dir = Path(Path(__file__).parent, 'testdata', 'check')
+        files = tmp_path / 'files.txt'
+        files.write_text(f"{check_dir / 'golden.robot'}\n{tmp_path / 'missing.robot'}\n{check_dir}\n")
+        result = run_tidy(['--check', '--no-overwrite', '--verbose', '--transform', 'NormalizeSectionHeaderName',
+                           '--files-from', str(files)], exit_code=2)
+        assert f"Path '{tmp_path / 'missing.robot'}' does not exist" in result.output
+        assert result.output.count('Transforming') == 2
+
+    def test_missing_path_from_command_line(self, tmp_path):
+        golden = Path(Path(__file__).parent, 'testdata', 'check', 'golden.robot')
+        result = run_tidy(['--check', '--no-overwrite', '--verbose', '--transform', 'NormalizeSectionHeaderName',
+                           str(tmp_path / 'missing.robot'), str(golden)], exit_code=2)
+        assert f"Path '{tmp_path / 'missing.robot'}' does not exist" in result.output
+        assert result.output.count('Transforming') == 1
+
+    def test_null_requires_files_from(self):
+        result = run_tidy(['-0', '.'], exit_code=2)
+        assert '-0 / --null requires --files-from' in result.output
@@ -0,0 +1,98 @@
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from robotidy.cli import cli, get_config_resolver
+from robotidy.config import ConfigResolver
+from .utils import run_tidy
+
+
+DEFAULTS = {'spacecount': 4, 'lineseparator': 'native', 'usepipes': False, 'startline': None, 'endline': None}
+
+
+def create_project(root: Path):
+    (root / '.git').mkdir()
+    for path in ('a/test.robot', 'b/c/test.robot', 'test.robot'):
+        path = root / path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text('*** test cases ***\nTest\n    No Operation\n')
+    (root / 'a' / 'robotidy.toml').write_text('[transformers.NormalizeSectionHeaderName]\nuppercase = true\n')
+    (root / 'b' / 'robotidy.toml').write_text('[main]\nspacecount = 2\n[transformers.NormalizeSectionHeaderName]\n')
+
+
+class TestConfig:
+    def test_nearest_config(self, tmp_path):
+        create_project(tmp_path)
+        resolver = ConfigResolver(DEFAULTS, {})
+        assert resolver.find_for_source(tmp_path / 'a' / 'test.robot') == str(tmp_path / 'a' / 'robotidy.toml')
+        assert resolver.find_for_source(tmp_path / 'b' / 'c' / 'test.robot') == str(tmp_path / 'b' / 'robotidy.toml')
+        # search stops at the project root
+        assert resolver.find_for_source(tmp_path / 'test.robot') is None
+
+    def test_directories_memoized(self, tmp_path):
+        create_project(tmp_path)
+        resolver = ConfigResolver(DEFAULTS, {})
+        resolver.find_for_source(tmp_path / 'b' / 'c' / 'test.robot')
+        assert resolver.configs == {str(tmp_path / 'b' / 'c'): str(tmp_path / 'b' / 'robotidy.toml'),
+                                    str(tmp_path / 'b'): str(tmp_path / 'b' / 'robotidy.toml')}
+        with patch('os.path.isfile') as isfile_mock:
+            resolver.find_for_source(tmp_path / 'b' / 'c' / 'other.robot')
+        isfile_mock.assert_not_called()
+
+    def test_pipeline_from_config(self, tmp_path):
+        create_project(tmp_path)
+        resolver = ConfigResolver(DEFAULTS, {'usepipes': True})
+        transformers, formatting_config = resolver.get_pipeline(str(tmp_path / 'b' / 'robotidy.toml'))
+        assert transformers == [('NormalizeSectionHeaderName', [])]
+        assert formatting_config.space_count == 2
+        assert formatting_config.use_pipes
+        assert resolver.get_pipeline(str(tmp_path / 'b' / 'robotidy.toml'))[1] is formatting_config
+
+    def test_command_line_transformers_used_for_all_configs(self, tmp_path):
+        create_project(tmp_path)
+        resolver = ConfigResolver(DEFAULTS, {}, [('AlignSettingsSection', [])])
+        transformers, formatting_config = resolver.get_pipeline(str(tmp_path / 'a' / 'robotidy.toml'))
+        assert transformers == [('AlignSettingsSection', [])]
+        assert formatting_config.space_count == 4
+
+    def test_config_per_directory(self, tmp_path):
+        create_project(tmp_path)
+        result = run_tidy(['--no-overwrite', '--diff', str(tmp_path)])
+        assert '+*** TEST CASES ***' in result.output
+        assert result.output.count('+*** Test Cases ***') == 2
+
+    def test_config_option_used_for_all_files(self, tmp_path):
+        create_project(tmp_path)
+        config = str(tmp_path / 'a' / 'robotidy.toml')
+        result = run_tidy(['--no-overwrite', '--diff', '--config', config, str(tmp_path)])
+        assert result.output.count('+*** TEST CASES ***') == 3
+
+    def test_option_defaults_used_for_configs(self, tmp_path):
+        create_project(tmp_path)
+        ctx = cli.make_context('robotidy', [str(tmp_path)])
+        resolver = get_config_resolver(ctx, [])
+        assert resolver.defaults == DEFAULTS
+        assert not resolver.get_pipeline(str(tmp_path / 'a' / 'robotidy.toml'))[1].use_pipes
+
+    def test_invalid_nested_config(self, tmp_path):
+        create_project(tmp_path)
+        config = tmp_path / 'b' / 'robotidy.toml'
+        config.write_text('[main\nspacecount = 2\n')
+        result = run_tidy(['--no-overwrite', str(tmp_path)], exit_code=1)
+        assert f"Could not open file '{config}': Error reading configuration file" in result.output
+
+    @pytest.mark.parametrize('transformers, error', [
+        ('[transformers.NormalizeSectionHeaderName]\nupper_case = true\n',
+         "Invalid configurable name: 'upper_case' for transformer: 'NormalizeSectionHeaderName'."),
+        ('[transformers.NotExistingTransformer]\n', "Importing 'NotExistingTransformer' failed")
+    ])
+    @pytest.mark.parametrize('cache', [[], ['--cache', '--cache-dir']])
+    def test_nested_config_transformers_validated(self, tmp_path, transformers, error, cache):
+        create_project(tmp_path)
+        config = tmp_path / 'b' / 'robotidy.toml'
+        config.write_text(transformers)
+        cache_dir = [str(tmp_path / 'cache')] if cache else []
+        result = run_tidy([*cache, *cache_dir, '--no-overwrite', str(tmp_path)], exit_code=2)
+        assert f"Invalid value for configuration file '{config}'" in result.output
+        assert error in result.output
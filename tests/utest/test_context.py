@@ -0,0 +1,44 @@
+import threading
+
+from robotidy.context import FileContext, FileState, current_context
+
+
+class StatefulTransformer:
+    last_node = FileState(default='default')
+
+
+class TestContext:
+    def test_state_stored_on_instance_outside_context(self):
+        transformer = StatefulTransformer()
+        assert transformer.last_node == 'default'
+        transformer.last_node = 'node'
+        assert transformer.last_node == 'node'
+
+    def test_state_stored_in_file_context(self):
+        transformer = StatefulTransformer()
+        with FileContext('file.robot') as context:
+            assert current_context() is context
+            transformer.last_node = 'node'
+            assert transformer.last_node == 'node'
+        assert current_context() is None
+        assert transformer.last_node == 'default'
+        with FileContext('other.robot'):
+            assert transformer.last_node == 'default'
+
+    def test_state_is_not_shared_between_threads(self):
+        transformer = StatefulTransformer()
+        barrier = threading.Barrier(2)
+        seen = {}
+
+        def transform(name):
+            with FileContext(name):
+                transformer.last_node = name
+                barrier.wait()
+                seen[name] = transformer.last_node
+
+        threads = [threading.Thread(target=transform, args=(name,)) for name in ('a.robot', 'b.robot')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert seen == {'a.robot': 'a.robot', 'b.robot': 'b.robot'}
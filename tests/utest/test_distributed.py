@@ -0,0 +1,116 @@
+import socket
+import threading
+from pathlib import Path
+
+import pytest
+
+from robotidy.app import Robotidy
+from robotidy.distributed import (
+    Coordinator,
+    DistributedError,
+    connect,
+    parse_address,
+    read_message,
+    run_worker,
+    send_message
+)
+from robotidy.files import get_paths
+from robotidy.utils import GlobalFormattingConfig
+from .utils import create_test_files, run_tidy as cli_run_tidy
+
+
+def run_tidy(root: Path, coordinator=None) -> Robotidy:
+    formatting_config = GlobalFormattingConfig(use_pipes=False, space_count=4, line_sep='unix', start_line=None,
+                                               end_line=None)
+    tidy = Robotidy(transformers=[], src=get_paths([str(root)], root), overwrite=False, show_diff=True,
+                    formatting_config=formatting_config, verbose=False, check=True, coordinator=coordinator)
+    return tidy.transform_files()
+
+
+def start_workers(address: str, root: Path, count: int):
+    threads = [threading.Thread(target=run_worker, args=(address, root), daemon=True) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+class TestDistributed:
+    @pytest.mark.parametrize('address, expected', [
+        ('localhost:8000', (socket.AF_INET, ('localhost', 8000))),
+        (':0', (socket.AF_INET, ('localhost', 0))),
+        ('[::1]:8000', (socket.AF_INET6, ('::1', 8000)))
+    ])
+    def test_parse_address(self, address, expected):
+        assert parse_address(address) == expected
+
+    @pytest.mark.parametrize('address', ['localhost', 'localhost:port', ''])
+    def test_parse_invalid_address(self, address):
+        with pytest.raises(ValueError):
+            parse_address(address)
+
+    def test_files_transformed_by_workers(self, tmp_path, capsys):
+        create_test_files(tmp_path, 100)
+        root = tmp_path.resolve()
+        assert run_tidy(root) == 1
+        expected = capsys.readouterr().out
+        coordinator = Coordinator('127.0.0.1:0', root)
+        coordinator.listen()
+        threads = start_workers(coordinator.bound_address, root, 3)
+        assert run_tidy(root, coordinator) == 1
+        assert capsys.readouterr().out == expected
+        for thread in threads:
+            thread.join(timeout=10)
+            assert not thread.is_alive()
+
+    def test_files_of_disconnected_worker_returned_to_queue(self, tmp_path, capsys):
+        create_test_files(tmp_path, 10)
+        root = tmp_path.resolve()
+        run_tidy(root)
+        expected = capsys.readouterr().out
+        coordinator = Coordinator('127.0.0.1:0', root)
+        coordinator.listen()
+        taken = []
+
+        def disconnecting_worker():
+            with connect(coordinator.bound_address) as sock, sock.makefile('rwb') as stream:
+                read_message(stream)
+                send_message(stream, {'type': 'get'})
+                taken.extend(read_message(stream)['files'])
+            start_workers(coordinator.bound_address, root, 1)
+
+        worker = threading.Thread(target=disconnecting_worker, daemon=True)
+        worker.start()
+        assert run_tidy(root, coordinator) == 1
+        assert taken
+        assert capsys.readouterr().out == expected
+
+    def test_no_connected_worker(self, tmp_path):
+        create_test_files(tmp_path, 3)
+        root = tmp_path.resolve()
+        coordinator = Coordinator('127.0.0.1:0', root, idle_timeout=0.2)
+        coordinator.listen()
+        with pytest.raises(DistributedError) as err:
+            run_tidy(root, coordinator)
+        assert str(err.value) == 'No worker connected for 0.2 seconds'
+
+    def test_all_workers_disconnected(self, tmp_path):
+        create_test_files(tmp_path, 3)
+        root = tmp_path.resolve()
+        coordinator = Coordinator('127.0.0.1:0', root, idle_timeout=0.2)
+        coordinator.listen()
+
+        def disconnecting_worker():
+            with connect(coordinator.bound_address) as sock, sock.makefile('rwb') as stream:
+                read_message(stream)
+                send_message(stream, {'type': 'get'})
+                read_message(stream)
+
+        threading.Thread(target=disconnecting_worker, daemon=True).start()
+        with pytest.raises(DistributedError):
+            run_tidy(root, coordinator)
+
+    def test_serve_timeout(self, tmp_path):
+        create_test_files(tmp_path, 3)
+        result = cli_run_tidy(['--check', '--serve', '127.0.0.1:0', '--serve-timeout', '1', str(tmp_path)],
+                              exit_code=1)
+        assert 'No worker connected for 1 seconds' in result.output
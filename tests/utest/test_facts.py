@@ -0,0 +1,77 @@
+from pathlib import Path
+
+import pytest
+from robot.api import get_model
+
+from robotidy.chunks import prepare_transformers
+from robotidy.context import FileContext
+from robotidy.facts import Collector, collect_facts, get_facts, register_collector
+
+
+ATEST_DIR = Path(Path(__file__).parent.parent, 'atest', 'transformers')
+
+
+class KeywordNames(Collector):
+    name = 'keyword_names'
+
+    def __init__(self):
+        self.names = []
+
+    def visit_KeywordName(self, node):  # noqa
+        self.names.append(node.name)
+
+    def result(self):
+        return self.names
+
+
+class Transformer:
+    facts = ('keyword_names', 'templated')
+
+    def __init__(self):
+        self.facts_in_prepare = None
+
+    def prepare(self, model):
+        self.facts_in_prepare = get_facts(model, self.facts)
+
+
+class TestFacts:
+    def test_builtin_facts(self):
+        model = get_model(ATEST_DIR / 'NormalizeNewLines' / 'source' / 'templated_tests.robot')
+        facts = collect_facts(model, ['templated', 'sections', 'max_line_length', 'keyword_calls'])
+        assert facts['templated']
+        assert facts['sections'] == [type(section).__name__ for section in model.sections]
+        assert facts['max_line_length'] == max(len(line.rstrip('\r\n')) for line in open(model.source))
+        assert facts['keyword_calls']
+
+    def test_assignment_signs(self):
+        model = get_model(ATEST_DIR / 'AssignmentNormalizer' / 'source' / 'tests.robot')
+        signs = collect_facts(model, ['assignment_signs'])['assignment_signs']
+        assert set(signs) == {'', '=', ' ='}
+
+    def test_registered_collector(self):
+        register_collector(KeywordNames)
+        model = get_model(ATEST_DIR / 'NormalizeNewLines' / 'source' / 'tests.robot')
+        transformer = Transformer()
+        with FileContext(model.source) as context:
+            prepare_transformers(model, [transformer])
+            assert context.facts['keyword_names'] == ['Keyword', 'Other Keyword', 'Another Keyword']
+        assert transformer.facts_in_prepare is context.facts
+
+    def test_collector_without_result_not_registered(self):
+        class NoResult(Collector):
+            name = 'no_result'
+
+        with pytest.raises(ValueError) as err:
+            register_collector(NoResult)
+        assert str(err.value) == 'Collector NoResult does not implement: result'
+        with pytest.raises(ValueError):
+            get_facts(get_model(ATEST_DIR / 'NormalizeNewLines' / 'source' / 'tests.robot'), ['no_result'])
+
+    def test_facts_collected_without_context(self):
+        model = get_model(ATEST_DIR / 'NormalizeNewLines' / 'source' / 'templated_tests.robot')
+        assert get_facts(model, ['templated'])['templated']
+
+    def test_unknown_fact(self):
+        with pytest.raises(ValueError) as err:
+            collect_facts(get_model(ATEST_DIR / 'NormalizeNewLines' / 'source' / 'tests.robot'), ['unknown'])
+        assert "Unknown fact 'unknown'" in str(err.value)
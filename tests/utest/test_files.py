@@ -0,0 +1,108 @@
+import io
+import os
+import re
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from robotidy.files import DEFAULT_EXCLUDES, get_paths, parse_gitignore, read_file_list
+
+
+def create_files(root: Path, paths):
+    for path in paths:
+        path = root / path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text('*** Test Cases ***\n')
+
+
+def relative_paths(root: Path, paths):
+    return [path.relative_to(root).as_posix() for path in paths]
+
+
+class TestFiles:
+    def test_sorted_order_and_extensions(self, tmp_path):
+        create_files(tmp_path, ['b.robot', 'a/z.resource', 'a/y.txt', 'a.robot', 'c/d/e.robot'])
+        paths = get_paths([str(tmp_path)], tmp_path)
+        assert relative_paths(tmp_path, paths) == ['a/z.resource', 'a.robot', 'b.robot', 'c/d/e.robot']
+
+    def test_paths_yielded_while_walking(self, tmp_path):
+        create_files(tmp_path, ['a/a.robot', 'b/b.robot'])
+        paths = get_paths([str(tmp_path)], tmp_path)
+        assert next(paths) == tmp_path / 'a' / 'a.robot'
+        # directory ``b`` is not listed yet
+        create_files(tmp_path, ['b/c.robot'])
+        assert relative_paths(tmp_path, paths) == ['b/b.robot', 'b/c.robot']
+
+    def test_exclude(self, tmp_path):
+        create_files(tmp_path, ['.venv/a.robot', 'node_modules/b.robot', 'src/c.robot', 'src/output/d.robot'])
+        paths = get_paths([str(tmp_path)], tmp_path, re.compile(DEFAULT_EXCLUDES), re.compile(r'/output/'))
+        assert relative_paths(tmp_path, paths) == ['src/c.robot']
+
+    def test_exclude_relative_to_root(self, tmp_path):
+        create_files(tmp_path, ['build/src/a.robot', 'build/src/build/b.robot'])
+        paths = get_paths([str(tmp_path / 'build' / 'src')], tmp_path / 'build', re.compile(DEFAULT_EXCLUDES))
+        assert relative_paths(tmp_path, paths) == ['build/src/a.robot']
+
+    def test_explicit_file_not_excluded(self, tmp_path):
+        create_files(tmp_path, ['build/a.robot'])
+        paths = get_paths([str(tmp_path / 'build' / 'a.robot')], tmp_path, re.compile(DEFAULT_EXCLUDES))
+        assert relative_paths(tmp_path, paths) == ['build/a.robot']
+
+    def test_gitignore(self, tmp_path):
+        create_files(tmp_path, ['out/a.robot', 'keep.robot', 'skip.robot', 'sub/skip.robot', 'sub/local.robot',
+                                'sub/other.robot', 'docs/deep/file.robot'])
+        (tmp_path / '.gitignore').write_text('out/\nskip*.robot\n/docs/**/file.robot\n')
+        (tmp_path / 'sub' / '.gitignore').write_text('*.robot\n!other.robot\n')
+        paths = list(get_paths([str(tmp_path)], tmp_path))
+        assert relative_paths(tmp_path, paths) == ['keep.robot', 'sub/other.robot']
+        paths = get_paths([str(tmp_path / 'sub')], tmp_path)
+        assert relative_paths(tmp_path, paths) == ['sub/other.robot']
+        paths = get_paths([str(tmp_path)], tmp_path, use_gitignore=False)
+        assert len(list(paths)) == 7
+
+    @pytest.mark.parametrize('pattern, path, is_dir, expected', [
+        ('*.robot', 'a/b.robot', False, True),
+        ('/b.robot', 'a/b.robot', False, False),
+        ('a/*.robot', 'a/b.robot', False, True),
+        ('a/*.robot', 'a/c/b.robot', False, False),
+        ('a/**/b.robot', 'a/c/d/b.robot', False, True),
+        ('**/c', 'a/c', True, True),
+        ('out/', 'out', False, False),
+        ('out/', 'out', True, True),
+        ('file[0-9].robot', 'file1.robot', False, True),
+        ('file?.robot', 'file10.robot', False, False),
+        ('\\#file.robot', '#file.robot', False, True),
+        ('# comment', '# comment', False, False)
+    ])
+    def test_gitignore_patterns(self, pattern, path, is_dir, expected):
+        rules = parse_gitignore([pattern])
+        matched = any(regex.match(path) and not (dir_only and not is_dir) for regex, _, dir_only in rules)
+        assert matched == expected
+
+    @pytest.mark.parametrize('content, null_separated', [
+        (b'a.robot\nb c.robot\r\n\ndir\n', False),
+        (b'a.robot\0b c.robot\0dir\0', True),
+        (b'a.robot\0b c.robot\0dir', True)
+    ])
+    def test_read_file_list(self, content, null_separated):
+        with patch('robotidy.files.READ_SIZE', 3):
+            paths = list(read_file_list(io.BytesIO(content), null_separated))
+        assert paths == ['a.robot', 'b c.robot', 'dir']
+
+    def test_missing_sources_reported(self, tmp_path):
+        create_files(tmp_path, ['a.robot'])
+        missing = []
+        paths = get_paths([str(tmp_path / 'missing.robot'), str(tmp_path / 'a.robot')], tmp_path,
+                          on_missing=missing.append)
+        assert relative_paths(tmp_path, paths) == ['a.robot']
+        assert missing == [str(tmp_path / 'missing.robot')]
+
+    @pytest.mark.skipif(os.name == 'nt', reason='Requires symbolic links')
+    def test_links_deduplicated(self, tmp_path):
+        create_files(tmp_path, ['a/file.robot'])
+        (tmp_path / 'link').symlink_to(tmp_path / 'a')
+        (tmp_path / 'loop').symlink_to(tmp_path)
+        os.link(tmp_path / 'a' / 'file.robot', tmp_path / 'hard.robot')
+        paths = get_paths([str(tmp_path), str(tmp_path / 'a')], tmp_path)
+        assert relative_paths(tmp_path, paths) == ['a/file.robot']
@@ -0,0 +1,96 @@
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from robotidy.files import get_paths
+from robotidy.git import GitError, get_changed_files, get_staged_files
+from .utils import run_tidy
+
+
+pytestmark = pytest.mark.skipif(shutil.which('git') is None, reason='Requires git')
+
+
+def git(root: Path, *args):
+    command = ['git', '-c', 'user.name=robotidy', '-c', 'user.email=robotidy@example.com', *args]
+    subprocess.run(command, cwd=root, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+def create_repository(root: Path):
+    git(root, 'init', '-q')
+    for path in ('a/changed.robot', 'a/same.robot', 'b/same.robot', 'deleted.robot', 'staged.robot'):
+        path = root / path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text('*** test cases ***\nTest\n    No Operation\n')
+    git(root, 'add', '.')
+    git(root, 'commit', '-q', '-m', 'initial')
+    (root / 'a' / 'changed.robot').write_text('*** test cases ***\nTest\n    Log  1\n')
+    (root / 'staged.robot').write_text('*** test cases ***\nTest\n    Log  2\n')
+    git(root, 'add', 'staged.robot')
+    (root / 'deleted.robot').unlink()
+    (root / 'b' / 'new.robot').write_text('*** test cases ***\nTest\n    No Operation\n')
+    (root / 'b' / 'new.txt').write_text('text')
+    (root / '.gitignore').write_text('ignored.robot\n')
+    (root / 'ignored.robot').write_text('*** test cases ***\n')
+
+
+class TestGit:
+    def test_changed_files(self, tmp_path):
+        create_repository(tmp_path)
+        changed = get_changed_files('HEAD', str(tmp_path / 'a'))
+        root = tmp_path.resolve()
+        assert changed == {str(root / 'a' / 'changed.robot'), str(root / 'staged.robot'),
+                           str(root / 'b' / 'new.robot')}
+
+    def test_changed_files_limit_discovery(self, tmp_path):
+        create_repository(tmp_path)
+        root = tmp_path.resolve()
+        changed = get_changed_files('HEAD', str(root))
+        paths = get_paths([str(root / 'a'), str(root / 'b' / 'same.robot'), str(root / 'staged.robot')], root,
+                          only=changed)
+        assert [path.relative_to(root).as_posix() for path in paths] == ['a/changed.robot', 'staged.robot']
+
+    def test_invalid_ref(self, tmp_path):
+        create_repository(tmp_path)
+        with pytest.raises(GitError):
+            get_changed_files('not-existing-ref', str(tmp_path))
+
+    def test_changed_since_option(self, tmp_path):
+        create_repository(tmp_path)
+        result = run_tidy(['--no-overwrite', '--diff', '--changed-since', 'HEAD', str(tmp_path)])
+        assert result.output.count('+*** Test Cases ***') == 3
+        result = run_tidy(['--changed-since', 'not-existing-ref', str(tmp_path)], exit_code=2)
+        assert 'not-existing-ref' in result.output
+
+    def test_staged_files(self, tmp_path):
+        create_repository(tmp_path)
+        lines = ['*** test cases ***', 'Test', '    Log  2'] + [f'    Log  {i}' for i in range(5)]
+        (tmp_path / 'staged.robot').write_text('\n'.join(lines) + '\n')
+        git(tmp_path, 'add', 'staged.robot', 'b/new.robot')
+        (tmp_path / 'staged.robot').write_text('not staged')
+        staged = get_staged_files(str(tmp_path))
+        root = tmp_path.resolve()
+        assert sorted(staged) == [str(root / 'b' / 'new.robot'), str(root / 'staged.robot')]
+        assert staged[str(root / 'staged.robot')].content == ('\n'.join(lines) + '\n').encode()
+        assert staged[str(root / 'staged.robot')].line_ranges == [(3, 8)]
+        assert staged[str(root / 'b' / 'new.robot')].line_ranges == [(1, 3)]
+
+    def test_staged_option(self, tmp_path):
+        create_repository(tmp_path)
+        (tmp_path / 'staged.robot').write_text('*** test cases ***\nTest\n    Log  2\n'
+                                               '    Run Keyword If  ${a}  Log  1\n')
+        git(tmp_path, 'add', 'staged.robot')
+        result = run_tidy(['--staged', '--overwrite', str(tmp_path)])
+        assert (tmp_path / 'staged.robot').read_text() == '*** test cases ***\nTest\n    Log  2\n' \
+                                                          '    IF    ${a}\n        Log    1\n    END\n'
+        assert result.output == ''
+
+    def test_staged_option_with_not_staged_changes(self, tmp_path):
+        create_repository(tmp_path)
+        (tmp_path / 'staged.robot').write_text('*** test cases ***\nTest\n    Run Keyword If  ${a}  Log  1\n')
+        git(tmp_path, 'add', 'staged.robot')
+        (tmp_path / 'staged.robot').write_text('not staged')
+        result = run_tidy(['--staged', '--overwrite', str(tmp_path)])
+        assert (tmp_path / 'staged.robot').read_text() == 'not staged'
+        assert 'staged.robot has not staged changes - it was not overwritten' in result.output
@@ -0,0 +1,141 @@
+import ast
+from pathlib import Path
+
+import pytest
+from robot.api import get_model
+from robot.api.parsing import (
+    EmptyLine,
+    Keyword,
+    KeywordCall,
+    KeywordSection,
+    ModelTransformer,
+    SectionHeader,
+    SettingSection,
+    VariableSection
+)
+from robot.parsing.model import Statement, blocks
+
+from robotidy.chunks import prepare_transformers
+from robotidy.pipeline import FusedVisitor, get_visitor, may_contain, transform_sections
+from robotidy.utils import StatementLinesCollector
+from .utils import load_default_transformers
+
+
+ATEST_DIR = Path(Path(__file__).parent.parent, 'atest', 'transformers')
+
+
+class RecordingTransformer(ModelTransformer):
+    def __init__(self, name, log):
+        self.name = name
+        self.log = log
+
+    def visit_KeywordCall(self, node):  # noqa
+        self.log.append((self.name, node.keyword))
+        return node
+
+
+class RemoveEmptyLines(ModelTransformer):
+    def visit_EmptyLine(self, node):  # noqa
+        return None
+
+
+class DuplicateKeywordCalls(ModelTransformer):
+    def visit_KeywordCall(self, node):  # noqa
+        return [node, KeywordCall.from_params(node.keyword)]
+
+
+class VisitedNodes(ModelTransformer):
+    def __init__(self, node_types=None):
+        if node_types is not None:
+            self.node_types = node_types
+        self.visited = []
+
+    def visit_Statement(self, node):  # noqa
+        self.visited.append(type(node).__name__)
+        return node
+
+
+class CustomVisit(ModelTransformer):
+    def __init__(self):
+        self.visited = []
+
+    def visit(self, node):
+        self.visited.append(type(node).__name__)
+        return node
+
+
+class TestPipeline:
+    def test_handlers_called_in_configured_order(self):
+        model = get_model(ATEST_DIR / 'ReplaceRunKeywordIf' / 'source' / 'tests.robot')
+        log = []
+        transform_sections(model, [RecordingTransformer('first', log), RecordingTransformer('second', log)])
+        names = [name for name, _ in log]
+        assert names == ['first', 'second'] * (len(names) // 2)
+        assert log[::2] == [('first', keyword) for _, keyword in log[1::2]]
+
+    def test_removed_and_replaced_nodes(self):
+        model = get_model(ATEST_DIR / 'NormalizeNewLines' / 'source' / 'tests.robot')
+        keyword_calls = sum(isinstance(node, KeywordCall) for section in model.sections for node in ast.walk(section))
+        transform_sections(model, [RemoveEmptyLines(), DuplicateKeywordCalls()])
+        nodes = [node for section in model.sections for node in ast.walk(section)]
+        assert not any(isinstance(node, EmptyLine) for node in nodes)
+        assert sum(isinstance(node, KeywordCall) for node in nodes) == 2 * keyword_calls
+
+    def test_custom_visit_called_with_top_level_node(self):
+        model = get_model(ATEST_DIR / 'NormalizeNewLines' / 'source' / 'tests.robot')
+        transformer = CustomVisit()
+        transform_sections(model, [RemoveEmptyLines(), transformer])
+        assert transformer.visited == [type(section).__name__ for section in model.sections]
+
+    @pytest.mark.parametrize('node_class, target_class, expected', [
+        (KeywordSection, Keyword, True),
+        (KeywordSection, SectionHeader, True),
+        (SettingSection, KeywordCall, False),
+        (VariableSection, Statement, True),
+        (blocks.TestCase, KeywordCall, True),
+        (blocks.TestCase, SectionHeader, False),
+        (Keyword, SettingSection, False),
+        (KeywordCall, Statement, False)
+    ])
+    def test_may_contain(self, node_class, target_class, expected):
+        assert may_contain(node_class, target_class) == expected
+
+    def test_subtrees_pruned_with_node_types(self):
+        model = get_model(ATEST_DIR / 'NormalizeNewLines' / 'source' / 'tests.robot')
+        all_nodes, headers = VisitedNodes(), VisitedNodes(node_types=(SectionHeader,))
+        transform_sections(model, [all_nodes, headers])
+        assert 'KeywordCall' in all_nodes.visited
+        assert 'SectionHeader' in headers.visited
+        # test cases and keywords can not contain section headers
+        assert 'KeywordCall' not in headers.visited
+        assert 'KeywordName' not in headers.visited
+
+    def test_dispatch_table_reused(self):
+        transformers = [RemoveEmptyLines(), DuplicateKeywordCalls()]
+        visitor = get_visitor(transformers)
+        assert isinstance(visitor, FusedVisitor)
+        assert get_visitor(transformers) is visitor
+        visitor.visit(get_model(ATEST_DIR / 'NormalizeNewLines' / 'source' / 'tests.robot').sections[0])
+        assert visitor.handlers
+
+    @pytest.mark.parametrize('source', [
+        'ReplaceRunKeywordIf/source/tests.robot',
+        'SplitTooLongLine/source/tests.robot',
+        'NormalizeNewLines/source/tests.robot',
+        'AlignVariablesSection/source/tests.robot',
+        'AssignmentNormalizer/source/tests.robot'
+    ])
+    def test_same_as_sequential(self, source):
+        transformers = load_default_transformers()
+        expected = get_model(ATEST_DIR / source)
+        prepare_transformers(expected, transformers)
+        for transformer in transformers:
+            transformer.visit(expected)
+        actual = get_model(ATEST_DIR / source)
+        prepare_transformers(actual, transformers)
+        transform_sections(actual, transformers)
+        for transformer in transformers:
+            if hasattr(transformer, 'finalize'):
+                transformer.finalize(actual)
+        assert StatementLinesCollector(actual) == StatementLinesCollector(expected)
+
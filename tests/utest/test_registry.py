@@ -0,0 +1,127 @@
+import json
+import sys
+from unittest.mock import patch
+
+import click
+import pytest
+
+from robotidy.registry import METADATA_CACHE_FILE, TransformerRegistry, read_metadata
+from robotidy.transformers import TRANSFORMERS
+
+
+PLUGIN_SOURCE = '''
+from robot.api.parsing import ModelTransformer
+
+
+class MyTransformer(ModelTransformer):
+    """ Plugin transformer. """
+    def __init__(self, line_length: int = 120, *, enabled=True):
+        self.line_length = line_length
+        self.enabled = enabled
+
+
+class AnyArguments(ModelTransformer):
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+'''
+
+
+class Distribution:
+    version = '1.0'
+
+
+class EntryPoint:
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+        self.dist = Distribution()
+
+
+@pytest.fixture
+def plugin(tmp_path, monkeypatch):
+    (tmp_path / 'robotidy_plugin.py').write_text(PLUGIN_SOURCE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    entry_points = [EntryPoint('MyTransformer', 'robotidy_plugin:MyTransformer'),
+                    EntryPoint('AnyArguments', 'robotidy_plugin:AnyArguments')]
+    with patch('robotidy.registry.get_entry_points', return_value=entry_points):
+        yield
+    sys.modules.pop('robotidy_plugin', None)
+
+
+class TestRegistry:
+    def test_builtin_transformers(self):
+        registry = TransformerRegistry()
+        assert list(TRANSFORMERS) == registry.names()[:len(TRANSFORMERS)]
+        assert registry.get('NormalizeNewLines').import_name == 'robotidy.transformers.NormalizeNewLines'
+
+    def test_entry_point_transformers(self, plugin):
+        registry = TransformerRegistry()
+        assert registry.names()[-2:] == ['MyTransformer', 'AnyArguments']
+        assert registry.get('MyTransformer').import_name == 'robotidy_plugin.MyTransformer'
+        assert registry.get('Missing') is None
+
+    def test_metadata_read_without_import(self, plugin):
+        metadata = TransformerRegistry().metadata('MyTransformer')
+        assert metadata.doc == ' Plugin transformer. '
+        assert metadata.parameters == ['line_length', 'enabled']
+        assert 'robotidy_plugin' not in sys.modules
+
+    def test_metadata_cached(self, plugin, tmp_path):
+        TransformerRegistry(tmp_path).metadata('MyTransformer')
+        with patch('robotidy.registry.read_metadata') as read:
+            assert TransformerRegistry(tmp_path).metadata('MyTransformer').parameters == ['line_length', 'enabled']
+        read.assert_not_called()
+        assert len(json.loads((tmp_path / METADATA_CACHE_FILE).read_text())) == 1
+
+    def test_validate(self, plugin):
+        registry = TransformerRegistry()
+        registry.validate('MyTransformer', ['line_length=140', 'enabled=False'])
+        registry.validate('AnyArguments', ['anything=1'])
+        registry.validate('NotRegistered', ['anything=1'])
+        with pytest.raises(click.BadOptionUsage) as err:
+            registry.validate('MyTransformer', ['linelength=140'])
+        assert "Invalid configurable name: 'linelength' for transformer: 'MyTransformer'" in err.value.message
+
+    def test_exists(self, plugin, tmp_path):
+        registry = TransformerRegistry()
+        custom = tmp_path / 'CustomTransformer.py'
+        custom.write_text('class CustomTransformer:\n    pass\n')
+        assert registry.exists('NormalizeNewLines')
+        assert registry.exists('MyTransformer')
+        assert registry.exists(str(custom))
+        assert not registry.exists('NotRegistered')
+        assert 'robotidy_plugin' not in sys.modules
+
+    def test_plugin_loaded_by_name(self, plugin):
+        registry = TransformerRegistry()
+        transformer = registry.get('MyTransformer').load(['line_length=140'])
+        assert transformer.line_length == 140
+
+    def test_class_resolved_once(self, plugin):
+        spec = TransformerRegistry().get('MyTransformer')
+        first = spec.load(['line_length=140'])
+        with patch('robot.utils.importer.Importer.import_class_or_module') as import_class:
+            second = spec.load(['enabled=False'])
+        import_class.assert_not_called()
+        assert type(first) is type(second)
+        assert (second.line_length, second.enabled) == (120, False)
+
+    def test_invalid_arguments_reported(self, plugin):
+        from robot.errors import DataError
+
+        with pytest.raises(DataError) as err:
+            TransformerRegistry().get('MyTransformer').load(['line_length=long'])
+        assert "Importing 'robotidy_plugin.MyTransformer' failed" in str(err.value)
+
+    def test_read_metadata_of_missing_class(self):
+        assert read_metadata('Missing', PLUGIN_SOURCE, 'Missing') is None
+
+    def test_code_version(self, plugin, tmp_path):
+        registry = TransformerRegistry()
+        assert registry.code_version('NormalizeNewLines') is None
+        version = registry.code_version('MyTransformer')
+        assert version.startswith('1.0:')
+        assert registry.code_version('robotidy_plugin') == registry.code_version('robotidy_plugin.MyTransformer') \
+            == registry.code_version(str(tmp_path / 'robotidy_plugin.py')) == version.replace('1.0:', 'None:')
+        (tmp_path / 'robotidy_plugin.py').write_text(PLUGIN_SOURCE + '\n# modified\n')
+        assert registry.code_version('MyTransformer') != version
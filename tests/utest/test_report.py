@@ -0,0 +1,104 @@
+import json
+from pathlib import Path
+
+import click
+import pytest
+
+from robotidy.report import Report, get_shard, merge_reports, parse_shard, select_shard
+from .utils import create_test_files, run_tidy
+
+
+def save_report(path: Path, root: Path, shard, changed):
+    report = Report(str(path), root, shard)
+    for name in changed:
+        report.add(root / name, changed[name])
+    report.save(int(any(changed.values())))
+    return str(path)
+
+
+class TestReport:
+    @pytest.mark.parametrize('value, expected', [
+        ('1/1', (1, 1)),
+        ('2/3', (2, 3))
+    ])
+    def test_parse_shard(self, value, expected):
+        assert parse_shard(value) == expected
+
+    @pytest.mark.parametrize('value', ['0/3', '4/3', '1/0', '1', 'a/b', '1/2/3'])
+    def test_parse_invalid_shard(self, value):
+        with pytest.raises(ValueError):
+            parse_shard(value)
+
+    @pytest.mark.parametrize('value, message', [
+        ('1/0', 'Shard count should be greater than 0, got 0'),
+        ('4/3', 'Shard index should be between 1 and 3, got 4')
+    ])
+    def test_invalid_shard_message(self, value, message):
+        with pytest.raises(ValueError) as err:
+            parse_shard(value)
+        assert str(err.value) == message
+
+    def test_shard_is_stable(self):
+        assert [get_shard(path, 3) for path in ('a.robot', 'b/c.robot', 'd.resource')] == [2, 2, 3]
+
+    def test_shards_are_disjoint_and_complete(self, tmp_path):
+        paths = create_test_files(tmp_path, 60)
+        shards = [list(select_shard(paths, tmp_path, index, 4)) for index in range(1, 5)]
+        assert sorted(path for shard in shards for path in shard) == sorted(paths)
+        assert all(shard for shard in shards)
+
+    def test_merge_reports(self, tmp_path):
+        reports = [
+            save_report(tmp_path / 'shard1.json', tmp_path, (1, 2), {'b.robot': False, 'a.robot': True}),
+            save_report(tmp_path / 'shard2.json', tmp_path, (2, 2), {'c.robot': False})
+        ]
+        merged = merge_reports(reports)
+        assert merged.status == 1
+        assert [file['path'] for file in merged.files] == ['a.robot', 'b.robot', 'c.robot']
+        assert merged.changed == ['a.robot']
+        assert not merged.errors
+
+    def test_merge_reports_missing_shard(self, tmp_path):
+        reports = [
+            save_report(tmp_path / 'shard1.json', tmp_path, (1, 3), {'a.robot': False}),
+            save_report(tmp_path / 'shard3.json', tmp_path, (3, 3), {'c.robot': False}),
+            save_report(tmp_path / 'other.json', tmp_path, (1, 2), {'c.robot': False})
+        ]
+        merged = merge_reports(reports)
+        assert merged.errors == [f"Report '{reports[2]}' is for shard 1/2 but other reports are for 3 shards",
+                                 'Report of shard 2/3 is missing']
+
+    @pytest.mark.parametrize('content', [
+        '{"version": 1, "status": 0, "files": [{"path": "a.ro',
+        '[]',
+        '{"version": 1, "status": 0, "files": [{"changed": true}], "shard": null}',
+        '{"version": 1, "status": 0, "files": [], "shard": [1]}'
+    ])
+    def test_merge_invalid_report(self, tmp_path, content):
+        valid = save_report(tmp_path / 'valid.json', tmp_path, None, {'a.robot': False})
+        invalid = tmp_path / 'invalid.json'
+        invalid.write_text(content)
+        with pytest.raises(click.FileError) as err:
+            merge_reports([valid, str(invalid)])
+        assert err.value.ui_filename == str(invalid)
+
+    def test_merge_truncated_report_from_cli(self, tmp_path):
+        report = tmp_path / 'report.json'
+        report.write_text('{"version": 1, "sta')
+        result = run_tidy(['--merge-reports', str(report)], exit_code=1)
+        assert f"Could not open file '{report}': Error reading report" in result.output
+
+    def test_shard_reports_merged(self, tmp_path):
+        # project root - paths used for sharding do not depend on the temporary directory
+        create_test_files(tmp_path, 10)
+        reports = []
+        for index in (1, 2, 3):
+            report = str(tmp_path / f'report{index}.json')
+            run_tidy(['--check', '--no-overwrite', '--shard', f'{index}/3', '--report', report, str(tmp_path)],
+                     exit_code=1)
+            reports.append(report)
+        paths = [file['path'] for report in reports for file in json.loads(Path(report).read_text())['files']]
+        assert len(paths) == len(set(paths)) == 10
+        args = [arg for report in reports for arg in ('--merge-reports', report)]
+        result = run_tidy(args, exit_code=1)
+        assert '10 files in 3 reports, 5 changed' in result.output
@@ -0,0 +1,45 @@
+import subprocess
+import sys
+from pathlib import Path
+
+
+ROOT_DIR = Path(__file__).parent.parent.parent
+GOLDEN_FILE = Path(Path(__file__).parent, 'testdata', 'check', 'golden.robot')
+LOADED_MODULES = "import sys; print(sorted(m for m in sys.modules if m == 'robot' or m.startswith(('robot.', " \
+                 "'robotidy.transformers.'))))"
+
+
+def run_python(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args], cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+
+
+class TestStartup:
+    def test_robot_framework_not_imported_at_startup(self):
+        result = run_python('-c', f'import robotidy.cli; {LOADED_MODULES}')
+        assert result.stdout.strip() == '[]'
+
+    def test_optional_modules_not_imported_at_startup(self):
+        # modules needed only by some options (--cache, --serve) are imported when they are used
+        modules = ['robotidy.cache', 'sqlite3', 'robotidy.distributed']
+        result = run_python('-c', f'import sys, robotidy.cli; print([m for m in {modules!r} if m in sys.modules])')
+        assert result.stdout.strip() == '[]'
+
+    def test_robot_framework_not_imported_when_all_files_cached(self, tmp_path):
+        args = ['--cache', '--cache-dir', str(tmp_path), '--check', '--transform', 'NormalizeSectionHeaderName',
+                str(GOLDEN_FILE)]
+        run_tidy = f'from robotidy.cli import cli; cli({args!r}, standalone_mode=False)'
+        run_python('-c', run_tidy)
+        result = run_python('-c', f'{run_tidy}; {LOADED_MODULES}')
+        assert result.stdout.strip().endswith('[]')
+
+    def test_robot_framework_not_imported_when_all_files_cached_with_nested_config(self, tmp_path):
+        project = tmp_path / 'project'
+        (project / '.git').mkdir(parents=True)
+        (project / 'teamA').mkdir()
+        (project / 'teamA' / 'robotidy.toml').write_text('[transformers.NormalizeSectionHeaderName]\n')
+        (project / 'teamA' / 'golden.robot').write_bytes(GOLDEN_FILE.read_bytes())
+        args = ['--cache', '--cache-dir', str(tmp_path / 'cache'), '--check', str(project)]
+        run_tidy = f'from robotidy.cli import cli; cli({args!r}, standalone_mode=False)'
+        run_python('-c', run_tidy)
+        result = run_python('-c', f'{run_tidy}; {LOADED_MODULES}')
+        assert result.stdout.strip().endswith('[]')
@@ -1,11 +1,58 @@
+import io
+import os
+import stat
+from pathlib import Path
+from unittest.mock import patch
+
 import pytest
+from robot.api import get_model
+
 from robotidy.utils import (
     decorate_diff_with_color,
-    split_args_from_name_or_path
+    model_to_text,
+    split_args_from_name_or_path,
+    sync_files,
+    write_file
 )
 
 
 class TestUtils:
+    def test_model_to_text_same_as_saved_model(self):
+        model = get_model(Path(Path(__file__).parent, 'testdata', 'check', 'not_golden.robot'))
+        output = io.StringIO()
+        model.save(output)
+        assert model_to_text(model) == output.getvalue()
+
+    def test_write_file(self, tmp_path):
+        path = tmp_path / 'test.robot'
+        path.write_text('*** Test Cases ***\n')
+        os.chmod(path, 0o640)
+        write_file(path, '*** Keywords ***\n')
+        assert path.read_text() == '*** Keywords ***\n'
+        assert stat.S_IMODE(path.stat().st_mode) == 0o640
+        assert os.listdir(tmp_path) == ['test.robot']
+
+    @pytest.mark.skipif(not hasattr(os, 'symlink') or os.name == 'nt', reason='Requires symbolic links')
+    def test_write_file_through_symlink(self, tmp_path):
+        target = tmp_path / 'test.robot'
+        target.write_text('*** Test Cases ***\n')
+        link = tmp_path / 'link.robot'
+        link.symlink_to(target)
+        write_file(link, '*** Keywords ***\n')
+        assert link.is_symlink()
+        assert target.read_text() == '*** Keywords ***\n'
+
+    def test_sync_only_written_files(self, tmp_path):
+        (tmp_path / 'dir').mkdir()
+        paths = [tmp_path / 'first.robot', tmp_path / 'second.robot', tmp_path / 'dir' / 'third.robot']
+        for path in paths:
+            path.write_text('*** Test Cases ***\n')
+        with patch('os.fsync') as fsync_mock, patch('os.sync', create=True) as sync_mock:
+            sync_files(paths)
+        sync_mock.assert_not_called()
+        # files and (on POSIX) their directories
+        assert fsync_mock.call_count == (5 if os.name == 'posix' else 3)
+
     def test_not_changed_lines_not_colorized(self):
         lines = [
             'this is one line',
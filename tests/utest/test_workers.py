@@ -0,0 +1,108 @@
+from pathlib import Path
+
+import pytest
+
+from .utils import create_test_files, run_tidy
+from robotidy.workers import (
+    batch_sources,
+    cgroup_cpu_limit,
+    get_workers_count,
+    longest_first,
+    restore_order
+)
+
+
+RECORDER = """
+from pathlib import Path
+
+from robot.api.parsing import ModelTransformer
+
+
+class {name}(ModelTransformer):
+    def visit_File(self, node):  # noqa
+        with open(Path(node.source).parents[1] / 'transformed.log', 'a') as f:
+            f.write(node.source + '\\n')
+        return node
+"""
+
+
+class TestWorkers:
+    @pytest.mark.parametrize('cpu_max, expected', [
+        ('max 100000', None),
+        ('200000 100000', 2),
+        ('150000 100000', 2),
+        ('50000 100000', 1)
+    ])
+    def test_cgroup_v2_cpu_limit(self, tmp_path, cpu_max, expected):
+        (tmp_path / 'cpu.max').write_text(cpu_max)
+        assert cgroup_cpu_limit(str(tmp_path)) == expected
+
+    @pytest.mark.parametrize('quota, expected', [
+        ('-1', None),
+        ('400000', 4)
+    ])
+    def test_cgroup_v1_cpu_limit(self, tmp_path, quota, expected):
+        controller = tmp_path / 'cpu,cpuacct'
+        controller.mkdir()
+        (controller / 'cpu.cfs_quota_us').write_text(quota)
+        (controller / 'cpu.cfs_period_us').write_text('100000')
+        assert cgroup_cpu_limit(str(tmp_path)) == expected
+
+    def test_no_cgroup(self, tmp_path):
+        assert cgroup_cpu_limit(str(tmp_path)) is None
+
+    def test_workers_count(self):
+        assert get_workers_count('3') == 3
+        assert get_workers_count('auto') >= 1
+        with pytest.raises(ValueError):
+            get_workers_count('0')
+
+    def test_batch_sources(self, tmp_path):
+        sizes = [10, 10, 100, 10, 10]
+        sources = []
+        for index, size in enumerate(sizes):
+            path = tmp_path / f'{index}.robot'
+            path.write_text('a' * size)
+            sources.append(path)
+        batches = list(batch_sources(sources, batch_size=50, max_files=2))
+        assert batches == [sources[0:2], sources[2:3], sources[3:5]]
+
+    def test_batch_sources_keeps_order(self):
+        sources = [Path(f'missing{index}.robot') for index in range(5)]
+        batches = list(batch_sources(sources, max_files=2))
+        assert [source for batch in batches for source in batch] == sources
+
+    def test_longest_first(self, tmp_path):
+        sources = []
+        for index, size in enumerate([10, 300, 20, 100, 20]):
+            path = tmp_path / f'{index}.robot'
+            path.write_text('a' * size)
+            sources.append(path)
+        assert longest_first(sources, {}) == [1, 3, 2, 4, 0]
+        # files without duration are estimated with the average time per byte of the other files (0.02 s)
+        durations = {str(sources[0]): 5.0, str(sources[3]): 0.1, str(sources[1]): 3.0}
+        assert longest_first(sources, durations) == [0, 1, 2, 4, 3]
+
+    def test_restore_order(self):
+        order = [2, 0, 3, 1]
+        results = [f'result{index}' for index in order]
+        assert list(restore_order(results, order)) == ['result0', 'result1', 'result2', 'result3']
+
+    def test_parallel_output_in_order_of_sources(self):
+        args = ['--check', '--diff', str(Path(__file__).parent.parent / 'atest' / 'transformers')]
+        expected = run_tidy(args, exit_code=1).output
+        assert run_tidy(['--threads', '3', *args], exit_code=1).output == expected
+
+    @pytest.mark.parametrize('option', ['--workers', '--threads'])
+    def test_fail_fast_stops_parallel_run(self, tmp_path, option):
+        # records every transformed file - it runs before transformers that could stop the check of the file
+        # (module name is unique - Robot Framework fails to import the module with the same name from other path)
+        name = f'{option[2:].capitalize()}Recorder'
+        recorder = tmp_path / f'{name}.py'
+        recorder.write_text(RECORDER.format(name=name))
+        project = tmp_path / 'project'
+        project.mkdir()
+        create_test_files(project, 200)
+        run_tidy(['--check', '--fail-fast', option, '4', '--transform', str(recorder),
+                  '--transform', 'NormalizeSectionHeaderName', str(project)], exit_code=1)
+        assert len((project / 'transformed.log').read_text().splitlines()) < 100
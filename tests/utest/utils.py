@@ -4,14 +4,20 @@ from typing import List
 from click.testing import CliRunner
 
 from robotidy.cli import cli
+from robotidy.transformers import load_transformers
+from robotidy.utils import GlobalFormattingConfig
 
 
-def save_tmp_model(self, model):
+def save_tmp_model(self, model, text=None):
     """ Decorator that disables default robotidy save to file mechanism and replace with mocked one.
     That way we can save output to 'actual' directory for easy comparison with expected files.  """
     path = Path(Path(__file__).parent, 'actual', Path(model.source).name)
     print(path)
-    model.save(output=path)
+    if text is None:
+        model.save(output=path)
+        return
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
 
 
 def run_tidy(args: List[str] = None, exit_code: int = 0):
@@ -22,3 +28,27 @@ def run_tidy(args: List[str] = None, exit_code: int = 0):
         print(result.output)
         raise AssertionError(f'robotidy exit code: {result.exit_code} does not match expected: {exit_code}')
     return result
+
+
+def load_default_transformers() -> List:
+    """ Default transformers with global formatting options set (as they are set by robotidy). """
+    transformers = list(load_transformers(None).values())
+    formatting_config = GlobalFormattingConfig(
+        use_pipes=False, space_count=4, line_sep='unix', start_line=None, end_line=None
+    )
+    for transformer in transformers:
+        transformer.formatting_config = formatting_config
+    return transformers
+
+
+def create_test_files(root: Path, count: int) -> List[Path]:
+    """ Project with ``count`` test files in 3 directories. Files with odd index have not normalized section header. """
+    (root / '.git').mkdir()
+    paths = []
+    for index in range(count):
+        path = root / f'dir{index % 3}' / f'test{index}.robot'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        header = '*** test cases ***' if index % 2 else '*** Test Cases ***'
+        path.write_text(f'{header}\nTest {index}\n    No Operation\n')
+        paths.append(path)
+    return paths